@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_ratelimit',
 
     # Third-party
@@ -157,7 +158,7 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
     'EXCEPTION_HANDLER': 'core.exceptions.custom_exception_handler',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPagination',
     'PAGE_SIZE': 10,
 }
 
@@ -219,6 +220,32 @@ SOCIALACCOUNT_ADAPTER = 'allauth.socialaccount.adapter.DefaultSocialAccountAdapt
 PASSWORD_RESET_CONFIRM_URL = 'http://localhost:5173/reset-password/{uid}/{token}'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# -------------------
+# 💳 PAYMENTS
+# -------------------
+# Gateways are called by the `process_payments` worker, never inside a request.
+# Both default to the local simulator (`python manage.py run_payment_simulator`).
+PAYMENT_GATEWAY_URLS = {
+    'mpesa': config('MPESA_GATEWAY_URL', default='http://localhost:8090'),
+    'stripe': config('STRIPE_GATEWAY_URL', default='http://localhost:8090'),
+}
+PAYMENT_GATEWAY_TIMEOUT = config('PAYMENT_GATEWAY_TIMEOUT', default=10, cast=int)
+PAYMENT_CALLBACK_BASE_URL = config('PAYMENT_CALLBACK_BASE_URL', default='http://localhost:8000')
+# Shared with the gateways to sign callbacks. Required, and deliberately not SECRET_KEY,
+# which must never leave this deployment.
+PAYMENT_WEBHOOK_SECRET = config('PAYMENT_WEBHOOK_SECRET')
+PAYMENT_CURRENCY = 'KES'
+
+# -------------------
+# 📅 CALENDAR SYNC
+# -------------------
+# External iCal feeds are fetched by the `sync_calendar_feeds` worker, never inside a request.
+CALENDAR_FEED_TIMEOUT = config('CALENDAR_FEED_TIMEOUT', default=10, cast=int)
+CALENDAR_FEED_MAX_BYTES = 2 * 1024 * 1024
+CALENDAR_SYNC_INTERVAL_MINUTES = config('CALENDAR_SYNC_INTERVAL_MINUTES', default=15, cast=int)
+# Feeds on loopback/private/link-local addresses are refused unless this is on (local simulator only).
+CALENDAR_FEED_ALLOW_PRIVATE_HOSTS = config('CALENDAR_FEED_ALLOW_PRIVATE_HOSTS', default=False, cast=bool)
+
 # -------------------
 # 🌍 CORS / CSRF
 # -------------------
@@ -243,6 +270,21 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resumable image uploads are assembled here, outside MEDIA_ROOT, until complete.
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=str(BASE_DIR / 'partial_uploads'))
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
+MAX_IMAGE_UPLOAD_SIZE = 25 * 1024 * 1024  # 25 MB per image
+
+# Media is served by core.views.serve_media. Once it has authorized a request
+# it hands the file to the front proxy instead of streaming it from Python:
+#   'nginx'    -> X-Accel-Redirect to MEDIA_ACCEL_PREFIX + path (an `internal` location aliased to MEDIA_ROOT)
+#   'sendfile' -> X-Sendfile with the absolute path (Apache mod_xsendfile, lighttpd)
+#   ''         -> Django streams the file itself, with Range/ETag support
+MEDIA_ACCEL_REDIRECT = config('MEDIA_ACCEL_REDIRECT', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Paths anyone may fetch; everything else in MEDIA_ROOT is staff-only.
+MEDIA_PUBLIC_PREFIXES = ('blobs/', 'renditions/', 'property_images/', 'properties/', 'units/', 'blog_images/')
+
 # -------------------
 # 🌐 TIME & LOCALE
 # -------------------
@@ -1,9 +1,12 @@
 # airbnb_platform/urls.py
 
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.views import serve_media
 
 # For Google Login Integration
 from dj_rest_auth.registration.views import SocialLoginView
@@ -60,6 +63,7 @@ urlpatterns = [
     path('api/blog/', include('blog.urls')),
 ]
 
-# ✅ Serve media during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# ✅ Media: authorized here, bytes sent by the proxy when MEDIA_ACCEL_REDIRECT is set
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
@@ -1,7 +1,7 @@
 # In apartments/admin.py
 
 from django.contrib import admin
-from .models import Property, PropertyImage, Unit, UnitImage, BlockedDate
+from .models import Property, PropertyImage, Unit, UnitImage, BlockedDate, CalendarFeed, SeasonalRate, PriceOverride
 
 # This allows us to add multiple units directly when editing a property page
 class UnitInline(admin.TabularInline):
@@ -13,6 +13,16 @@ class UnitInline(admin.TabularInline):
 class UnitImageInline(admin.TabularInline):
     model = UnitImage
     extra = 1
+class SeasonalRateInline(admin.TabularInline):
+    model = SeasonalRate
+    extra = 0
+class PriceOverrideInline(admin.TabularInline):
+    model = PriceOverride
+    extra = 0
+class CalendarFeedInline(admin.TabularInline):
+    model = CalendarFeed
+    extra = 0
+    readonly_fields = ('last_synced_at', 'last_error')
 class PropertyImageInline(admin.TabularInline):
     model = PropertyImage
     extra = 1
@@ -30,10 +40,10 @@ class UnitAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'property', 'price_per_night', 'max_guests', 'is_active')
     list_filter = ('property__city', 'is_active')
     search_fields = ('unit_name_or_number', 'property__title')
-    # When you view a Unit, you can add/edit its images directly
-    inlines = [UnitImageInline]
+    # When you view a Unit, you can add/edit its images and pricing directly
+    inlines = [UnitImageInline, SeasonalRateInline, PriceOverrideInline, CalendarFeedInline]
 
 @admin.register(BlockedDate)
 class BlockedDateAdmin(admin.ModelAdmin):
-    list_display = ('unit', 'start_date', 'end_date', 'reason')
+    list_display = ('unit', 'start_date', 'end_date', 'reason', 'feed')
     list_filter = ('unit__property__city',)
\ No newline at end of file
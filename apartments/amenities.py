@@ -0,0 +1,158 @@
+# In apartments/amenities.py
+
+"""
+Amenity filtering and the distinct-amenity counts.
+
+Unit search filters with `amenities @> '["wifi", "pool"]'`, which the
+jsonb_path_ops GIN index on Unit.amenities answers directly. The list of
+amenities with how many searchable units offer each is read from the small
+AmenityCount table rather than unnesting every unit's JSON per request.
+
+Like the rating aggregates, the table is kept current incrementally: a saved
+unit subtracts the amenities it had in the database just before the write
+and adds those it has now, and activating or deactivating a property does
+the same for all of its units. The "before" is read with the unit's row
+locked rather than taken from the instance, so concurrent saves of one unit
+apply their deltas one after the other and a unit loaded with only() or
+defer() is diffed like any other.
+Only units that are active in an active property are counted. Bulk writes
+skip signals; run `rebuild_amenity_counts` after them.
+"""
+
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from rest_framework.exceptions import ValidationError
+
+from core.conditional import bump_versions
+from .cache import AMENITIES_SCOPE
+from .models import AmenityCount, Property, Unit
+
+MAX_AMENITY_LENGTH = AmenityCount._meta.get_field('name').max_length
+MAX_FILTER_AMENITIES = 20
+
+
+def normalize_amenities(values):
+    """Distinct, stripped amenity names in first-seen order; non-strings are ignored."""
+    if not isinstance(values, list):
+        return []
+    names = (value.strip() for value in values if isinstance(value, str))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def parse_amenities(raw, param='amenities'):
+    """Reads `wifi,pool` into ['wifi', 'pool']."""
+    names = normalize_amenities(raw.split(','))
+    if len(names) > MAX_FILTER_AMENITIES:
+        raise ValidationError({param: f"Filter by at most {MAX_FILTER_AMENITIES} amenities."})
+    return names
+
+
+def unit_contribution(amenities, searchable):
+    return Counter(normalize_amenities(amenities)) if searchable else Counter()
+
+
+def apply_amenity_deltas(deltas):
+    """
+    Adds `deltas` ({name: change}) to the counts with one INSERT for names not
+    seen before and one UPDATE for all of them.
+    """
+    deltas = {name[:MAX_AMENITY_LENGTH]: change for name, change in deltas.items() if change}
+    if not deltas:
+        return
+    AmenityCount.objects.bulk_create([AmenityCount(name=name) for name in deltas], ignore_conflicts=True)
+    AmenityCount.objects.filter(name__in=deltas).update(unit_count=F('unit_count') + Case(
+        *[When(name=name, then=Value(change)) for name, change in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+    transaction.on_commit(lambda: bump_versions(AMENITIES_SCOPE))
+
+
+def _property_is_active(unit):
+    if Unit._meta.get_field('property').is_cached(unit):
+        return unit.property.is_active
+    return Property.objects.filter(pk=unit.property_id, is_active=True).exists()
+
+
+def locked_unit_state(unit):
+    """
+    (amenities, is_active) of the unit in the database right now, locking its
+    row until the transaction ends, or None for a unit not saved yet.
+    """
+    if unit._state.adding or unit.pk is None:
+        return None
+    return Unit.objects.select_for_update().filter(pk=unit.pk).values_list('amenities', 'is_active').first()
+
+
+def lock_unit(unit):
+    """Locks the unit's row and remembers its amenity state for sync_unit()."""
+    unit._amenities_before = locked_unit_state(unit)
+
+
+def sync_unit(unit, deleted=False):
+    """Applies the change in a unit's amenities and activity since lock_unit()."""
+    before = unit.__dict__.pop('_amenities_before', None)
+    before_amenities = normalize_amenities(before[0]) if before else []
+    was_active = bool(before) and before[1]
+    after_amenities = [] if deleted else normalize_amenities(unit.amenities)
+    is_active = not deleted and unit.is_active
+    if (before_amenities, was_active) == (after_amenities, is_active):
+        return
+
+    # A property's activity changes only through sync_property(), never while its unit is saved
+    if (was_active or is_active) and _property_is_active(unit):
+        deltas = unit_contribution(after_amenities, is_active)
+        deltas.subtract(unit_contribution(before_amenities, was_active))
+        apply_amenity_deltas(deltas)
+
+
+def sync_property(property_obj):
+    """Adds or removes a property's active units when the property is (de)activated."""
+    was_active = getattr(property_obj, '_loaded_is_active', None)
+    if was_active is None or was_active == property_obj.is_active:
+        property_obj._loaded_is_active = property_obj.is_active
+        return
+    deltas = Counter()
+    for amenities in Unit.objects.filter(property_id=property_obj.pk, is_active=True).values_list('amenities', flat=True):
+        deltas.update(normalize_amenities(amenities))
+    sign = 1 if property_obj.is_active else -1
+    apply_amenity_deltas({name: sign * count for name, count in deltas.items()})
+    property_obj._loaded_is_active = property_obj.is_active
+
+
+def count_all_amenities():
+    """{name: unit count} recomputed from every searchable unit in one query."""
+    unit_table = connection.ops.quote_name(Unit._meta.db_table)
+    property_table = connection.ops.quote_name(Property._meta.db_table)
+    sql = f"""
+        SELECT LEFT(BTRIM(element #>> '{{}}'), %s) AS name, COUNT(DISTINCT unit.id)
+        FROM {unit_table} AS unit
+        JOIN {property_table} AS property ON property.id = unit.property_id
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(unit.amenities) = 'array' THEN unit.amenities ELSE '[]'::jsonb END
+        ) AS element
+        WHERE unit.is_active AND property.is_active
+          AND jsonb_typeof(element) = 'string' AND BTRIM(element #>> '{{}}') <> ''
+        GROUP BY 1
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [MAX_AMENITY_LENGTH])
+        return dict(cursor.fetchall())
+
+
+def rebuild_amenity_counts():
+    """Replaces the whole table with freshly computed counts. Returns them."""
+    counts = count_all_amenities()
+    with transaction.atomic():
+        AmenityCount.objects.all().delete()
+        AmenityCount.objects.bulk_create([AmenityCount(name=name, unit_count=count) for name, count in counts.items()])
+        transaction.on_commit(lambda: bump_versions(AMENITIES_SCOPE))
+    return counts
+
+
+def list_amenities():
+    """Amenities offered by at least one searchable unit, most common first."""
+    rows = AmenityCount.objects.filter(unit_count__gt=0).order_by('-unit_count', 'name')
+    return [{'name': name, 'count': count} for name, count in rows.values_list('name', 'unit_count')]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApartmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apartments'
+
+    def ready(self):
+        # Connects the cache invalidation and media reference count handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,142 @@
+# In apartments/availability.py
+
+"""
+Interval-based availability engine for units.
+
+Bookings occupy the half-open range [check_in, check_out) while host blocks
+store an inclusive [start_date, end_date]. Both are normalised to half-open
+[start, end) ranges so they can be merged in one pass, and the size of the
+result grows with the number of intervals rather than the number of nights.
+"""
+
+import heapq
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from bookings.models import Booking
+from .models import BlockedDate
+
+ONE_DAY = timedelta(days=1)
+
+# Upper bound on how many units a single bulk availability request may ask for.
+MAX_BULK_UNITS = 100
+
+# Bookings in these states hold the unit's nights.
+BLOCKING_BOOKING_STATUSES = [Booking.STATUS_CONFIRMED, Booking.STATUS_PENDING]
+
+
+def parse_window(params):
+    """
+    Reads the optional `from`/`to` query params into a (start, end) tuple.
+    Either side may be None, meaning the window is open on that side.
+    """
+    window = []
+    for key in ('from', 'to'):
+        raw = params.get(key)
+        if not raw:
+            window.append(None)
+            continue
+        try:
+            value = parse_date(raw)
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError({key: "Enter a valid date in YYYY-MM-DD format."})
+        window.append(value)
+
+    start, end = window
+    if start and end and end <= start:
+        raise ValidationError({'to': "'to' must be after 'from'."})
+    return start, end
+
+
+def parse_unit_ids(params):
+    """
+    Reads the comma-separated `unit_ids` query param into a de-duplicated
+    list of ints, preserving the order the client asked for.
+    """
+    raw = params.get('unit_ids', '')
+    try:
+        unit_ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    except ValueError:
+        raise ValidationError({'unit_ids': "Provide a comma-separated list of unit ids."})
+
+    if not unit_ids:
+        raise ValidationError({'unit_ids': "This query parameter is required."})
+    if len(unit_ids) > MAX_BULK_UNITS:
+        raise ValidationError({'unit_ids': f"At most {MAX_BULK_UNITS} units can be requested at once."})
+    return unit_ids
+
+
+def merge_intervals(intervals, start=None, end=None):
+    """
+    Coalesces [start, end) intervals that are already sorted by start date.
+    Overlapping and touching ranges are joined, and everything is clipped to
+    the optional window.
+    """
+    merged = []
+    for interval_start, interval_end in intervals:
+        if start and interval_start < start:
+            interval_start = start
+        if end and interval_end > end:
+            interval_end = end
+        if interval_start >= interval_end:
+            continue
+
+        if merged and interval_start <= merged[-1][1]:
+            if interval_end > merged[-1][1]:
+                merged[-1][1] = interval_end
+        else:
+            merged.append([interval_start, interval_end])
+    return [tuple(interval) for interval in merged]
+
+
+def get_bulk_unavailable_ranges(unit_ids, start=None, end=None):
+    """
+    Returns {unit_id: [(start, end), ...]} for many units at once using two
+    set-based queries in total, one over Booking and one over BlockedDate.
+
+    Rows come back sorted by (unit_id, start) from the database, so the two
+    streams are interleaved with heapq.merge and coalesced unit by unit.
+    """
+    unit_ids = list(unit_ids)
+    ranges = {unit_id: [] for unit_id in unit_ids}
+    if not unit_ids:
+        return ranges
+
+    bookings = Booking.objects.filter(unit_id__in=unit_ids, status__in=BLOCKING_BOOKING_STATUSES)
+    blocks = BlockedDate.objects.filter(unit_id__in=unit_ids)
+    if start:
+        bookings = bookings.filter(check_out__gt=start)
+        blocks = blocks.filter(end_date__gte=start)
+    if end:
+        bookings = bookings.filter(check_in__lt=end)
+        blocks = blocks.filter(start_date__lt=end)
+
+    booked = bookings.order_by('unit_id', 'check_in').values_list('unit_id', 'check_in', 'check_out')
+    blocked = (
+        (unit_id, block_start, block_end + ONE_DAY)
+        for unit_id, block_start, block_end in blocks.order_by('unit_id', 'start_date').values_list(
+            'unit_id', 'start_date', 'end_date'
+        )
+    )
+    for unit_id, rows in groupby(heapq.merge(booked, blocked), key=itemgetter(0)):
+        ranges[unit_id] = merge_intervals(((s, e) for _, s, e in rows), start, end)
+    return ranges
+
+
+def get_unavailable_ranges(unit_id, start=None, end=None):
+    """
+    Returns the merged [start, end) ranges during which a single unit is
+    booked or blocked, optionally limited to a window.
+    """
+    return get_bulk_unavailable_ranges([unit_id], start, end)[unit_id]
+
+
+def serialize_ranges(ranges):
+    """Formats (start, end) date tuples for the API response."""
+    return [{'start': s.isoformat(), 'end': e.isoformat()} for s, e in ranges]
@@ -0,0 +1,141 @@
+# In apartments/cache.py
+
+"""
+Per-unit availability cache.
+
+Every unit has a version number in the cache. Cached ranges are stored under
+a key that embeds that version, so invalidating a unit is a single INCR and
+stale entries simply stop being read until they expire. Versions start from
+a nanosecond timestamp so an evicted counter can never be re-created with a
+number that points at old data.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.conditional import bump_versions
+from .availability import get_bulk_unavailable_ranges
+
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60 * 6  # 6 hours; versions make entries safe to keep
+
+VERSION_KEY = 'availability:unit:{unit_id}:version'
+RANGES_KEY = 'availability:unit:{unit_id}:v{version}:{start}:{end}'
+HITS_KEY = 'availability:stats:hits'
+MISSES_KEY = 'availability:stats:misses'
+
+
+def _incr(key, delta=1):
+    """Increments a counter that never expires, creating it if needed."""
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key was evicted between add() and incr().
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def get_unit_versions(unit_ids):
+    """Returns {unit_id: version}, initialising versions that are missing."""
+    keys = {unit_id: VERSION_KEY.format(unit_id=unit_id) for unit_id in unit_ids}
+    found = cache.get_many(keys.values())
+
+    missing = [key for key in keys.values() if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        found.update(cache.get_many(missing))
+
+    return {unit_id: found.get(key, 0) for unit_id, key in keys.items()}
+
+
+def bump_availability_version(unit_id):
+    """Invalidates every cached availability window for a unit."""
+    key = VERSION_KEY.format(unit_id=unit_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_cached_unavailable_ranges(unit_ids, start=None, end=None):
+    """
+    Cache-aware version of get_bulk_unavailable_ranges().
+    Only units that miss the cache are sent to the database, still in a
+    single pair of queries.
+    """
+    unit_ids = list(unit_ids)
+    versions = get_unit_versions(unit_ids)
+    keys = {
+        unit_id: RANGES_KEY.format(unit_id=unit_id, version=versions[unit_id], start=start, end=end)
+        for unit_id in unit_ids
+    }
+    cached = cache.get_many(keys.values())
+
+    ranges = {}
+    misses = []
+    for unit_id, key in keys.items():
+        if key in cached:
+            ranges[unit_id] = cached[key]
+        else:
+            misses.append(unit_id)
+
+    if misses:
+        fetched = get_bulk_unavailable_ranges(misses, start, end)
+        cache.set_many(
+            {keys[unit_id]: fetched[unit_id] for unit_id in misses},
+            timeout=AVAILABILITY_CACHE_TIMEOUT,
+        )
+        ranges.update(fetched)
+
+    hits = len(unit_ids) - len(misses)
+    if hits:
+        _incr(HITS_KEY, hits)
+    if misses:
+        _incr(MISSES_KEY, len(misses))
+
+    return {unit_id: ranges[unit_id] for unit_id in unit_ids}
+
+
+def get_cache_stats():
+    """Returns the shared hit/miss counters for all workers."""
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0,
+    }
+
+
+# --- Response version scopes (see core/conditional.py) ---
+# 'catalog' covers every property/unit list; 'property:<id>' and 'unit:<id>'
+# cover detail payloads; 'availability' covers date-filtered unit searches;
+# 'amenities' covers the amenity counts.
+CATALOG_SCOPE = 'catalog'
+AVAILABILITY_SCOPE = 'availability'
+AMENITIES_SCOPE = 'amenities'
+
+
+def property_scope(property_id):
+    return f'property:{property_id}'
+
+
+def unit_scope(unit_id):
+    return f'unit:{unit_id}'
+
+
+def bump_catalog(property_ids=(), unit_ids=()):
+    """
+    Invalidates cached list responses plus the given detail responses once
+    the transaction commits. A unit's property must be passed as well, since
+    property details embed their units.
+    """
+    scopes = [CATALOG_SCOPE]
+    scopes += [property_scope(property_id) for property_id in set(property_ids)]
+    scopes += [unit_scope(unit_id) for unit_id in set(unit_ids)]
+    transaction.on_commit(lambda: bump_versions(*scopes))
@@ -0,0 +1,56 @@
+# In apartments/calendar_simulator.py
+
+"""
+Local stand-in for other listing sites' calendar exports. Serves every .ics
+file in a directory at /<name>.ics with ETag/Last-Modified and answers
+revalidations with 304; edit the files to simulate changes.
+`run_calendar_simulator` serves it from the command line and the calendar
+import tests start it in a thread.
+"""
+
+import hashlib
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.utils.http import http_date
+
+
+class CalendarFeedSimulator(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, directory, log=None):
+        self.directory = os.path.abspath(directory)
+        self.log = log or (lambda message: None)
+        super().__init__(address, CalendarFeedRequestHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+class CalendarFeedRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        name = os.path.basename(self.path.split('?', 1)[0])
+        path = os.path.join(self.server.directory, name)
+        if not name.endswith('.ics') or not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as feed:
+            body = feed.read()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', http_date(os.path.getmtime(path)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        self.server.log(format % args)
@@ -0,0 +1,399 @@
+# In apartments/calendars.py
+
+"""
+iCal export and import for unit calendars.
+
+Export: every unit has a feed at /api/units/<id>/calendar.ics listing its
+booked and blocked nights as all-day events, so other listing sites can
+block the same nights. The URL carries a signed token instead of requiring
+a login, since calendar clients can't authenticate. Its ETag is built from
+the unit's availability version, so the frequent polls those clients make
+are answered with 304 without touching the database.
+
+Import: a host registers the other sites' feeds as CalendarFeed rows. The
+`sync_calendar_feeds` worker fetches due feeds with If-None-Match /
+If-Modified-Since, parses the events and diffs them by UID against the
+BlockedDate rows that feed created before. Only the difference is written,
+with one bulk INSERT, UPDATE and DELETE; blocks a host entered by hand
+(feed is null) are never touched.
+
+Feed URLs must resolve to public addresses, checked when the feed is saved
+and again before every request and redirect hop (see check_feed_url).
+"""
+
+import hashlib
+import ipaddress
+import logging
+import socket
+from datetime import date, datetime, timedelta
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from bookings.models import Booking
+from core.conditional import bump_versions
+from .cache import AVAILABILITY_SCOPE, bump_availability_version
+from .models import BlockedDate, CalendarFeed
+
+logger = logging.getLogger(__name__)
+
+ONE_DAY = timedelta(days=1)
+PRODID = '-//Airbnb Booking Platform//Unit Calendar//EN'
+UID_DOMAIN = 'airbnb-booking-platform'
+# Bookings in these states hold the unit's nights (as in availability.py)
+EXPORTED_BOOKING_STATUSES = [Booking.STATUS_CONFIRMED, Booking.STATUS_PENDING]
+# Past events are of no use to other calendars; keep a little history for late syncs.
+EXPORT_PAST_DAYS = 30
+MAX_FEED_EVENTS = 5_000
+MAX_LINE_OCTETS = 75
+# Dates from this one on are dropped: date.max leaves no room for the night after DTSTART.
+LATEST_EVENT_DATE = date(9999, 1, 1)
+# Redirects are followed by hand so every hop's address is checked.
+MAX_FEED_REDIRECTS = 3
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+_signer = signing.Signer(salt='apartments.calendar-feed')
+
+
+class CalendarFeedError(Exception):
+    """A feed could not be fetched or is not an iCalendar file."""
+
+
+# --- Export ---
+
+def calendar_token(unit_id):
+    """Secret for a unit's export URL; anyone holding it can read the calendar."""
+    return _signer.signature(str(unit_id))
+
+
+def check_calendar_token(unit_id, token):
+    return bool(token) and constant_time_compare(calendar_token(unit_id), token)
+
+
+def escape_text(value):
+    """Escapes a TEXT value (RFC 5545 section 3.3.11)."""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Splits a content line into 75-octet pieces, never inside a UTF-8 character."""
+    encoded = line.encode()
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line
+    pieces = []
+    limit = MAX_LINE_OCTETS
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # Back off continuation bytes
+        pieces.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+        limit = MAX_LINE_OCTETS - 1  # Continuation lines start with a space
+    return '\r\n '.join(pieces)
+
+
+def _event_lines(uid, start, end, summary, stamp):
+    return [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{UID_DOMAIN}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART;VALUE=DATE:{start:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{end:%Y%m%d}',
+        f'SUMMARY:{escape_text(summary)}',
+        'TRANSP:OPAQUE',
+        'END:VEVENT',
+    ]
+
+
+def render_calendar(unit, today=None):
+    """
+    The unit's busy nights as an iCalendar document. Events are all-day and
+    half-open, so DTEND is the first free night. Guests are never named.
+    """
+    today = today or date.today()
+    since = today - timedelta(days=EXPORT_PAST_DAYS)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(f"{unit.property.title} - {unit.unit_name_or_number}")}',
+    ]
+    bookings = (
+        Booking.objects.filter(unit=unit, status__in=EXPORTED_BOOKING_STATUSES, check_out__gt=since)
+        .order_by('check_in', 'id')
+        .values_list('id', 'check_in', 'check_out')
+    )
+    for booking_id, check_in, check_out in bookings:
+        lines += _event_lines(f'booking-{booking_id}', check_in, check_out, 'Reserved', stamp)
+    blocks = (
+        BlockedDate.objects.filter(unit=unit, end_date__gte=since)
+        .order_by('start_date', 'id')
+        .values_list('id', 'start_date', 'end_date')
+    )
+    for block_id, start_date, end_date in blocks:
+        # Blocks store the last night inclusively
+        lines += _event_lines(f'block-{block_id}', start_date, end_date + ONE_DAY, 'Not available', stamp)
+    lines.append('END:VCALENDAR')
+    return ''.join(fold_line(line) + '\r\n' for line in lines)
+
+
+# --- Import ---
+
+def unfold_lines(text):
+    """Joins folded content lines back together."""
+    lines = []
+    for raw in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if raw[:1] in (' ', '\t') and lines:
+            lines[-1] += raw[1:]
+        elif raw:
+            lines.append(raw)
+    return lines
+
+
+def unescape_text(value):
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, '')
+            result.append('\n' if escaped in ('n', 'N') else escaped)
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def parse_date_value(value):
+    """
+    Date of a DATE (20261020) or DATE-TIME (20261020T140000Z) value, or None
+    if it is unreadable or so far out that adding a night would overflow.
+    """
+    try:
+        parsed = datetime.strptime(value.strip()[:8], '%Y%m%d').date()
+    except ValueError:
+        return None
+    return parsed if parsed < LATEST_EVENT_DATE else None
+
+
+def parse_calendar(text, today=None):
+    """
+    Reads the events of an iCalendar document into
+    {uid: (start_date, end_date, summary)} with inclusive end dates, the way
+    BlockedDate stores them. Cancelled and finished events are left out;
+    recurrence rules are not expanded. Raises CalendarFeedError if the text
+    is not a calendar, so an error page never wipes a unit's imported blocks.
+    """
+    today = today or date.today()
+    lines = unfold_lines(text)
+    if not lines or lines[0].strip().upper() != 'BEGIN:VCALENDAR':
+        raise CalendarFeedError("The feed is not an iCalendar file.")
+
+    events = {}
+    event = None
+    for line in lines:
+        name, _, value = line.partition(':')
+        name = name.split(';', 1)[0].strip().upper()
+        if name == 'BEGIN' and value.strip().upper() == 'VEVENT':
+            event = {}
+        elif name == 'END' and value.strip().upper() == 'VEVENT' and event is not None:
+            parsed = _event_nights(event)
+            if parsed and parsed[1] >= today:
+                uid = event.get('UID') or hashlib.sha1(repr(parsed).encode()).hexdigest()
+                events.setdefault(uid[:255], parsed)
+                if len(events) > MAX_FEED_EVENTS:
+                    raise CalendarFeedError(f"The feed has more than {MAX_FEED_EVENTS} upcoming events.")
+            event = None
+        elif event is not None and name in ('UID', 'DTSTART', 'DTEND', 'SUMMARY', 'STATUS'):
+            event.setdefault(name, value.strip())
+    return events
+
+
+def _event_nights(event):
+    """(first night, last night, summary) of a parsed VEVENT, or None if unusable."""
+    if event.get('STATUS', '').upper() == 'CANCELLED':
+        return None
+    start = parse_date_value(event.get('DTSTART', ''))
+    if start is None:
+        return None
+    end = parse_date_value(event.get('DTEND', '')) or start + ONE_DAY
+    # DTEND is exclusive; a same-day event (or a timed one ending that day) still takes the night
+    end = max(end, start + ONE_DAY)
+    summary = unescape_text(event.get('SUMMARY', ''))
+    return start, end - ONE_DAY, summary
+
+
+def check_feed_url(url):
+    """
+    Raises CalendarFeedError unless `url` is http(s) and its host resolves
+    only to public addresses. Feeds are fetched server-side, so a link to
+    loopback, a private network or the cloud metadata service (169.254/16)
+    would let a host read internal endpoints back through the imported blocks.
+    """
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ('http', 'https') or not parts.hostname:
+        raise CalendarFeedError("Use an http:// or https:// calendar link.")
+    try:
+        port = parts.port or (443 if parts.scheme.lower() == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)}
+    except (OSError, ValueError, UnicodeError) as exc:
+        raise CalendarFeedError(f"Could not resolve {parts.hostname}.") from exc
+    if settings.CALENDAR_FEED_ALLOW_PRIVATE_HOSTS:
+        return
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%', 1)[0])
+        if getattr(ip, 'ipv4_mapped', None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise CalendarFeedError(f"{parts.hostname} is not a public address.")
+
+
+def fetch_feed(feed):
+    """
+    Downloads a feed, sending the validators from the last fetch. Returns
+    (text, etag, last_modified), or None if the feed is unchanged (304).
+    The address is checked before each request, redirects included.
+    """
+    headers = {'Accept': 'text/calendar, */*;q=0.5'}
+    if feed.etag:
+        headers['If-None-Match'] = feed.etag
+    if feed.last_modified:
+        headers['If-Modified-Since'] = feed.last_modified
+    url = feed.url
+    try:
+        for _ in range(MAX_FEED_REDIRECTS + 1):
+            check_feed_url(url)
+            with requests.get(url, headers=headers, timeout=settings.CALENDAR_FEED_TIMEOUT,
+                              stream=True, allow_redirects=False) as response:
+                if response.status_code in REDIRECT_STATUSES and response.headers.get('Location'):
+                    url = urljoin(url, response.headers['Location'])
+                    continue
+                if response.status_code == 304:
+                    return None
+                response.raise_for_status()
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body += chunk
+                    if len(body) > settings.CALENDAR_FEED_MAX_BYTES:
+                        raise CalendarFeedError(f"The feed is larger than {settings.CALENDAR_FEED_MAX_BYTES} bytes.")
+                # iCalendar is UTF-8 (RFC 5545); requests would guess Latin-1 for text/* without a charset
+                text = bytes(body).decode('utf-8', errors='replace')
+                return text, response.headers.get('ETag', '')[:255], response.headers.get('Last-Modified', '')[:64]
+    except requests.RequestException as exc:
+        raise CalendarFeedError(str(exc)) from exc
+    raise CalendarFeedError(f"The feed redirected more than {MAX_FEED_REDIRECTS} times.")
+
+
+def apply_feed_events(feed, events):
+    """
+    Makes the feed's blocks match `events` ({uid: (start, end, summary)}).
+    Returns (created, updated, deleted) counts.
+    """
+    existing = {block.external_uid: block for block in BlockedDate.objects.filter(feed=feed)}
+    to_create = []
+    to_update = []
+    for uid, (start_date, end_date, summary) in events.items():
+        reason = (summary or feed.name or 'Imported')[:255]
+        block = existing.pop(uid, None)
+        if block is None:
+            to_create.append(BlockedDate(
+                unit_id=feed.unit_id, feed=feed, external_uid=uid,
+                start_date=start_date, end_date=end_date, reason=reason,
+            ))
+        elif (block.start_date, block.end_date, block.reason) != (start_date, end_date, reason):
+            block.start_date, block.end_date, block.reason = start_date, end_date, reason
+            to_update.append(block)
+    stale_ids = [block.pk for block in existing.values()]
+
+    if to_create:
+        BlockedDate.objects.bulk_create(to_create)
+    if to_update:
+        BlockedDate.objects.bulk_update(to_update, ['start_date', 'end_date', 'reason'])
+    if stale_ids:
+        BlockedDate.objects.filter(pk__in=stale_ids).delete()
+
+    if to_create or to_update or stale_ids:
+        # bulk_create/bulk_update send no signals; invalidate as invalidate_unit_availability would
+        unit_id = feed.unit_id
+        transaction.on_commit(lambda: bump_availability_version(unit_id))
+        transaction.on_commit(lambda: bump_versions(AVAILABILITY_SCOPE))
+    return len(to_create), len(to_update), len(stale_ids)
+
+
+def _record_error(feed, message):
+    feed.last_error = message[:1000]
+    CalendarFeed.objects.filter(pk=feed.pk).update(last_error=feed.last_error)
+
+
+def sync_feed(feed, now=None):
+    """
+    Fetches one feed and applies its changes. The fetch runs outside any
+    transaction; only the diff and the feed's new state are written in one.
+    Every failure is recorded on the feed, which keeps its blocks until a
+    later fetch succeeds. Returns (created, updated, deleted).
+    """
+    now = now or timezone.now()
+    changes = (0, 0, 0)
+    try:
+        fetched = fetch_feed(feed)
+        with transaction.atomic():
+            if fetched is not None:
+                text, etag, last_modified = fetched
+                changes = apply_feed_events(feed, parse_calendar(text, today=timezone.localdate(now)))
+                feed.etag, feed.last_modified = etag, last_modified
+            feed.last_error = ''
+            feed.last_synced_at = now
+            feed.save(update_fields=['etag', 'last_modified', 'last_error', 'last_synced_at'])
+    except CalendarFeedError as exc:
+        logger.warning("Calendar feed %s failed: %s", feed.pk, exc)
+        _record_error(feed, str(exc))
+    except Exception as exc:
+        # A parser bug or database error in one feed must not stop the others
+        logger.exception("Calendar feed %s could not be synced", feed.pk)
+        _record_error(feed, f"Could not import the feed ({type(exc).__name__}).")
+    return changes
+
+
+def claim_due_feeds(batch_size, now):
+    """
+    Claims up to `batch_size` due feeds and schedules their next sync in one
+    short transaction, so the row locks are never held across a fetch and a
+    feed that keeps failing still moves to the back of the queue.
+    """
+    with transaction.atomic():
+        feeds = list(
+            CalendarFeed.objects.select_for_update(skip_locked=True)
+            .filter(next_sync_at__lte=now)
+            .order_by('next_sync_at', 'id')[:batch_size]
+        )
+        if feeds:
+            next_sync_at = now + timedelta(minutes=settings.CALENDAR_SYNC_INTERVAL_MINUTES)
+            CalendarFeed.objects.filter(pk__in=[feed.pk for feed in feeds]).update(next_sync_at=next_sync_at)
+            for feed in feeds:
+                feed.next_sync_at = next_sync_at
+    return feeds
+
+
+def sync_due_feeds(batch_size=10):
+    """
+    Syncs one batch of feeds whose next_sync_at has passed and returns how
+    many were handled. Claiming uses SKIP LOCKED so several workers can
+    share the feeds.
+    """
+    now = timezone.now()
+    feeds = claim_due_feeds(batch_size, now)
+    for feed in feeds:
+        created, updated, deleted = sync_feed(feed, now)
+        if created or updated or deleted:
+            logger.info("Calendar feed %s: %s created, %s updated, %s deleted", feed.pk, created, updated, deleted)
+    return len(feeds)
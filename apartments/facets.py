@@ -0,0 +1,136 @@
+# In apartments/facets.py
+
+"""
+Faceted counts for unit search.
+
+Every facet is counted in one statement: the filtered unit queryset is
+reduced to one row of facet values per unit, and the outer query groups it
+by GROUPING SETS, one set per facet plus the grand total. Results are cached
+under a key built from the normalised filters and the catalog/availability
+version stamps, so any change to the data simply stops old entries from
+being read.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, CharField, F, Value, When
+
+from core.conditional import get_versions
+
+FACETS_CACHE_TIMEOUT = 60 * 10  # Versions make entries safe; this only bounds memory
+FACETS_KEY = 'facets:units:{versions}:{filters}'
+
+# (label, lower bound inclusive, upper bound exclusive or None)
+BEDROOM_BUCKETS = [('1', 0, 2), ('2', 2, 3), ('3', 3, 4), ('4+', 4, None)]
+GUEST_BUCKETS = [('1-2', 0, 3), ('3-4', 3, 5), ('5-6', 5, 7), ('7+', 7, None)]
+PRICE_BANDS = [
+    ('0-5000', 0, 5000),
+    ('5000-10000', 5000, 10000),
+    ('10000-20000', 10000, 20000),
+    ('20000-40000', 20000, 40000),
+    ('40000+', 40000, None),
+]
+
+# Filters that change the order of results but not which units match.
+IGNORED_FILTERS = {'ordering'}
+
+
+def bucket(field, buckets):
+    """CASE expression labelling `field` with the bucket it falls in."""
+    whens = [
+        When(**{f'{field}__lt': upper}, then=Value(label)) if upper is not None else When(
+            **{f'{field}__gte': lower}, then=Value(label)
+        )
+        for label, lower, upper in buckets
+    ]
+    return Case(*whens, output_field=CharField())
+
+
+# facet name -> expression over Unit, and fixed buckets (None: values as found)
+FACETS = {
+    'city': (F('property__city'), None),
+    'bedrooms': (bucket('bedrooms', BEDROOM_BUCKETS), BEDROOM_BUCKETS),
+    'guests': (bucket('max_guests', GUEST_BUCKETS), GUEST_BUCKETS),
+    'price': (bucket('price_per_night', PRICE_BANDS), PRICE_BANDS),
+}
+
+
+def facet_counts(queryset):
+    """
+    Counts units per value of every facet in a single GROUPING SETS query.
+    Returns {'count': total, 'facets': {name: [{'value', 'count'}, ...]}};
+    bucketed facets list every bucket in order, cities come busiest first.
+    """
+    names = list(FACETS)
+    rows = queryset.order_by().values(**{f'facet_{name}': expression for name, (expression, _) in FACETS.items()})
+    inner_sql, params = rows.query.sql_with_params()
+    columns = ', '.join(connection.ops.quote_name(f'facet_{name}') for name in names)
+    sets = ', '.join(f'({connection.ops.quote_name(f"facet_{name}")})' for name in names)
+    sql = (
+        f'SELECT {columns}, GROUPING({columns}), COUNT(*) '
+        f'FROM ({inner_sql}) AS facet_rows GROUP BY GROUPING SETS ({sets}, ())'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        results = cursor.fetchall()
+
+    total = 0
+    found = {name: {} for name in names}
+    for row in results:
+        values, grouping, count = row[:len(names)], row[len(names)], row[-1]
+        if grouping == 2 ** len(names) - 1:
+            # Grouped by nothing: the grand total
+            total = count
+            continue
+        # GROUPING() sets a bit for every column that is *not* grouped; the first column is the highest bit
+        index = next(i for i in range(len(names)) if not grouping & (1 << (len(names) - 1 - i)))
+        found[names[index]][values[index]] = count
+
+    facets = {}
+    for name, (_, buckets) in FACETS.items():
+        if buckets is None:
+            ranked = sorted(found[name].items(), key=lambda item: (-item[1], item[0]))
+            facets[name] = [{'value': value, 'count': count} for value, count in ranked]
+        else:
+            facets[name] = [{'value': label, 'count': found[name].get(label, 0)} for label, _, _ in buckets]
+    return {'count': total, 'facets': facets}
+
+
+def normalize_filters(cleaned_data):
+    """
+    Canonical form of a search's filters: only those that are set and affect
+    which units match, as sorted strings, with search text case-folded.
+    """
+    normalized = {}
+    for name, value in cleaned_data.items():
+        if name in IGNORED_FILTERS or value is None or value == '':
+            continue
+        if name == 'search':
+            value = ' '.join(value.lower().split())
+        elif hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif hasattr(value, 'normalize'):
+            value = format(value.normalize(), 'f')  # Decimal('10.0') and Decimal('10') are the same filter
+        normalized[name] = str(value)
+    return dict(sorted(normalized.items()))
+
+
+def get_facets(filterset, scopes):
+    """
+    Facet counts for a valid UnitFilter, cached per normalised filter set and
+    the current versions of `scopes` (see apartments/cache.py).
+    """
+    filters = json.dumps(normalize_filters(filterset.form.cleaned_data), separators=(',', ':'))
+    versions = get_versions(scopes)
+    key = FACETS_KEY.format(
+        versions='.'.join(str(versions[scope]) for scope in sorted(versions)),
+        filters=hashlib.sha1(filters.encode()).hexdigest(),
+    )
+    facets = cache.get(key)
+    if facets is None:
+        facets = facet_counts(filterset.qs)
+        cache.set(key, facets, timeout=FACETS_CACHE_TIMEOUT)
+    return facets
@@ -3,84 +3,186 @@
 from django_filters import rest_framework as filters
 from .models import Property, Unit, BlockedDate
 from bookings.models import Booking
-from django.db.models import Q
-from datetime import datetime
+from django.db.models import Exists, F, OuterRef
+from rest_framework.exceptions import ValidationError
+from .amenities import parse_amenities
+from .geo import DEFAULT_RADIUS_KM, MAX_RADIUS_KM, in_bbox, parse_bbox, parse_point, within_radius
+from .pricing import MAX_QUOTE_NIGHTS, annotate_stay_price
+from .search import search_properties
 
+# Best rated first, unrated last; matches the *_rating_idx indexes
+BY_RATING = (F('rating_avg').desc(nulls_last=True), 'id')
+
+
+class OrderingMixin:
+    """
+    `?ordering=` for FilterSets. Each subclass maps choice names to
+    order_by() arguments in ORDERINGS; the filter is declared last so it
+    overrides the relevance order a keyword search applies.
+    """
+    ORDERINGS = {}
+
+    def order_queryset(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
+
+
+class GeoFilterMixin(filters.FilterSet):
+    """
+    Map filters for FilterSets over Property (GEO_PREFIX = '') or models
+    related to it (e.g. 'property__'):
+    `bbox=south,west,north,east` keeps what lies inside the box, and
+    `near=lat,lng` with `radius_km` keeps what lies within the radius,
+    nearest first. Both are served by the geohash index (apartments/geo.py).
+    """
+    GEO_PREFIX = ''
+
+    bbox = filters.CharFilter(method='filter_by_bbox', label="Bounding box: south,west,north,east")
+    near = filters.CharFilter(method='filter_by_radius', label="Centre point: latitude,longitude")
+    radius_km = filters.NumberFilter(
+        method='filter_by_radius', min_value=0, max_value=MAX_RADIUS_KM,
+        label=f"Radius around `near` in km (default {DEFAULT_RADIUS_KM})",
+    )
+
+    def filter_by_bbox(self, queryset, name, value):
+        return in_bbox(queryset, parse_bbox(value, name), self.GEO_PREFIX)
+
+    def filter_by_radius(self, queryset, name, value):
+        # near and radius_km both route here; apply the filter only once.
+        if name != 'near':
+            return queryset
+        latitude, longitude = parse_point(value, name)
+        radius_km = self.form.cleaned_data.get('radius_km')
+        if radius_km is None:  # An explicit 0 is a valid radius
+            radius_km = DEFAULT_RADIUS_KM
+        return within_radius(queryset, latitude, longitude, float(radius_km), self.GEO_PREFIX)
+
+
+class PropertyFilter(OrderingMixin, GeoFilterMixin):
+    ORDERINGS = {
+        'rating': BY_RATING,
+        'newest': ('-created_at', '-id'),
+    }
+
+    search = filters.CharFilter(method='filter_by_keyword', label="Search by city, property title, address or description")
+    min_rating = filters.NumberFilter(field_name='rating_avg', lookup_expr='gte')
+    ordering = filters.ChoiceFilter(method='order_queryset', choices=[(key, key) for key in ORDERINGS])
 
-class PropertyFilter(filters.FilterSet):
-    search = filters.CharFilter(method='filter_by_keyword', label="Search by city, property title, or address")
-    
     # You could add other property-level filters here later, e.g., filter by amenities_available
     
     class Meta:
         model = Property
-        fields = ['search']
+        fields = ['search', 'min_rating', 'bbox', 'near', 'radius_km', 'ordering']
 
     def filter_by_keyword(self, queryset, name, value):
-        return queryset.filter(
-            Q(title__icontains=value) |
-            Q(city__icontains=value) |
-            Q(address__icontains=value)
-        )
-class UnitFilter(filters.FilterSet):
+        """Full-text, prefix-matching search, most relevant properties first."""
+        return search_properties(queryset, value)
+class UnitFilter(OrderingMixin, GeoFilterMixin):
     """
     FilterSet for the Unit model to enable searching and filtering.
     """
+    GEO_PREFIX = 'property__'
+    ORDERINGS = {
+        'rating': BY_RATING,
+        'price': ('price_per_night', 'id'),
+        '-price': ('-price_per_night', '-id'),
+        # Need check_in/check_out; see filter_queryset()
+        'total_price': ('total_price', 'id'),
+        '-total_price': ('-total_price', '-id'),
+    }
+    STAY_PRICE_FILTERS = ('min_total', 'max_total')
+
     # Filter by properties of the parent Property
     city = filters.CharFilter(field_name='property__city', lookup_expr='icontains')
-    search = filters.CharFilter(method='filter_by_keyword', label="Search by city, property title, or address")
+    search = filters.CharFilter(method='filter_by_keyword', label="Search by city, property title, address or description")
     # Filter by properties of the Unit itself
     min_price = filters.NumberFilter(field_name='price_per_night', lookup_expr='gte')
     max_price = filters.NumberFilter(field_name='price_per_night', lookup_expr='lte')
     min_guests = filters.NumberFilter(field_name='max_guests', lookup_expr='gte')
     bedrooms = filters.NumberFilter(field_name='bedrooms', lookup_expr='gte')
+    min_rating = filters.NumberFilter(field_name='rating_avg', lookup_expr='gte')
+    amenities = filters.CharFilter(method='filter_by_amenities', label="Units offering all of these, e.g. wifi,pool")
+    # Total for the requested stay, discounts included
+    min_total = filters.NumberFilter(field_name='total_price', lookup_expr='gte')
+    max_total = filters.NumberFilter(field_name='total_price', lookup_expr='lte')
     
     # Advanced availability filter
     check_in = filters.DateFilter(method='filter_by_availability')
     check_out = filters.DateFilter(method='filter_by_availability')
+
+    ordering = filters.ChoiceFilter(method='order_queryset', choices=[(key, key) for key in ORDERINGS])
     
     class Meta:
         model = Unit
-        fields = ['search', 'city', 'min_price', 'max_price', 'min_guests', 'bedrooms', 'check_in', 'check_out']
+        fields = [
+            'search', 'city', 'min_price', 'max_price', 'min_guests', 'bedrooms', 'min_rating', 'amenities',
+            'min_total', 'max_total', 'check_in', 'check_out', 'bbox', 'near', 'radius_km', 'ordering',
+        ]
 
 
-    def filter_by_keyword(self, queryset, name, value):
+    def filter_queryset(self, queryset):
         """
-        Search for a keyword in property title, city, and address.
-        Uses Q objects for a complex OR query.
+        With both check_in and check_out, every unit is annotated with
+        `nights` and the `total_price` of that stay (apartments/pricing.py)
+        before the filters run, so min_total/max_total and
+        ordering=total_price are evaluated in the database.
         """
-        return queryset.filter(
-            Q(property__title__icontains=value) |
-            Q(property__city__icontains=value) |
-            Q(property__address__icontains=value)
+        check_in = self.form.cleaned_data.get('check_in')
+        check_out = self.form.cleaned_data.get('check_out')
+        if check_in and check_out and check_in < check_out:
+            if (check_out - check_in).days > MAX_QUOTE_NIGHTS:
+                raise ValidationError({'check_out': f"Stays are limited to {MAX_QUOTE_NIGHTS} nights."})
+            queryset = annotate_stay_price(queryset, check_in, check_out)
+        elif self.uses_stay_price():
+            raise ValidationError({'check_in': "check_in and check_out are required to filter or sort by total price."})
+        return super().filter_queryset(queryset)
+
+    def filter_by_amenities(self, queryset, name, value):
+        """JSONB containment, answered by the unit_amenities_idx GIN index."""
+        amenities = parse_amenities(value, name)
+        return queryset.filter(amenities__contains=amenities) if amenities else queryset
+
+    def uses_stay_price(self):
+        data = self.form.cleaned_data
+        ordering = data.get('ordering') or ''
+        return ordering.lstrip('-') == 'total_price' or any(
+            data.get(name) is not None for name in self.STAY_PRICE_FILTERS
         )
+
+    def filter_by_keyword(self, queryset, name, value):
+        """
+        Full-text search over the parent property's title, city, address and
+        description. Matches word prefixes and ranks the best matches first.
+        """
+        return search_properties(queryset, value, prefix='property__')
     def filter_by_availability(self, queryset, name, value):
-        check_in_str = self.data.get('check_in')
-        check_out_str = self.data.get('check_out')
-
-        if check_in_str and check_out_str:
-            check_in_date = datetime.strptime(check_in_str, '%Y-%m-%d').date()
-            check_out_date = datetime.strptime(check_out_str, '%Y-%m-%d').date()
-
-            # --- LOGIC for finding unavailable units ---
-
-            # 1. Find units with conflicting BOOKINGS (this is our existing logic)
-            booked_unit_ids = Booking.objects.filter(
-                status__in=[Booking.STATUS_CONFIRMED, Booking.STATUS_PENDING],
-                check_in__lt=check_out_date,
-                check_out__gt=check_in_date
-            ).values_list('unit_id', flat=True)
-
-            # 2. Find units with conflicting BLOCKED DATES (this is the new logic)
-            blocked_unit_ids = BlockedDate.objects.filter(
-                start_date__lt=check_out_date,
-                end_date__gt=check_in_date
-            ).values_list('unit_id', flat=True)
-
-            # 3. Combine the two lists of unavailable unit IDs
-            unavailable_unit_ids = set(booked_unit_ids) | set(blocked_unit_ids)
-
-            # --- 4. Exclude all unavailable units from the final queryset ---
-            return queryset.exclude(id__in=unavailable_unit_ids)
-        
-        return queryset
\ No newline at end of file
+        """
+        Excludes units that have a pending/confirmed booking or a host block
+        overlapping the requested stay. Both checks are correlated NOT EXISTS
+        subqueries, so the whole anti-join runs inside the database instead of
+        shipping unit ids back and forth.
+        """
+        # check_in and check_out both route here; apply the filter only once.
+        if name != 'check_in':
+            return queryset
+
+        check_in_date = value
+        check_out_date = self.form.cleaned_data.get('check_out')
+        if not check_out_date:
+            return queryset
+
+        # Bookings occupy [check_in, check_out)
+        conflicting_bookings = Booking.objects.filter(
+            unit=OuterRef('pk'),
+            status__in=[Booking.STATUS_CONFIRMED, Booking.STATUS_PENDING],
+            check_in__lt=check_out_date,
+            check_out__gt=check_in_date
+        )
+
+        # Blocks occupy [start_date, end_date], end date inclusive
+        conflicting_blocks = BlockedDate.objects.filter(
+            unit=OuterRef('pk'),
+            start_date__lt=check_out_date,
+            end_date__gte=check_in_date
+        )
+
+        return queryset.filter(~Exists(conflicting_bookings), ~Exists(conflicting_blocks))
@@ -0,0 +1,221 @@
+# In apartments/geo.py
+
+"""
+Map search over property coordinates without PostGIS.
+
+Every property with coordinates also stores its geohash: a base-32 string
+whose prefixes name ever smaller grid cells, so points that are close
+together share a prefix. A bounding box is covered by a handful of cells and
+each cell becomes a `geohash LIKE 'abc%'` prefix scan on a plain B-tree
+index (varchar_pattern_ops). The exact latitude/longitude bounds, and for
+radius searches the great-circle distance, are then checked on the few rows
+those scans return.
+
+Map clustering uses the same cells: grouping by a geohash prefix gives one
+bucket per grid cell.
+"""
+
+import math
+
+from django.db.models import Avg, Count, F, FloatField, Min, Q
+from django.db.models.functions import ACos, Cos, Greatest, Least, Radians, Sin, Substr
+from rest_framework.exceptions import ValidationError
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_LENGTH = 12  # About 4cm; far finer than any query needs
+
+EARTH_RADIUS_KM = 6371.0088
+# On the same sphere distance_expression() uses, so radius boxes are never too small
+KM_PER_DEGREE_LATITUDE = math.pi * EARTH_RADIUS_KM / 180
+
+# A bounding box is covered by at most this many cells; more means coarser cells.
+MAX_COVER_CELLS = 16
+# Upper bound on clusters across a map viewport.
+MAX_CLUSTER_CELLS = 64
+MAX_RADIUS_KM = 500
+DEFAULT_RADIUS_KM = 10
+
+
+def encode_geohash(latitude, longitude, length=GEOHASH_LENGTH):
+    """Returns the geohash of a point, e.g. (-1.2864, 36.8172) -> 'kzf0tvc6nvwj'."""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # Bits alternate longitude, latitude, starting with longitude
+    while len(chars) < length:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell of the given length."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _grid_span(low, high, origin, size):
+    """First and last grid index a [low, high] interval touches."""
+    return math.floor((low - origin) / size), math.floor((high - origin) / size)
+
+
+def count_cells(bbox, precision):
+    south, west, north, east = bbox
+    height, width = cell_size(precision)
+    first_row, last_row = _grid_span(south, north, -90.0, height)
+    first_col, last_col = _grid_span(west, east, -180.0, width)
+    return (last_row - first_row + 1) * (last_col - first_col + 1)
+
+
+def finest_precision(bbox, max_cells):
+    """Longest geohash whose cells cover `bbox` in at most `max_cells` cells."""
+    precision = 1
+    while precision < GEOHASH_LENGTH and count_cells(bbox, precision + 1) <= max_cells:
+        precision += 1
+    return precision
+
+
+def cover_cells(bbox, max_cells=MAX_COVER_CELLS):
+    """Returns the geohash prefixes of the cells that together cover `bbox`."""
+    south, west, north, east = bbox
+    precision = finest_precision(bbox, max_cells)
+    height, width = cell_size(precision)
+    first_row, last_row = _grid_span(south, north, -90.0, height)
+    first_col, last_col = _grid_span(west, east, -180.0, width)
+    cells = []
+    for row in range(first_row, last_row + 1):
+        for col in range(first_col, last_col + 1):
+            # Encode the centre of each cell; clamp rows/cols that hit the poles or antimeridian
+            latitude = min(-90.0 + (row + 0.5) * height, 90.0)
+            longitude = min(-180.0 + (col + 0.5) * width, 180.0)
+            cells.append(encode_geohash(latitude, longitude, precision))
+    return list(dict.fromkeys(cells))
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """(south, west, north, east) of the smallest box holding a circle."""
+    lat_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    south, north = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    # Degrees of longitude shrink towards the poles
+    cos_latitude = math.cos(math.radians(max(abs(south), abs(north))))
+    if cos_latitude < 1e-6:
+        return south, -180.0, north, 180.0
+    lng_delta = radius_km / (KM_PER_DEGREE_LATITUDE * cos_latitude)
+    return south, max(longitude - lng_delta, -180.0), north, min(longitude + lng_delta, 180.0)
+
+
+def distance_expression(latitude, longitude, prefix=''):
+    """
+    Great-circle distance in km from a point to each row's coordinates,
+    using the spherical law of cosines. `prefix` is the lookup path to the
+    Property, e.g. 'property__' for units.
+    """
+    row_lat = Radians(F(f'{prefix}latitude'), output_field=FloatField())
+    row_lng = Radians(F(f'{prefix}longitude'), output_field=FloatField())
+    lat, lng = math.radians(latitude), math.radians(longitude)
+    cosine = Sin(row_lat) * math.sin(lat) + Cos(row_lat) * math.cos(lat) * Cos(row_lng - lng)
+    # Rounding can push the cosine just past 1 for identical points
+    return ACos(Greatest(Least(cosine, 1.0), -1.0)) * EARTH_RADIUS_KM
+
+
+def _parse_floats(raw, count, param, message):
+    try:
+        values = [float(value) for value in raw.split(',')]
+    except ValueError:
+        values = []
+    if len(values) != count or not all(math.isfinite(value) for value in values):
+        raise ValidationError({param: message})
+    return values
+
+
+def parse_bbox(raw, param='bbox'):
+    """
+    Reads `south,west,north,east` (decimal degrees) into a tuple.
+    Boxes crossing the antimeridian are not supported.
+    """
+    south, west, north, east = _parse_floats(raw, 4, param, "Use south,west,north,east in decimal degrees.")
+    if not (-90 <= south <= north <= 90):
+        raise ValidationError({param: "Latitudes must satisfy -90 <= south <= north <= 90."})
+    if not (-180 <= west <= east <= 180):
+        raise ValidationError({param: "Longitudes must satisfy -180 <= west <= east <= 180."})
+    return south, west, north, east
+
+
+def parse_point(raw, param='near'):
+    """Reads `latitude,longitude` into a tuple."""
+    latitude, longitude = _parse_floats(raw, 2, param, "Use latitude,longitude in decimal degrees.")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({param: "Coordinates are out of range."})
+    return latitude, longitude
+
+
+def in_bbox(queryset, bbox, prefix=''):
+    """Filters to rows inside `bbox`, driven by geohash prefix scans."""
+    south, west, north, east = bbox
+    cells = Q()
+    for cell in cover_cells(bbox):
+        cells |= Q(**{f'{prefix}geohash__startswith': cell})
+    return queryset.filter(cells).filter(**{
+        f'{prefix}latitude__gte': south,
+        f'{prefix}latitude__lte': north,
+        f'{prefix}longitude__gte': west,
+        f'{prefix}longitude__lte': east,
+    })
+
+
+def within_radius(queryset, latitude, longitude, radius_km, prefix=''):
+    """
+    Filters to rows within `radius_km` of a point, nearest first, and
+    annotates `distance_km`.
+    """
+    queryset = in_bbox(queryset, bbox_around(latitude, longitude, radius_km), prefix)
+    return (
+        queryset.annotate(distance_km=distance_expression(latitude, longitude, prefix))
+        .filter(distance_km__lte=radius_km)
+        .order_by('distance_km', 'id')
+    )
+
+
+def cluster_counts(queryset, bbox):
+    """
+    Groups the properties inside `bbox` into grid cells sized so the
+    viewport holds at most MAX_CLUSTER_CELLS of them. Returns the geohash
+    precision used and, per cell, the count and mean position; single
+    properties also carry their id so clients can draw a pin.
+    """
+    precision = finest_precision(bbox, MAX_CLUSTER_CELLS)
+    rows = (
+        in_bbox(queryset, bbox)
+        .order_by()
+        .annotate(cell=Substr('geohash', 1, precision))
+        .values('cell')
+        .annotate(count=Count('id'), latitude=Avg('latitude'), longitude=Avg('longitude'), first_id=Min('id'))
+        .order_by('cell')
+    )
+    clusters = []
+    for row in rows:
+        cluster = {
+            'geohash': row['cell'],
+            'count': row['count'],
+            'latitude': round(float(row['latitude']), 6),
+            'longitude': round(float(row['longitude']), 6),
+        }
+        if row['count'] == 1:
+            cluster['id'] = row['first_id']
+        clusters.append(cluster)
+    return precision, clusters
@@ -2,18 +2,23 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .host_views import HostDashboardViewSet, BlockedDateViewSet, HostUnitImageViewSet, ReviewViewSet, UnitImageUploadView, HostUnitViewSet, HostBookingManageViewSet, HostAnalyticsView
+from .host_views import HostDashboardViewSet, BlockedDateViewSet, CalendarFeedViewSet, SeasonalRateViewSet, PriceOverrideViewSet, HostUnitImageViewSet, ReviewViewSet, UnitImageUploadView, HostUnitViewSet, HostBookingManageViewSet, HostAnalyticsView, BulkImageUploadView, ImageUploadViewSet
 
 router = DefaultRouter()
 router.register(r'dashboard', HostDashboardViewSet, basename='host-dashboard')
 router.register(r'blocked-dates', BlockedDateViewSet, basename='host-blocked-dates')
+router.register(r'seasonal-rates', SeasonalRateViewSet, basename='host-seasonal-rates')
+router.register(r'price-overrides', PriceOverrideViewSet, basename='host-price-overrides')
+router.register(r'calendar-feeds', CalendarFeedViewSet, basename='host-calendar-feeds')
 router.register(r'units', HostUnitViewSet, basename='host-units')
 router.register(r'unit-images', HostUnitImageViewSet, basename='host-unit-images')
 router.register(r'manage-bookings', HostBookingManageViewSet, basename='host-manage-bookings')
 router.register(r'reviews', ReviewViewSet, basename='review')
+router.register(r'image-uploads', ImageUploadViewSet, basename='host-image-uploads')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('units/<int:unit_pk>/add-image/', UnitImageUploadView.as_view(), name='unit-add-image'),
+    path('images/bulk/', BulkImageUploadView.as_view(), name='host-bulk-image-upload'),
     path('analytics/', HostAnalyticsView.as_view(), name='host-analytics'),
 ]
\ No newline at end of file
@@ -1,26 +1,45 @@
 # In apartments/host_views.py
 
-from rest_framework import viewsets, permissions, generics, exceptions, status
-from .models import Property, BlockedDate, Unit, UnitImage 
+from rest_framework import viewsets, permissions, generics, exceptions, status, mixins
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from .models import Property, BlockedDate, CalendarFeed, Unit, UnitImage, ImageUpload, SeasonalRate, PriceOverride
 from bookings.models import Booking
 from .serializers import ( 
     PropertyDetailSerializer, 
     BlockedDateSerializer,
+    CalendarFeedSerializer,
+    SeasonalRateSerializer,
+    PriceOverrideSerializer,
     UnitImageSerializer, 
     UnitImageUploadSerializer,
-    UnitSerializer
+    UnitSerializer,
+    PropertyImageSerializer,
+    BulkImageUploadSerializer,
+    ImageUploadSerializer,
 )
-from django.db.models.functions import TruncMonth
-
-from django.db.models import Sum, Avg, Count
+from .calendars import calendar_token
+from .uploads import (
+    UPLOAD_OFFSET_HEADER,
+    append_chunk,
+    bulk_create_images,
+    complete_upload,
+    discard_upload,
+    use_disk_upload_handlers,
+)
+from django.db.models import Sum, Count, Subquery, Value
+from bookings.models import BookingRollup
 from bookings.serializers import BookingSerializer, BookingStatusUpdateSerializer
 from core.permissions import IsHostUser
+from .filters import PropertyFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from reviews.models import Review         # 👈 1. Import Review
 from reviews.serializers import ReviewSerializer # 👈 2. Import ReviewSerializer
 from rest_framework.views import APIView
-from datetime import datetime
+from core.models import User
+from datetime import date
 
 class HostDashboardViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -29,15 +48,20 @@ class HostDashboardViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = PropertyDetailSerializer
     permission_classes = [IsHostUser]
+    # ?search=, ?min_rating= and ?ordering=rating for the host's own properties
+    filterset_class = PropertyFilter
+    # Properties, bookings and reviews all page newest-first with ?pagination=cursor
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        return Property.objects.filter(owner=self.request.user).prefetch_related('units__bookings')
+        return PropertyDetailSerializer.setup_eager_loading(
+            Property.objects.filter(owner=self.request.user)
+        )
 
     @action(detail=False, methods=['get'])
     def my_bookings(self, request):
-        host_properties = self.get_queryset()
-        bookings = Booking.objects.filter(
-            unit__property__in=host_properties
+        bookings = BookingSerializer.setup_eager_loading(
+            Booking.objects.filter(unit__property__owner=request.user)
         ).order_by('-created_at')
         page = self.paginate_queryset(bookings)
         if page is not None:
@@ -51,8 +75,9 @@ class HostDashboardViewSet(viewsets.ReadOnlyModelViewSet):
         Custom action to retrieve all reviews for properties
         owned by the current host.
         """
-        host_properties = Property.objects.filter(owner=request.user)
-        reviews = Review.objects.filter(property__in=host_properties).order_by('-created_at')
+        reviews = Review.objects.filter(
+            property__owner=request.user
+        ).select_related('user').order_by('-created_at')
 
         page = self.paginate_queryset(reviews)
         if page is not None:
@@ -74,6 +99,56 @@ class BlockedDateViewSet(viewsets.ModelViewSet):
         return BlockedDate.objects.filter(unit__property__owner=self.request.user)
 
 
+class SeasonalRateViewSet(viewsets.ModelViewSet):
+    """
+    Endpoint for hosts to manage seasonal rates for their units.
+    """
+    serializer_class = SeasonalRateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SeasonalRate.objects.filter(unit__property__owner=self.request.user)
+
+
+class PriceOverrideViewSet(viewsets.ModelViewSet):
+    """
+    Endpoint for hosts to manage per-night price overrides for their units.
+    """
+    serializer_class = PriceOverrideSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return PriceOverride.objects.filter(unit__property__owner=self.request.user)
+
+
+class CalendarFeedViewSet(viewsets.ModelViewSet):
+    """
+    Endpoint for hosts to manage the external calendars imported into their
+    units. Feeds are fetched by the `sync_calendar_feeds` worker.
+    """
+    serializer_class = CalendarFeedSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return CalendarFeed.objects.filter(unit__property__owner=self.request.user)
+
+    def perform_update(self, serializer):
+        feed = serializer.instance
+        if serializer.validated_data.get('url', feed.url) != feed.url:
+            # A new link starts over: drop the old validators and fetch it on the next pass
+            serializer.save(etag='', last_modified='', next_sync_at=timezone.now())
+        else:
+            serializer.save()
+
+    @action(detail=True, methods=['post'])
+    def sync(self, request, pk=None):
+        """Queues the feed for the worker's next pass instead of waiting for its interval."""
+        feed = self.get_object()
+        feed.next_sync_at = timezone.now()
+        feed.save(update_fields=['next_sync_at'])
+        return Response(self.get_serializer(feed).data, status=status.HTTP_202_ACCEPTED)
+
+
 class UnitImageUploadView(generics.CreateAPIView):
     """
     API endpoint for a host to upload an image for a unit they own.
@@ -97,6 +172,100 @@ class UnitImageUploadView(generics.CreateAPIView):
             )
             
         serializer.save(unit=unit)
+
+class BulkImageUploadView(generics.GenericAPIView):
+    """
+    Uploads many photos for one property or unit in a single multipart
+    request: `property` or `unit`, repeated `images` files and optional
+    matching `captions`. Files are streamed to disk while parsing rather
+    than held in memory.
+    """
+    serializer_class = BulkImageUploadSerializer
+    permission_classes = [IsHostUser]
+
+    def post(self, request, *args, **kwargs):
+        use_disk_upload_handlers(request)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        target = serializer.validated_data['target']
+        with transaction.atomic():
+            images = bulk_create_images(
+                target, serializer.validated_data['images'], serializer.validated_data.get('captions', [])
+            )
+        output_serializer = UnitImageSerializer if isinstance(target, Unit) else PropertyImageSerializer
+        return Response(
+            output_serializer(images, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class ImageUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                         mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable upload of a single large image.
+
+    POST creates a session from `property`/`unit`, `filename`, `size` and an
+    optional `caption`. Each PATCH sends the next chunk as the raw request
+    body with an `Upload-Offset` header. After a dropped connection, GET (or
+    HEAD) the session and resume from the returned offset. The PATCH that
+    delivers the last byte creates the image and returns it with 201.
+    """
+    serializer_class = ImageUploadSerializer
+    permission_classes = [IsHostUser]
+
+    def get_queryset(self):
+        return ImageUpload.objects.filter(owner=self.request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        upload = getattr(self, 'upload', None)
+        if upload is not None:
+            response[UPLOAD_OFFSET_HEADER] = str(upload.offset)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        self.upload = self.get_object()
+        return Response(self.get_serializer(self.upload).data)
+
+    def perform_create(self, serializer):
+        self.upload = serializer.save()
+
+    def partial_update(self, request, *args, **kwargs):
+        try:
+            offset = int(request.headers[UPLOAD_OFFSET_HEADER])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            raise exceptions.ValidationError({'detail': f"An integer {UPLOAD_OFFSET_HEADER} header is required."})
+
+        rejected = None
+        with transaction.atomic():
+            # Serialises concurrent chunks for the same upload, and its completion:
+            # the lock is held until the image exists and completed_at is set
+            self.upload = upload = self.get_queryset().select_for_update().get(pk=self.get_object().pk)
+            if upload.completed_at:
+                raise exceptions.ValidationError({'detail': "This upload is already complete."})
+            # An empty PATCH at the end retries a completion that failed
+            if length or upload.offset < upload.size:
+                append_chunk(upload, request.stream, offset, length)
+            if upload.offset < upload.size:
+                return Response(self.get_serializer(upload).data)
+            try:
+                image = complete_upload(upload)
+            except exceptions.ValidationError as exc:
+                # Not an image: let the discarded session commit before reporting it
+                rejected = exc
+        if rejected is not None:
+            raise rejected
+
+        output_serializer = UnitImageSerializer if upload.unit_id else PropertyImageSerializer
+        return Response(
+            output_serializer(image, context=self.get_serializer_context()).data, status=status.HTTP_201_CREATED
+        )
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+
 class HostUnitViewSet(viewsets.ModelViewSet):
     """
     ViewSet for hosts to perform CRUD operations on their own units.
@@ -117,6 +286,13 @@ class HostUnitViewSet(viewsets.ModelViewSet):
         if prop.owner != self.request.user:
             raise PermissionDenied("You do not own this property.")
         serializer.save()
+
+    @action(detail=True, methods=['get'], url_path='calendar-link')
+    def calendar_link(self, request, pk=None):
+        """Private iCal export URL of the unit, to paste into other listing sites."""
+        unit = self.get_object()
+        path = reverse('unit-calendar-feed', kwargs={'unit_id': unit.pk})
+        return Response({'url': request.build_absolute_uri(f'{path}?token={calendar_token(unit.pk)}')})
 class HostUnitImageViewSet(viewsets.ModelViewSet):
     """
     ViewSet for a host to manage images for their own units.
@@ -155,42 +331,63 @@ class HostAnalyticsView(APIView):
     permission_classes = [IsHostUser]
 
     def get(self, request, *args, **kwargs):
-        # Get all confirmed bookings for properties owned by this host
-        confirmed_bookings = Booking.objects.filter(
-            unit__property__owner=request.user,
-            status='confirmed'
+        # 1. Revenue, nights and the chart all come from the monthly rollups,
+        #    which hold one row per unit per month instead of every booking.
+        monthly_revenue = list(
+            BookingRollup.objects.filter(
+                host=request.user,
+                granularity=BookingRollup.GRANULARITY_MONTH,
+                bookings__gt=0  # Rows left empty after cancellations
+            ).values('period_start').annotate(
+                total=Sum('revenue'),
+                nights=Sum('nights')
+            ).order_by('period_start')
         )
+        total_revenue = sum(m['total'] for m in monthly_revenue)
+        total_nights = sum(m['nights'] for m in monthly_revenue)
 
-        # 1. Total Revenue
-        total_revenue = confirmed_bookings.aggregate(Sum('total_price'))['total_price__sum'] or 0
-
-        # 2. Active (Upcoming) Bookings Count
-        active_bookings_count = confirmed_bookings.filter(check_out__gte=datetime.today()).count()
-
-        # 3. Total Nights Booked
-        total_nights = sum([(b.check_out - b.check_in).days for b in confirmed_bookings])
-        monthly_revenue = confirmed_bookings.annotate(
-            month=TruncMonth('check_in') # Truncate the check_in date to the 1st of its month
-        ).values('month').annotate(
-            total=Sum('total_price') # Sum all prices for that month
-        ).order_by('month')
-        # 4. Average Guest Rating
-        avg_rating_query = Review.objects.filter(property__owner=request.user).aggregate(Avg('rating'))
-        average_rating = avg_rating_query['rating__avg'] or 0
-        chart_labels = [m['month'].strftime('%b %Y') for m in monthly_revenue]
+        # 2. The remaining counters are fetched together as scalar subqueries
+        counters = User.objects.filter(pk=request.user.pk).values(
+            total_properties=scalar_subquery(
+                Property.objects.filter(owner=request.user), Count('id')
+            ),
+            active_bookings_count=scalar_subquery(
+                Booking.objects.filter(
+                    unit__property__owner=request.user,
+                    status=Booking.STATUS_CONFIRMED,
+                    check_out__gte=date.today()
+                ),
+                Count('id')
+            ),
+            # Read from the per-property rating aggregates, not the Review table
+            rating_sum=scalar_subquery(Property.objects.filter(owner=request.user), Sum('rating_sum')),
+            rating_count=scalar_subquery(Property.objects.filter(owner=request.user), Sum('rating_count')),
+        ).get()
+        average_rating = counters['rating_sum'] / counters['rating_count'] if counters['rating_count'] else 0
+
+        chart_labels = [m['period_start'].strftime('%b %Y') for m in monthly_revenue]
         chart_data = [m['total'] for m in monthly_revenue]
         # Assemble the data
         data = {
-            'total_properties': Property.objects.filter(owner=request.user).count(),
+            'total_properties': counters['total_properties'],
             'total_revenue': total_revenue,
-            'active_bookings_count': active_bookings_count,
+            'active_bookings_count': counters['active_bookings_count'],
             'total_nights_booked': total_nights,
             'average_rating': round(average_rating, 2),
             'monthly_revenue_chart': {
                 'labels': chart_labels,
                 'data': chart_data
             }
-            # We can add monthly revenue data for charts here later
         }
 
-        return Response(data)
\ No newline at end of file
+        return Response(data)
+
+
+def scalar_subquery(queryset, aggregate):
+    """
+    Wraps an aggregate over `queryset` as a single-value subquery, so several
+    unrelated counters can be read in one round trip.
+    """
+    return Subquery(
+        queryset.order_by().annotate(_all=Value(1)).values('_all').annotate(value=aggregate).values('value')
+    )
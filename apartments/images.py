@@ -0,0 +1,324 @@
+# In apartments/images.py
+
+"""
+Image derivative pipeline for property and unit photos.
+
+Uploads are stored as-is and returned straight away. The `process_images`
+worker later reads each pending original, renders fixed-size renditions in
+WebP and JPEG in a process pool, and records the original's dimensions and
+size. Renditions are re-encoded from pixels only, so they never carry the
+camera's EXIF block (GPS position, device serial and so on); the EXIF
+orientation is applied first so portrait photos stay upright.
+
+Originals that carry EXIF, XMP, IPTC or a comment are re-encoded there too,
+upright and with only their colour profile. The clean copy becomes a new
+blob that the rows point at, and the uploaded one is left for
+`gc_media_blobs`. Until a row is processed, the API doesn't show its
+original's URL (see ProcessedImage.original_is_public).
+
+`render_image()` is a pure function of the file's bytes so it can run in a
+worker process without touching Django.
+"""
+
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.media import acquire_blobs, release_blobs
+from .cache import bump_catalog
+from .models import PropertyImage, Unit, UnitImage
+
+logger = logging.getLogger(__name__)
+
+# name -> (width, height, crop). Cropped renditions are exactly that size;
+# the others fit inside the box and are never upscaled.
+RENDITIONS = {
+    'thumb': (400, 300, True),
+    'medium': (1200, 900, False),
+}
+
+# format -> (file extension, Pillow save options)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+IMAGE_MODELS = (PropertyImage, UnitImage)
+
+# Image.info keys that carry camera, location or editing metadata
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop', 'iptc')
+
+# Pillow format -> (file extension, save options) for originals re-encoded
+# without metadata. Anything else is re-encoded losslessly as PNG.
+ORIGINAL_FORMATS = {
+    'JPEG': ('.jpg', {'format': 'JPEG', 'quality': 95}),
+    'MPO': ('.jpg', {'format': 'JPEG', 'quality': 95}),  # Multi-picture JPEG from phone cameras
+    'PNG': ('.png', {'format': 'PNG'}),
+    'WEBP': ('.webp', {'format': 'WEBP', 'quality': 95}),
+}
+FALLBACK_ORIGINAL_FORMAT = ('.png', {'format': 'PNG'})
+
+
+def has_metadata(image):
+    return any(key in image.info for key in METADATA_KEYS) or len(image.getexif()) > 0
+
+
+def encode_clean_original(image, source_format, icc_profile):
+    """The upright image in its own format with no metadata but its colour profile."""
+    extension, options = ORIGINAL_FORMATS.get(source_format, FALLBACK_ORIGINAL_FORMAT)
+    if options['format'] == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+    image = image.copy()
+    image.info = {}
+    buffer = io.BytesIO()
+    extra = {'icc_profile': icc_profile} if icc_profile else {}
+    image.save(buffer, **options, **extra)
+    return {'data': buffer.getvalue(), 'extension': extension}
+
+
+def render_image(data):
+    """
+    Renders every rendition of an image from its raw bytes. Returns
+    {'width', 'height', 'renditions': {name: {'width', 'height', fmt: bytes}},
+    'original': {'data', 'extension'} or None}, where 'original' is a copy
+    without metadata when the upload carries any.
+    Raises OSError/ValueError if the data is not a readable image.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        original.load()
+        strip = has_metadata(original)
+        source_format = original.format
+        image = ImageOps.exif_transpose(original)
+    # Dimensions as displayed, i.e. after applying the EXIF orientation
+    width, height = image.size
+    clean_original = (
+        encode_clean_original(image, source_format, image.info.get('icc_profile')) if strip else None
+    )
+
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    # Keep only the colour profile; everything else is metadata we don't ship.
+    icc_profile = image.info.get('icc_profile')
+    image.info = {}
+
+    renditions = {}
+    for name, (max_width, max_height, crop) in RENDITIONS.items():
+        if crop:
+            resized = ImageOps.fit(image, (max_width, max_height), Image.Resampling.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+        rendition = {'width': resized.width, 'height': resized.height}
+        for fmt, (_, options) in FORMATS.items():
+            output = resized
+            if fmt == 'jpeg' and resized.mode == 'RGBA':
+                # JPEG has no alpha channel; flatten onto white
+                output = Image.new('RGB', resized.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            extra = {'icc_profile': icc_profile} if icc_profile else {}
+            output.save(buffer, **options, **extra)
+            rendition[fmt] = buffer.getvalue()
+        renditions[name] = rendition
+
+    return {'width': width, 'height': height, 'renditions': renditions, 'original': clean_original}
+
+
+def rendition_dir(original_name):
+    """
+    Folder holding an original's renditions, e.g. renditions/blobs/3f/a2/<sha256>.
+    It is derived from the original's path, so every image row that shares a
+    content-addressed blob also shares its renditions.
+    """
+    return f'renditions/{os.path.splitext(original_name)[0]}'
+
+
+def rendition_path(original_name, name, fmt):
+    extension = FORMATS[fmt][0]
+    return f'{rendition_dir(original_name)}/{name}.{extension}'
+
+
+def delete_renditions(original_name):
+    """Removes every rendition stored for an original."""
+    folder = rendition_dir(original_name)
+    try:
+        _, files = default_storage.listdir(folder)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        default_storage.delete(f'{folder}/{filename}')
+
+
+def find_processed_twins(names):
+    """
+    Returns {original name: derived fields} for files that some image row,
+    of either model, has already processed successfully.
+    """
+    twins = {}
+    for model in IMAGE_MODELS:
+        rows = (
+            model.objects.filter(image__in=names, processed_at__isnull=False)
+            .exclude(renditions={})
+            .values('image', 'width', 'height', 'size', 'renditions')
+        )
+        for row in rows:
+            twins.setdefault(row['image'], row)
+    return twins
+
+
+def store_clean_original(storage, name, clean_original):
+    """Stores the metadata-free copy of `name` as its own blob and returns the new name."""
+    clean_name = os.path.splitext(name)[0] + clean_original['extension']
+    return storage.save(clean_name, ContentFile(clean_original['data']))
+
+
+def store_renditions(original_name, rendered):
+    """Writes rendered files to storage and returns the `renditions` JSON."""
+    stored = {}
+    for name, rendition in rendered['renditions'].items():
+        entry = {'width': rendition['width'], 'height': rendition['height']}
+        for fmt in FORMATS:
+            path = rendition_path(original_name, name, fmt)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            entry[fmt] = default_storage.save(path, ContentFile(rendition[fmt]))
+        stored[name] = entry
+    return stored
+
+
+def _read_original(image):
+    with image.image.open('rb') as original:
+        return original.read()
+
+
+def process_pending_images(executor, batch_size=16):
+    """
+    Processes one batch of pending images per model and returns how many
+    were handled. Rows are claimed with SKIP LOCKED so several workers can
+    share the backlog; rendering runs on `executor`, typically a
+    ProcessPoolExecutor. A file that is already processed for another row is
+    not rendered again. Originals with metadata are swapped for the clean
+    copy rendered alongside. Unreadable files are marked processed with no
+    renditions so they are not retried forever; their originals stay hidden.
+    """
+    processed = 0
+    for model in IMAGE_MODELS:
+        with transaction.atomic():
+            images = list(
+                model.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True)
+                .order_by('id')[:batch_size]
+            )
+            if not images:
+                continue
+
+            # Rows sharing a blob with an already processed image reuse its
+            # renditions; the rest are rendered once per distinct file.
+            twins = find_processed_twins({image.image.name for image in images})
+            futures = {}
+            for image in images:
+                name = image.image.name
+                if name in twins or name in futures:
+                    continue
+                try:
+                    data = _read_original(image)
+                except OSError:
+                    logger.exception("Could not read %s %s", model.__name__, image.pk)
+                    futures[name] = None
+                    continue
+                futures[name] = (len(data), executor.submit(render_image, data))
+
+            now = timezone.now()
+            storage = model._meta.get_field('image').storage
+            for name, job in futures.items():
+                if job is None:
+                    continue
+                size, future = job
+                try:
+                    rendered = future.result()
+                except (OSError, ValueError, Image.DecompressionBombError):
+                    logger.exception("Could not render %s", name)
+                    continue
+                stored_name = name
+                if rendered['original'] is not None:
+                    stored_name = store_clean_original(storage, name, rendered['original'])
+                    size = len(rendered['original']['data'])
+                twins[name] = {
+                    'image': stored_name,
+                    'width': rendered['width'],
+                    'height': rendered['height'],
+                    'size': size,
+                    'renditions': store_renditions(stored_name, rendered),
+                }
+
+            released, acquired = [], []
+            for image in images:
+                derived = twins.get(image.image.name)
+                if derived and derived['image'] != image.image.name:
+                    released.append(image.image.name)
+                    acquired.append(derived['image'])
+                    image.image.name = derived['image']
+                image.width = derived['width'] if derived else None
+                image.height = derived['height'] if derived else None
+                image.size = derived['size'] if derived else None
+                image.renditions = derived['renditions'] if derived else {}
+                image.processed_at = now
+
+            model.objects.bulk_update(images, ['image', 'width', 'height', 'size', 'renditions', 'processed_at'])
+            # bulk_update() sends no signals; move the blob references to the clean originals
+            acquire_blobs(acquired)
+            release_blobs(released)
+            # bulk_update() sends no signals; new srcsets change list and detail payloads
+            if model is UnitImage:
+                unit_ids = {image.unit_id for image in images}
+                property_ids = Unit.objects.filter(pk__in=unit_ids).values_list('property_id', flat=True)
+                bump_catalog(property_ids=list(property_ids), unit_ids=unit_ids)
+            else:
+                bump_catalog(property_ids=[image.property_id for image in images])
+            processed += len(images)
+    return processed
+
+
+def build_srcset(image, request=None):
+    """
+    Returns {'webp': 'url 400w, url 1200w', 'jpeg': ...} for a processed
+    image, or {} while its renditions are pending.
+    """
+    if not image.renditions:
+        return {}
+    srcset = {}
+    for fmt in FORMATS:
+        candidates = []
+        for name in RENDITIONS:
+            rendition = image.renditions.get(name)
+            if not rendition or fmt not in rendition:
+                continue
+            url = default_storage.url(rendition[fmt])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            candidates.append(f"{url} {rendition['width']}w")
+        if candidates:
+            srcset[fmt] = ', '.join(candidates)
+    return srcset
+
+
+def rendition_url(image, name, fmt='jpeg', request=None):
+    """
+    URL of one rendition. Falls back to the original only once it is public,
+    and is None while the image is pending.
+    """
+    rendition = (image.renditions or {}).get(name)
+    if rendition and fmt in rendition:
+        url = default_storage.url(rendition[fmt])
+    elif image.original_is_public:
+        url = image.image.url
+    else:
+        return None
+    return request.build_absolute_uri(url) if request is not None else url
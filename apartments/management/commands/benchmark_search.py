@@ -0,0 +1,176 @@
+# In apartments/management/commands/benchmark_search.py
+
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from django.db.models import Q
+
+from apartments.filters import PropertyFilter, UnitFilter
+from apartments.geo import bbox_around, cluster_counts, distance_expression
+from apartments.pricing import UNIT_PRICING_COLUMNS, quote_stays
+from apartments.models import BlockedDate, Property, Unit
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks unit search against the current database and reports query count, "
+        "rows transferred and timings. Seed data first with `seed_search_data`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--case', choices=['availability', 'keyword', 'geo', 'total_price'], default='availability')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--check-in', type=date.fromisoformat, default=date.today() + timedelta(days=14))
+        parser.add_argument('--nights', type=int, default=5)
+        parser.add_argument('--term', default='sunny vill', help="Keyword for the keyword case.")
+        parser.add_argument('--near', default='-1.2864,36.8172', help="latitude,longitude for the geo case.")
+        parser.add_argument('--radius-km', type=float, default=3)
+
+    def handle(self, *args, **options):
+        getattr(self, f"bench_{options['case']}")(options)
+
+    def measure(self, label, func, repeat):
+        """Runs func `repeat` times; func returns (rows_fetched, values_sent)."""
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                rows_fetched, values_sent = func()
+                timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"{label:<28} queries={len(queries):<3} rows_fetched={rows_fetched:<9} "
+            f"ids_sent={values_sent:<9} median={statistics.median(timings):.1f}ms"
+        )
+
+    # --- Availability ---------------------------------------------------
+
+    def bench_availability(self, options):
+        check_in = options['check_in']
+        check_out = check_in + timedelta(days=options['nights'])
+        units = Unit.objects.filter(is_active=True, property__is_active=True)
+        self.stdout.write(f"Availability {check_in} -> {check_out} over {units.count()} units")
+
+        def legacy():
+            # The previous implementation: pull ids into Python, then send them back.
+            booked = list(Booking.objects.filter(
+                status__in=[Booking.STATUS_CONFIRMED, Booking.STATUS_PENDING],
+                check_in__lt=check_out,
+                check_out__gt=check_in
+            ).values_list('unit_id', flat=True))
+            blocked = list(BlockedDate.objects.filter(
+                start_date__lt=check_out,
+                end_date__gte=check_in
+            ).values_list('unit_id', flat=True))
+            unavailable = set(booked) | set(blocked)
+            available = list(units.exclude(id__in=unavailable).values_list('id', flat=True))
+            return len(booked) + len(blocked) + len(available), len(unavailable)
+
+        def anti_join():
+            data = {'check_in': check_in.isoformat(), 'check_out': check_out.isoformat()}
+            available = list(UnitFilter(data, queryset=units).qs.values_list('id', flat=True))
+            return len(available), 0
+
+        self.measure('legacy id__in exclude', legacy, options['repeat'])
+        self.measure('NOT EXISTS anti-join', anti_join, options['repeat'])
+
+    # --- Keyword search --------------------------------------------------
+
+    def bench_keyword(self, options):
+        term = options['term']
+        self.stdout.write(f"Keyword {term!r} over {Property.objects.count()} properties (first page of 10)")
+
+        def icontains():
+            # The previous implementation: every word-fragment is a sequential scan.
+            page = list(Property.objects.filter(
+                Q(title__icontains=term) |
+                Q(city__icontains=term) |
+                Q(address__icontains=term)
+            ).values_list('id', flat=True)[:10])
+            return len(page), 0
+
+        def full_text():
+            queryset = PropertyFilter({'search': term}, queryset=Property.objects.all()).qs
+            page = list(queryset.values_list('id', flat=True)[:10])
+            return len(page), 0
+
+        self.measure('icontains OR scan', icontains, options['repeat'])
+        self.measure('tsvector GIN + rank', full_text, options['repeat'])
+
+    # --- Map search ------------------------------------------------------
+
+    def bench_geo(self, options):
+        latitude, longitude = (float(value) for value in options['near'].split(','))
+        radius_km = options['radius_km']
+        south, west, north, east = bbox_around(latitude, longitude, radius_km)
+        placed = Property.objects.filter(latitude__isnull=False)
+        self.stdout.write(
+            f"Radius {radius_km}km around ({latitude}, {longitude}) over {placed.count()} placed properties"
+        )
+
+        def distance_scan():
+            # No spatial index: compute the distance for every row.
+            matches = list(
+                placed.annotate(distance_km=distance_expression(latitude, longitude))
+                .filter(distance_km__lte=radius_km)
+                .values_list('id', flat=True)
+            )
+            return len(matches), 0
+
+        def box_scan():
+            # Plain coordinate ranges, no index on latitude/longitude.
+            matches = list(placed.filter(
+                latitude__range=(south, north), longitude__range=(west, east)
+            ).values_list('id', flat=True))
+            return len(matches), 0
+
+        def geohash_radius():
+            data = {'near': f'{latitude},{longitude}', 'radius_km': radius_km}
+            matches = list(PropertyFilter(data, queryset=Property.objects.all()).qs.values_list('id', flat=True))
+            return len(matches), 0
+
+        def geohash_box():
+            data = {'bbox': f'{south},{west},{north},{east}'}
+            matches = list(PropertyFilter(data, queryset=Property.objects.all()).qs.values_list('id', flat=True))
+            return len(matches), 0
+
+        def clusters():
+            # A zoomed-out viewport over the whole country
+            _, cells = cluster_counts(Property.objects.filter(is_active=True), (-4.8, 33.9, 5.0, 41.9))
+            return len(cells), 0
+
+        self.measure('distance seq scan', distance_scan, options['repeat'])
+        self.measure('lat/lng range seq scan', box_scan, options['repeat'])
+        self.measure('geohash radius', geohash_radius, options['repeat'])
+        self.measure('geohash bbox', geohash_box, options['repeat'])
+        self.measure('country clusters', clusters, options['repeat'])
+
+    # --- Total stay price ------------------------------------------------
+
+    def bench_total_price(self, options):
+        check_in = options['check_in']
+        check_out = check_in + timedelta(days=options['nights'])
+        units = Unit.objects.filter(is_active=True, property__is_active=True)
+        data = {'check_in': check_in.isoformat(), 'check_out': check_out.isoformat()}
+        self.stdout.write(f"Cheapest available stays {check_in} -> {check_out} (first page of 10)")
+
+        def python_sort():
+            # Price every available unit in Python, then sort.
+            available = UnitFilter(data, queryset=units).qs.order_by().only('id', *UNIT_PRICING_COLUMNS)
+            quotes = quote_stays(available, check_in, check_out)
+            sorted(quotes.values(), key=lambda quote: (quote['total'], quote['unit_id']))[:10]
+            # Every unit id goes back to the database for the rule lookups
+            return len(quotes), len(quotes)
+
+        def sql_sort():
+            queryset = UnitFilter({**data, 'ordering': 'total_price'}, queryset=units).qs
+            page = list(queryset.values_list('id', 'total_price')[:10])
+            return len(page), 0
+
+        self.measure('quote in Python + sort', python_sort, options['repeat'])
+        self.measure('SQL total_price ORDER BY', sql_sort, options['repeat'])
@@ -0,0 +1,47 @@
+# In apartments/management/commands/gc_media_blobs.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apartments.images import IMAGE_MODELS, delete_renditions
+from core.media import collect_orphan_blobs, recount_blob_references, sweep_unregistered_blob_files
+from core.storage import content_addressed_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes content-addressed image blobs (and their renditions) that no PropertyImage or "
+        "UnitImage has referenced for the grace period, then files in the blob folder that have no "
+        "MediaBlob row at all. Optionally repairs reference counts first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24.0,
+                            help="Keep unreferenced blobs this long, covering uploads still in flight.")
+        parser.add_argument('--recount', action='store_true',
+                            help="Recompute every reference count from the image tables first.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted.")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            fixed = recount_blob_references([(model, 'image') for model in IMAGE_MODELS])
+            self.stdout.write(f"Corrected {fixed} reference counts.")
+
+        removed, freed = collect_orphan_blobs(
+            content_addressed_storage,
+            timedelta(hours=options['grace_hours']),
+            on_delete=delete_renditions,
+            dry_run=options['dry_run'],
+        )
+        verb = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(f"{verb} {removed} orphaned blobs ({freed / 1024 / 1024:.1f} MB).")
+
+        # Files whose row was rolled back with a failed request
+        removed, freed = sweep_unregistered_blob_files(
+            content_addressed_storage,
+            timedelta(hours=options['grace_hours']),
+            on_delete=delete_renditions,
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(f"{verb} {removed} unregistered blob files ({freed / 1024 / 1024:.1f} MB).")
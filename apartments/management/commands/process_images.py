@@ -0,0 +1,35 @@
+# In apartments/management/commands/process_images.py
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apartments.images import process_pending_images
+
+
+class Command(BaseCommand):
+    help = "Worker that renders WebP/JPEG thumbnails and medium renditions for uploaded images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Render processes (defaults to CPU count).")
+        parser.add_argument('--batch-size', type=int, default=16)
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when nothing is pending.")
+        parser.add_argument('--once', action='store_true', help="Process what is pending once and exit.")
+
+    def handle(self, *args, **options):
+        # Forked render processes must not inherit open database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            try:
+                while True:
+                    processed = process_pending_images(executor, options['batch_size'])
+                    if processed:
+                        self.stdout.write(f"Processed {processed} images")
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping image worker.")
@@ -0,0 +1,13 @@
+# In apartments/management/commands/purge_stale_uploads.py
+
+from django.core.management.base import BaseCommand
+
+from apartments.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Deletes resumable image upload sessions older than CHUNKED_UPLOAD_EXPIRY_HOURS and their partial files."
+
+    def handle(self, *args, **options):
+        removed = purge_stale_uploads()
+        self.stdout.write(f"Removed {removed} stale upload sessions.")
@@ -0,0 +1,16 @@
+# In apartments/management/commands/rebuild_amenity_counts.py
+
+from django.core.management.base import BaseCommand
+
+from apartments.amenities import rebuild_amenity_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the AmenityCount table from every active unit in an active property. "
+        "Run it after deploying the table or after bulk edits that bypass signals."
+    )
+
+    def handle(self, *args, **options):
+        counts = rebuild_amenity_counts()
+        self.stdout.write(self.style.SUCCESS(f"Amenity counts rebuilt: {len(counts)} amenities."))
@@ -0,0 +1,32 @@
+# In apartments/management/commands/run_calendar_simulator.py
+
+from django.core.management.base import BaseCommand
+
+from apartments.calendar_simulator import CalendarFeedSimulator
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local stand-in for other listing sites' calendar exports. Serves every .ics file in "
+        "--directory at /<name>.ics with ETag/Last-Modified, answering revalidations with 304. "
+        "Feeds on it need CALENDAR_FEED_ALLOW_PRIVATE_HOSTS=True, since it listens on loopback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8091)
+        parser.add_argument('--directory', required=True, help="Folder of .ics files; edit them to simulate changes.")
+
+    def handle(self, *args, **options):
+        server = CalendarFeedSimulator(
+            (options['host'], options['port']),
+            options['directory'],
+            log=lambda message: self.stdout.write(f"[calendars] {message}"),
+        )
+        self.stdout.write(f"Calendar simulator serving {server.directory} on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping calendar simulator.")
+        finally:
+            server.server_close()
@@ -0,0 +1,159 @@
+# In apartments/management/commands/seed_search_data.py
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apartments.geo import encode_geohash
+from apartments.models import BlockedDate, Property, Unit
+from bookings.models import Booking
+from core.models import User
+
+# City -> (latitude, longitude) of its centre
+CITY_CENTRES = {
+    'Nairobi': (-1.2864, 36.8172),
+    'Mombasa': (-4.0435, 39.6682),
+    'Kisumu': (-0.0917, 34.7680),
+    'Nakuru': (-0.3031, 36.0800),
+    'Eldoret': (0.5143, 35.2698),
+    'Malindi': (-3.2192, 40.1169),
+    'Diani': (-4.3167, 39.5667),
+    'Naivasha': (-0.7167, 36.4333),
+    'Nanyuki': (0.0167, 37.0667),
+    'Lamu': (-2.2717, 40.9020),
+}
+CITIES = list(CITY_CENTRES)
+# Properties are scattered up to this many degrees (~15km) around the centre
+CITY_SPREAD = 0.15
+ADJECTIVES = ['Cozy', 'Modern', 'Spacious', 'Sunny', 'Quiet', 'Luxury', 'Rustic', 'Charming', 'Elegant', 'Breezy']
+NOUNS = ['Apartment', 'Villa', 'Cottage', 'Studio', 'Loft', 'Bungalow', 'Penthouse', 'Townhouse', 'Cabin', 'Suite']
+STREETS = ['Kenyatta Ave', 'Moi Ave', 'Ngong Rd', 'Waiyaki Way', 'Nyali Rd', 'Oginga Odinga St', 'Beach Rd']
+
+
+def set_position(prop, rng):
+    """Places a property at a random point around its city centre."""
+    latitude, longitude = CITY_CENTRES[prop.city]
+    prop.latitude = Decimal(f"{latitude + rng.uniform(-CITY_SPREAD, CITY_SPREAD):.6f}")
+    prop.longitude = Decimal(f"{longitude + rng.uniform(-CITY_SPREAD, CITY_SPREAD):.6f}")
+    prop.geohash = encode_geohash(prop.latitude, prop.longitude)
+
+
+class Command(BaseCommand):
+    help = "Seeds a large synthetic dataset of properties, units, bookings and blocks for benchmarking search."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=100_000)
+        parser.add_argument('--units-per-property', type=int, default=2)
+        parser.add_argument('--bookings-per-unit', type=int, default=3)
+        parser.add_argument('--blocks-per-unit', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=42, help="Random seed, for repeatable datasets.")
+        parser.add_argument(
+            '--backfill-coordinates', action='store_true',
+            help="Only give existing seeded properties without coordinates a position near their city.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        if options['backfill_coordinates']:
+            return self.backfill_coordinates(rng, batch_size)
+
+        host, _ = User.objects.get_or_create(
+            username='seed_host',
+            defaults={'email': 'seed_host@example.com', 'role': User.Role.HOST},
+        )
+        guest, _ = User.objects.get_or_create(
+            username='seed_guest',
+            defaults={'email': 'seed_guest@example.com'},
+        )
+
+        remaining = options['properties']
+        created = 0
+        while remaining > 0:
+            count = min(batch_size, remaining)
+            with transaction.atomic():
+                self._seed_batch(rng, host, guest, count, options)
+            remaining -= count
+            created += count
+            self.stdout.write(f"Seeded {created} properties...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {created} properties."))
+
+    def backfill_coordinates(self, rng, batch_size):
+        pending = Property.objects.filter(latitude__isnull=True, city__in=CITIES).order_by('id')
+        updated = 0
+        while True:
+            with transaction.atomic():
+                batch = list(pending.only('id', 'city')[:batch_size])
+                if not batch:
+                    break
+                for prop in batch:
+                    set_position(prop, rng)
+                # bulk_update() skips save(), so the geohash is set by set_position()
+                Property.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+            updated += len(batch)
+            self.stdout.write(f"Placed {updated} properties...")
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} properties placed."))
+
+    def _seed_batch(self, rng, host, guest, count, options):
+        properties = [
+            Property(
+                owner=host,
+                title=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} in {city}",
+                description=f"A {rng.choice(ADJECTIVES).lower()} place close to {rng.choice(STREETS)}.",
+                address=f"{rng.randint(1, 999)} {rng.choice(STREETS)}",
+                city=city,
+            )
+            for city in (rng.choice(CITIES) for _ in range(count))
+        ]
+        for prop in properties:
+            set_position(prop, rng)
+        properties = Property.objects.bulk_create(properties)
+
+        units = Unit.objects.bulk_create([
+            Unit(
+                property=prop,
+                unit_name_or_number=f"Unit {n + 1}",
+                price_per_night=Decimal(rng.randrange(2_000, 40_000, 500)),
+                max_guests=rng.randint(1, 10),
+                bedrooms=rng.randint(1, 5),
+                bathrooms=rng.randint(1, 3),
+                amenities=rng.sample(['wifi', 'pool', 'parking', 'kitchen', 'ac', 'tv', 'gym'], rng.randint(1, 4)),
+            )
+            for prop in properties
+            for n in range(options['units_per_property'])
+        ])
+
+        today = date.today()
+        bookings = []
+        blocks = []
+        for unit in units:
+            # Bookings for a unit are laid out back to back so they never overlap.
+            check_in = today + timedelta(days=rng.randint(-60, 0))
+            for _ in range(options['bookings_per_unit']):
+                check_in += timedelta(days=rng.randint(0, 30))
+                check_out = check_in + timedelta(days=rng.randint(1, 14))
+                bookings.append(Booking(
+                    user=guest,
+                    unit=unit,
+                    check_in=check_in,
+                    check_out=check_out,
+                    status=rng.choice([Booking.STATUS_CONFIRMED, Booking.STATUS_PENDING, Booking.STATUS_CANCELLED]),
+                    total_price=unit.price_per_night * (check_out - check_in).days,
+                ))
+                check_in = check_out
+            for _ in range(options['blocks_per_unit']):
+                start_date = today + timedelta(days=rng.randint(0, 300))
+                blocks.append(BlockedDate(
+                    unit=unit,
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=rng.randint(0, 7)),
+                    reason='Seeded block',
+                ))
+
+        Booking.objects.bulk_create(bookings)
+        BlockedDate.objects.bulk_create(blocks)
@@ -0,0 +1,44 @@
+# In apartments/management/commands/strip_image_metadata.py
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from apartments.images import IMAGE_MODELS, has_metadata
+
+
+def original_has_metadata(image):
+    try:
+        with image.image.open('rb') as original, Image.open(original) as opened:
+            return has_metadata(opened)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Queues processed property and unit images whose originals still carry EXIF/XMP metadata, "
+        "so the `process_images` worker swaps them for clean copies. Run it once for images "
+        "processed before the worker stripped originals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only count the images that would be queued.")
+
+    def handle(self, *args, **options):
+        for model in IMAGE_MODELS:
+            names = (
+                model.objects.filter(processed_at__isnull=False)
+                .order_by().values_list('image', flat=True).distinct()
+            )
+            dirty = []
+            for name in names.iterator():
+                image = model(image=name)
+                if original_has_metadata(image):
+                    dirty.append(name)
+            queued = model.objects.filter(image__in=dirty).count()
+            if not options['dry_run'] and dirty:
+                # Renditions stay in place, so srcsets keep working until the worker is done
+                model.objects.filter(image__in=dirty).update(processed_at=None)
+            verb = "would be queued" if options['dry_run'] else "queued"
+            self.stdout.write(f"{model.__name__}: {queued} images {verb}")
+        self.stdout.write(self.style.SUCCESS("Done."))
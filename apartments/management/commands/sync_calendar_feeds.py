@@ -0,0 +1,29 @@
+# In apartments/management/commands/sync_calendar_feeds.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apartments.calendars import sync_due_feeds
+
+
+class Command(BaseCommand):
+    help = "Worker that imports external iCal feeds into unit blocks, writing only what changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--interval', type=float, default=30.0, help="Seconds to sleep when no feed is due.")
+        parser.add_argument('--once', action='store_true', help="Sync the feeds that are due once and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                synced = sync_due_feeds(options['batch_size'])
+                if synced:
+                    self.stdout.write(f"Synced {synced} calendar feeds")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping calendar worker.")
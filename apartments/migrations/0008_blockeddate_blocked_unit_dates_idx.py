@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0007_alter_property_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blockeddate',
+            index=models.Index(fields=['unit', 'start_date', 'end_date'], name='blocked_unit_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:00
+
+import apartments.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0011_image_upload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='propertyimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage(), upload_to='property_images/'),
+        ),
+        migrations.AlterField(
+            model_name='unitimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage(), upload_to=apartments.models.unit_image_upload_path),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:14
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0014_property_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='monthly_discount_percent',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Off stays of 28 nights or more', validators=[django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='weekend_price_per_night',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Friday and Saturday nights; defaults to price_per_night', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='weekly_discount_percent',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Off stays of 7 nights or more', validators=[django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.CreateModel(
+            name='PriceOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('price_per_night', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_overrides', to='apartments.unit')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('unit', 'date'), name='unique_unit_price_override')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SeasonalRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('price_per_night', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('weekend_price_per_night', models.DecimalField(blank=True, decimal_places=2, help_text="Friday and Saturday nights; defaults to this season's price_per_night", max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)])),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seasonal_rates', to='apartments.unit')),
+            ],
+            options={
+                'ordering': ['start_date'],
+                'indexes': [models.Index(fields=['unit', 'start_date', 'end_date'], name='seasonal_rate_unit_dates_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='seasonal_rate_end_after_start')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:21
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0015_unit_pricing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AmenityCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('unit_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-unit_count', 'name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['amenities'], name='unit_amenities_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
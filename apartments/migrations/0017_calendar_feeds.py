@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0016_amenity_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blockeddate',
+            name='external_uid',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, help_text='e.g., Booking.com', max_length=100)),
+                ('url', models.URLField(max_length=1000)),
+                ('etag', models.CharField(blank=True, editable=False, max_length=255)),
+                ('last_modified', models.CharField(blank=True, editable=False, max_length=64)),
+                ('next_sync_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feeds', to='apartments.unit')),
+            ],
+            options={
+                'ordering': ['unit', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='blockeddate',
+            name='feed',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='blocks', to='apartments.calendarfeed'),
+        ),
+        migrations.AddConstraint(
+            model_name='blockeddate',
+            constraint=models.UniqueConstraint(condition=models.Q(('feed__isnull', False)), fields=('feed', 'external_uid'), name='unique_feed_block_uid'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarfeed',
+            index=models.Index(fields=['next_sync_at'], name='calendar_feed_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='calendarfeed',
+            constraint=models.UniqueConstraint(fields=('unit', 'url'), name='unique_unit_calendar_feed'),
+        ),
+    ]
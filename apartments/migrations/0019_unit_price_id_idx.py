@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0017_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['price_per_night', 'id'], name='unit_price_id_idx'),
+        ),
+    ]
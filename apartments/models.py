@@ -1,9 +1,47 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+
+from core.storage import content_addressed_storage
+from .geo import GEOHASH_LENGTH, encode_geohash
+
+
+# --- Rating Aggregates ---
+RATING_VALUES = range(1, 6)
+
+
+class RatingAggregates(models.Model):
+    """
+    Review totals kept on Property and Unit so lists can sort and filter by
+    rating from an index instead of aggregating Review rows. Maintained
+    incrementally by reviews/ratings.py and rebuilt by
+    `rebuild_rating_aggregates`.
+    """
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)  # NULL until reviewed
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rating_histogram(self):
+        """{'1': count, ..., '5': count}"""
+        return {str(value): getattr(self, f'rating_{value}') for value in RATING_VALUES}
 
 
 # --- Property Model ---
-class Property(models.Model):
+class Property(RatingAggregates):
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -16,14 +54,116 @@ class Property(models.Model):
     country = models.CharField(max_length=120, default='Kenya')
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)  # Overall status of the property
+    # Map position; the geohash is derived from it on save (see apartments/geo.py)
+    latitude = models.DecimalField(
+        max_digits=8, decimal_places=6, null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.DecimalField(
+        max_digits=9, decimal_places=6, null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    geohash = models.CharField(max_length=GEOHASH_LENGTH, blank=True, editable=False)
+    # Weighted full-text document, kept up to date by Postgres itself
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('city', weight='A', config='english')
+            + SearchVector('address', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         verbose_name_plural = "Properties"  # Correct pluralization
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='property_search_vector_idx'),
+            # "Best rated first", unrated last
+            models.Index(models.F('rating_avg').desc(nulls_last=True), 'id', name='property_rating_idx'),
+            # Prefix (LIKE 'abc%') scans for bounding-box and radius searches
+            models.Index(fields=['geohash'], opclasses=['varchar_pattern_ops'], name='property_geohash_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(latitude__isnull=True, longitude__isnull=True)
+                | models.Q(latitude__isnull=False, longitude__isnull=False),
+                name='property_coordinates_pair',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'is_active' in field_names:
+            instance._loaded_is_active = instance.is_active
+        return instance
+
+    def save(self, *args, **kwargs):
+        has_point = self.latitude is not None and self.longitude is not None
+        self.geohash = encode_geohash(self.latitude, self.longitude) if has_point else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+
+# --- Image Derivatives ---
+class ProcessedImage(models.Model):
+    """
+    Fields shared by property and unit images for the derivative pipeline.
+    The uploaded original is kept as the master; `process_images` fills in
+    its dimensions, stores resized, EXIF-free renditions and swaps an
+    original carrying metadata for a clean copy (see apartments/images.py).
+    `processed_at` is cleared whenever the file changes.
+    Originals live in content-addressed storage, so rows that share a file
+    share one blob and one set of renditions.
+    """
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)  # Bytes of the original
+    # {name: {'width', 'height', 'webp': path, 'jpeg': path, ...}}
+    renditions = models.JSONField(default=dict, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(
+                fields=['id'], condition=models.Q(processed_at__isnull=True), name='%(class)s_pending_idx'
+            ),
+        ]
+
+    @property
+    def original_is_public(self):
+        """Only originals the worker has read (and stripped if needed) are shown."""
+        return self.processed_at is not None and bool(self.renditions)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'image' in field_names:
+            instance._loaded_image = instance.__dict__['image']
+        return instance
+
+    def save(self, *args, **kwargs):
+        # A replaced file needs new renditions, and its old blob loses a reference
+        self._replaced_image = None
+        if self.pk and getattr(self, '_loaded_image', self.image.name) != self.image.name:
+            self._replaced_image = self._loaded_image
+            self.processed_at = None
+            self.renditions = {}
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'processed_at', 'renditions'}
+        super().save(*args, **kwargs)
+        self._loaded_image = self.image.name
+
 
 # --- Dynamic Property Images ---
 def property_image_upload_path(instance, filename):
@@ -31,13 +171,14 @@ def property_image_upload_path(instance, filename):
     return f'properties/{instance.property.id}/{filename}'
 
 
-class PropertyImage(models.Model):
+class PropertyImage(ProcessedImage):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to="property_images/")
+    # Stored once per unique file; see core/storage.py
+    image = models.ImageField(upload_to="property_images/", storage=content_addressed_storage)
     caption = models.CharField(max_length=255, blank=True)
     order = models.PositiveIntegerField(default=0)
     
-    class Meta:
+    class Meta(ProcessedImage.Meta):
         ordering = ['order']
 
     def __str__(self):
@@ -45,10 +186,21 @@ class PropertyImage(models.Model):
 
 
 # --- Unit Model ---
-class Unit(models.Model):
+class Unit(RatingAggregates):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='units')
     unit_name_or_number = models.CharField(max_length=100)  # e.g., "Unit A-101", "Penthouse"
     price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
+    # Pricing beyond the flat nightly rate; see apartments/pricing.py
+    weekend_price_per_night = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)],
+        help_text="Friday and Saturday nights; defaults to price_per_night",
+    )
+    weekly_discount_percent = models.PositiveSmallIntegerField(
+        default=0, validators=[MaxValueValidator(100)], help_text="Off stays of 7 nights or more",
+    )
+    monthly_discount_percent = models.PositiveSmallIntegerField(
+        default=0, validators=[MaxValueValidator(100)], help_text="Off stays of 28 nights or more",
+    )
     max_guests = models.PositiveIntegerField(default=2)
     amenities = models.JSONField(default=list, blank=True)
     bedrooms = models.PositiveIntegerField(default=1)
@@ -57,29 +209,141 @@ class Unit(models.Model):
 
     class Meta:
         ordering = ['unit_name_or_number']
+        indexes = [
+            models.Index(models.F('rating_avg').desc(nulls_last=True), 'id', name='unit_rating_idx'),
+            # Keyset pages of the unit search: WHERE (price_per_night, id) > (%s, %s)
+            models.Index(fields=['price_per_night', 'id'], name='unit_price_id_idx'),
+            # amenities @> '["wifi", "pool"]'; jsonb_path_ops only serves containment, and is smaller for it
+            GinIndex(fields=['amenities'], opclasses=['jsonb_path_ops'], name='unit_amenities_idx'),
+        ]
 
     def __str__(self):
         return f"{self.property.title} - {self.unit_name_or_number}"
 
+    def save(self, *args, **kwargs):
+        # The amenity signals lock the row in pre_save and apply the delta in
+        # post_save; one transaction keeps that lock across the write.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class AmenityCount(models.Model):
+    """
+    Number of searchable units (active, in an active property) offering each
+    amenity. Maintained incrementally by apartments/amenities.py and rebuilt
+    by `rebuild_amenity_counts`.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    unit_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-unit_count', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.unit_count})"
+
+
+# --- Pricing ---
+class SeasonalRate(models.Model):
+    """
+    Nightly rates for a unit over an inclusive [start_date, end_date] range.
+    Where seasons overlap, the one that starts latest wins, so a short peak
+    can sit inside a longer season.
+    """
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='seasonal_rates')
+    name = models.CharField(max_length=100, blank=True)  # e.g., "High season", "Christmas"
+    start_date = models.DateField()
+    end_date = models.DateField()
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    weekend_price_per_night = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)],
+        help_text="Friday and Saturday nights; defaults to this season's price_per_night",
+    )
+
+    class Meta:
+        ordering = ['start_date']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__gte=models.F('start_date')),
+                name='seasonal_rate_end_after_start',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['unit', 'start_date', 'end_date'], name='seasonal_rate_unit_dates_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.unit} - {self.name or 'Season'} ({self.start_date} to {self.end_date})"
+
+
+class PriceOverride(models.Model):
+    """A fixed price for one night of a unit, beating every other rule."""
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='price_overrides')
+    date = models.DateField()
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['unit', 'date'], name='unique_unit_price_override'),
+        ]
+
+    def __str__(self):
+        return f"{self.unit} - {self.date}: {self.price_per_night}"
+
 
 # --- Unit Images ---
 def unit_image_upload_path(instance, filename):
     return f'units/{instance.unit.id}/{filename}'
 
 
-class UnitImage(models.Model):
+class UnitImage(ProcessedImage):
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to=unit_image_upload_path)
+    image = models.ImageField(upload_to=unit_image_upload_path, storage=content_addressed_storage)
     caption = models.CharField(max_length=255, blank=True)
     order = models.PositiveIntegerField(default=0)
 
-    class Meta:
+    class Meta(ProcessedImage.Meta):
         ordering = ['order']
 
     def __str__(self):
         return f"Image for {self.unit}"
 
 
+# --- Resumable Image Uploads ---
+class ImageUpload(models.Model):
+    """
+    A resumable upload of one large image for a property or a unit.
+    The client sends the file in chunks with PATCH; bytes are appended to a
+    partial file under CHUNKED_UPLOAD_DIR and `offset` records how much has
+    arrived, so an interrupted upload resumes instead of restarting. When the
+    last chunk lands the matching PropertyImage/UnitImage is created.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='image_uploads')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    unit = models.ForeignKey('Unit', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    filename = models.CharField(max_length=255)
+    caption = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Exactly one target
+            models.CheckConstraint(
+                condition=models.Q(property__isnull=False, unit__isnull=True)
+                | models.Q(property__isnull=True, unit__isnull=False),
+                name='image_upload_single_target',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
 # --- Blocked Dates ---
 class BlockedDate(models.Model):
     """
@@ -94,6 +358,11 @@ class BlockedDate(models.Model):
         null=True,
         help_text="e.g., Maintenance, Owner stay"
     )
+    # Set on blocks imported from an external calendar; hosts' own blocks have no feed
+    feed = models.ForeignKey(
+        'CalendarFeed', on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='blocks'
+    )
+    external_uid = models.CharField(max_length=255, blank=True, editable=False)  # The event's UID in that feed
 
     class Meta:
         ordering = ['start_date']
@@ -101,8 +370,47 @@ class BlockedDate(models.Model):
             models.CheckConstraint(
                 check=models.Q(end_date__gte=models.F('start_date')),
                 name='end_date_after_start_date'
-            )
+            ),
+            models.UniqueConstraint(
+                fields=['feed', 'external_uid'],
+                condition=models.Q(feed__isnull=False),
+                name='unique_feed_block_uid',
+            ),
+        ]
+        indexes = [
+            # Serves the availability anti-join and the per-unit calendar
+            models.Index(fields=['unit', 'start_date', 'end_date'], name='blocked_unit_dates_idx'),
         ]
 
     def __str__(self):
         return f"Blocked: {self.unit} from {self.start_date} to {self.end_date}"
+
+
+class CalendarFeed(models.Model):
+    """
+    An iCal feed from another listing site. The `sync_calendar_feeds`
+    worker imports its events as BlockedDate rows on the unit.
+    """
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='calendar_feeds')
+    name = models.CharField(max_length=100, blank=True, help_text="e.g., Booking.com")
+    url = models.URLField(max_length=1000)
+    # Validators from the last successful fetch, sent back for a 304
+    etag = models.CharField(max_length=255, blank=True, editable=False)
+    last_modified = models.CharField(max_length=64, blank=True, editable=False)
+    next_sync_at = models.DateTimeField(default=timezone.now)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['unit', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['unit', 'url'], name='unique_unit_calendar_feed'),
+        ]
+        indexes = [
+            # The worker claims feeds that are due
+            models.Index(fields=['next_sync_at'], name='calendar_feed_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name or self.url} -> {self.unit}"
@@ -0,0 +1,314 @@
+# In apartments/pricing.py
+
+"""
+Stay pricing for units.
+
+A night's price is, in order of precedence: a per-date PriceOverride, the
+SeasonalRate covering it (the latest-starting one if several do), or the
+unit's own rate. Friday and Saturday nights use the weekend price of
+whichever season or unit rate applies. Stays of 7+ nights get the unit's
+weekly discount and stays of 28+ nights its monthly discount instead.
+
+Quotes are computed per interval, not per night: the rule boundaries inside
+the stay split it into segments with one rate each, and the weekend nights
+in a segment are counted arithmetically. Pricing many units over the same
+dates takes two queries in total.
+
+Searches need the total inside the query to filter and sort on it, so
+stay_price_expressions() implements the same rules in SQL.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Func, Q, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import PriceOverride, SeasonalRate
+
+ONE_DAY = timedelta(days=1)
+CENTS = Decimal('0.01')
+
+# date.weekday() of the nights priced at the weekend rate: Friday and Saturday
+WEEKEND_NIGHTS = (4, 5)
+
+WEEKLY_DISCOUNT_NIGHTS = 7
+MONTHLY_DISCOUNT_NIGHTS = 28
+
+# Longest stay a single quote may cover.
+MAX_QUOTE_NIGHTS = 365
+
+# Unit columns the engine reads; load at least these when quoting.
+UNIT_PRICING_COLUMNS = [
+    'price_per_night', 'weekend_price_per_night', 'weekly_discount_percent', 'monthly_discount_percent',
+]
+
+
+def parse_stay(params):
+    """
+    Reads the required `check_in`/`check_out` query params into a
+    (check_in, check_out) tuple of dates.
+    """
+    stay = []
+    for key in ('check_in', 'check_out'):
+        raw = params.get(key)
+        if not raw:
+            raise ValidationError({key: "This query parameter is required."})
+        try:
+            value = parse_date(raw)
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError({key: "Enter a valid date in YYYY-MM-DD format."})
+        stay.append(value)
+
+    check_in, check_out = stay
+    if check_out <= check_in:
+        raise ValidationError({'check_out': "Check-out date must be after check-in date."})
+    if (check_out - check_in).days > MAX_QUOTE_NIGHTS:
+        raise ValidationError({'check_out': f"Stays are limited to {MAX_QUOTE_NIGHTS} nights."})
+    return check_in, check_out
+
+
+def count_weekend_nights(start, end):
+    """Number of nights in [start, end) that fall on WEEKEND_NIGHTS."""
+    nights = (end - start).days
+    full_weeks, remainder = divmod(nights, 7)
+    count = full_weeks * len(WEEKEND_NIGHTS)
+    first = start.weekday()
+    count += sum(1 for offset in range(remainder) if (first + offset) % 7 in WEEKEND_NIGHTS)
+    return count
+
+
+def discount_percent(unit, nights):
+    if nights >= MONTHLY_DISCOUNT_NIGHTS and unit.monthly_discount_percent:
+        return unit.monthly_discount_percent
+    if nights >= WEEKLY_DISCOUNT_NIGHTS:
+        return unit.weekly_discount_percent
+    return 0
+
+
+def _winning_season(seasons, night):
+    """The season covering `night` that started latest, or None."""
+    winner = None
+    for season in seasons:
+        if season.start_date <= night <= season.end_date:
+            if winner is None or (season.start_date, season.pk) > (winner.start_date, winner.pk):
+                winner = season
+    return winner
+
+
+def _price_stay(unit, check_in, check_out, seasons, overrides):
+    # Every rule boundary inside the stay starts a new segment
+    boundaries = {check_in, check_out}
+    for season in seasons:
+        boundaries.add(max(season.start_date, check_in))
+        boundaries.add(min(season.end_date + ONE_DAY, check_out))
+    for night in overrides:
+        boundaries.update((night, night + ONE_DAY))
+    boundaries = sorted(boundaries)
+
+    # (source, price) -> nights, in the order rates first appear
+    lines = defaultdict(int)
+    for start, end in zip(boundaries, boundaries[1:]):
+        if start in overrides:
+            # Override boundaries make every overridden night its own segment
+            lines['override', overrides[start]] += 1
+            continue
+
+        season = _winning_season(seasons, start)
+        if season is not None:
+            source, price = f'season:{season.name}' if season.name else 'season', season.price_per_night
+            weekend_price = season.weekend_price_per_night
+        else:
+            source, price, weekend_price = 'base', unit.price_per_night, unit.weekend_price_per_night
+
+        nights = (end - start).days
+        weekend_nights = count_weekend_nights(start, end) if weekend_price is not None else 0
+        if nights - weekend_nights:
+            lines[source, price] += nights - weekend_nights
+        if weekend_nights:
+            lines[f'{source}:weekend', weekend_price] += weekend_nights
+
+    breakdown = [
+        {'source': source, 'price_per_night': price, 'nights': nights, 'amount': price * nights}
+        for (source, price), nights in lines.items()
+    ]
+    nights = (check_out - check_in).days
+    subtotal = sum((line['amount'] for line in breakdown), Decimal('0'))
+    percent = discount_percent(unit, nights)
+    discount = (subtotal * percent / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+    return {
+        'unit_id': unit.pk,
+        'check_in': check_in,
+        'check_out': check_out,
+        'nights': nights,
+        'subtotal': subtotal,
+        'discount_percent': percent,
+        'discount': discount,
+        'total': subtotal - discount,
+        'breakdown': breakdown,
+    }
+
+
+def quote_stays(units, check_in, check_out):
+    """
+    Prices the same stay for many units. `units` are Unit instances with
+    UNIT_PRICING_COLUMNS loaded. Returns {unit_id: quote}; see quote_stay().
+    Two queries in total, whatever the number of units or nights.
+    """
+    units = list(units)
+    unit_ids = [unit.pk for unit in units]
+    seasons = defaultdict(list)
+    overrides = defaultdict(dict)
+    if unit_ids:
+        for season in SeasonalRate.objects.filter(
+            unit_id__in=unit_ids, start_date__lt=check_out, end_date__gte=check_in
+        ):
+            seasons[season.unit_id].append(season)
+        for unit_id, night, price in PriceOverride.objects.filter(
+            unit_id__in=unit_ids, date__gte=check_in, date__lt=check_out
+        ).values_list('unit_id', 'date', 'price_per_night'):
+            overrides[unit_id][night] = price
+
+    return {
+        unit.pk: _price_stay(unit, check_in, check_out, seasons[unit.pk], overrides[unit.pk])
+        for unit in units
+    }
+
+
+def quote_stay(unit, check_in, check_out):
+    """
+    Prices a stay of `unit` over the nights [check_in, check_out). Returns
+    {'unit_id', 'check_in', 'check_out', 'nights', 'subtotal',
+    'discount_percent', 'discount', 'total', 'breakdown'}, where breakdown
+    lists {'source', 'price_per_night', 'nights', 'amount'} per distinct rate.
+    """
+    return quote_stays([unit], check_in, check_out)[unit.pk]
+
+
+def serialize_quote(quote):
+    """Formats a quote for the API response."""
+    return {
+        **quote,
+        'check_in': quote['check_in'].isoformat(),
+        'check_out': quote['check_out'].isoformat(),
+        'subtotal': str(quote['subtotal']),
+        'discount': str(quote['discount']),
+        'total': str(quote['total']),
+        'breakdown': [
+            {**line, 'price_per_night': str(line['price_per_night']), 'amount': str(line['amount'])}
+            for line in quote['breakdown']
+        ],
+    }
+
+
+
+# --- SQL -----------------------------------------------------------------
+# The same rules as _price_stay(), as query expressions, so searches can
+# filter and sort on the total without pricing units in Python.
+
+class NightlySubtotal(Func):
+    """
+    Sum of a unit's nightly prices over [check_in, check_out): an override,
+    else the latest-starting season, else the unit's rate, each with its
+    weekend price on WEEKEND_NIGHTS. Runs one row per night, so
+    stay_price_expressions() only uses it for units with rules in the stay.
+    """
+    output_field = DecimalField(max_digits=12, decimal_places=2)
+
+    def __init__(self, check_in, check_out, prefix=''):
+        super().__init__(F(f'{prefix}pk'), F(f'{prefix}price_per_night'), F(f'{prefix}weekend_price_per_night'))
+        self.check_in, self.check_out = check_in, check_out
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (unit_pk, unit_params), (price, price_params), (weekend_price, weekend_params) = (
+            compiler.compile(expression) for expression in self.get_source_expressions()
+        )
+        weekend_days = ', '.join(str(weekday + 1) for weekday in WEEKEND_NIGHTS)  # ISODOW: Monday is 1
+        overrides = connection.ops.quote_name(PriceOverride._meta.db_table)
+        rates = connection.ops.quote_name(SeasonalRate._meta.db_table)
+        sql = f"""(
+            SELECT SUM(COALESCE(
+                override.price_per_night,
+                CASE WHEN EXTRACT(ISODOW FROM night.date) IN ({weekend_days})
+                    THEN COALESCE(season.weekend_price_per_night, season.price_per_night, {weekend_price}, {price})
+                    ELSE COALESCE(season.price_per_night, {price})
+                END
+            ))
+            -- An integer series, so the planner knows how many nights there are
+            FROM (SELECT %s::date + offset_days AS date FROM generate_series(0, %s) AS offset_days) night
+            LEFT JOIN {overrides} override
+                ON override.unit_id = {unit_pk} AND override.date = night.date
+            LEFT JOIN LATERAL (
+                SELECT rate.price_per_night, rate.weekend_price_per_night
+                FROM {rates} rate
+                WHERE rate.unit_id = {unit_pk}
+                    AND rate.start_date <= night.date AND rate.end_date >= night.date
+                ORDER BY rate.start_date DESC, rate.id DESC
+                LIMIT 1
+            ) season ON TRUE
+        )"""
+        params = [
+            *weekend_params, *price_params, *price_params,
+            self.check_in, (self.check_out - self.check_in).days - 1,
+            *unit_params, *unit_params,
+        ]
+        return sql, params
+
+
+def stay_price_expressions(check_in, check_out, prefix=''):
+    """
+    Returns {'nights', 'stay_subtotal', 'total_price'} expressions pricing
+    the stay for each unit row, matching quote_stay() to the cent. Units
+    without seasons or overrides in the stay, usually most of them, are
+    priced arithmetically; the rest fall back to NightlySubtotal.
+    """
+    nights = (check_out - check_in).days
+    weekend_nights = count_weekend_nights(check_in, check_out)
+    price = F(f'{prefix}price_per_night')
+    # Uncorrelated, so Postgres builds each as a hashed subplan once per query
+    # instead of probing per row
+    has_rules = Q(**{f'{prefix}pk__in': SeasonalRate.objects.filter(
+        start_date__lt=check_out, end_date__gte=check_in
+    ).values('unit_id')}) | Q(**{f'{prefix}pk__in': PriceOverride.objects.filter(
+        date__gte=check_in, date__lt=check_out
+    ).values('unit_id')})
+    flat_subtotal = (
+        price * (nights - weekend_nights)
+        + Coalesce(F(f'{prefix}weekend_price_per_night'), price) * weekend_nights
+    )
+    subtotal = Case(
+        When(has_rules, then=NightlySubtotal(check_in, check_out, prefix)),
+        default=flat_subtotal,
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+    # discount_percent(), resolved for this stay length
+    weekly, monthly = F(f'{prefix}weekly_discount_percent'), F(f'{prefix}monthly_discount_percent')
+    if nights >= MONTHLY_DISCOUNT_NIGHTS:
+        percent = Case(When(**{f'{prefix}monthly_discount_percent__gt': 0}, then=monthly), default=weekly)
+    elif nights >= WEEKLY_DISCOUNT_NIGHTS:
+        percent = weekly
+    else:
+        percent = Value(0)
+    # ROUND() on numeric rounds half away from zero, like ROUND_HALF_UP
+    discount = Round(F('stay_subtotal') * percent / Value(Decimal(100)), 2)
+
+    return {
+        'nights': Value(nights),
+        'stay_subtotal': subtotal,
+        'total_price': ExpressionWrapper(
+            F('stay_subtotal') - discount, output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+    }
+
+
+def annotate_stay_price(queryset, check_in, check_out, prefix=''):
+    """Annotates `nights`, `stay_subtotal` and `total_price` for a stay."""
+    expressions = stay_price_expressions(check_in, check_out, prefix)
+    total_price = expressions.pop('total_price')
+    return queryset.annotate(**expressions).annotate(total_price=total_price)
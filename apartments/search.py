@@ -0,0 +1,41 @@
+# In apartments/search.py
+
+"""
+Keyword search over properties, backed by the weighted `search_vector`
+column on Property and its GIN index.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+
+SEARCH_CONFIG = 'english'
+
+
+def build_search_query(value):
+    """
+    Turns free text into a prefix-matching tsquery, so that every word must
+    match and the last one can still be half-typed: "sea vie" -> "sea:* & vie:*".
+    Returns None when the text has nothing searchable in it.
+    """
+    terms = re.findall(r'\w+', value)
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_properties(queryset, value, prefix=''):
+    """
+    Filters a queryset by keyword against the property search vector and
+    orders it by relevance. `prefix` is the lookup path to the Property,
+    e.g. 'property__' when searching units.
+    """
+    query = build_search_query(value)
+    if query is None:
+        return queryset.none()
+
+    vector_field = f'{prefix}search_vector'
+    return queryset.filter(**{vector_field: query}).annotate(
+        search_rank=SearchRank(F(vector_field), query)
+    ).order_by('-search_rank', 'pk')
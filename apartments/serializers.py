@@ -1,21 +1,56 @@
 # In apartments/serializers.py
 
+from django.conf import settings
 from rest_framework import serializers
-from .models import Property, PropertyImage, Unit, UnitImage, BlockedDate
-from core.serializers import UserSerializer
+from .models import Property, PropertyImage, Unit, UnitImage, BlockedDate, CalendarFeed, ImageUpload, SeasonalRate, PriceOverride
+from .calendars import CalendarFeedError, check_feed_url
+from .images import build_srcset, rendition_url
+from core.serializers import UserSerializer, SparseFieldsMixin
+from django.db.models import Prefetch
 from datetime import date
 
+# Filled in by the `process_images` worker, never by clients.
+IMAGE_DERIVATIVE_FIELDS = ['width', 'height', 'size', 'srcset']
+
+
+class ProcessedOriginalMixin(serializers.Serializer):
+    """
+    Shows `image` as null until the `process_images` worker has handled the
+    file. Uploads are stored as sent, so until then the original may still
+    carry the camera's EXIF block.
+    """
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'image' in data and not instance.original_is_public:
+            data['image'] = None
+        return data
+
+
+class ImageRenditionsMixin(ProcessedOriginalMixin):
+    """
+    Adds a `srcset` map of resized renditions, e.g.
+    {"webp": "<url> 400w, <url> 1200w", "jpeg": "..."}. Empty until the
+    image has been processed, and so is `image`.
+    """
+    srcset = serializers.SerializerMethodField()
+
+    def get_srcset(self, obj):
+        return build_srcset(obj, self.context.get('request'))
+
+
 # --- Core Public-Facing Serializers ---
-class PropertyImageSerializer(serializers.ModelSerializer):
+class PropertyImageSerializer(ImageRenditionsMixin, serializers.ModelSerializer):
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'caption']
+        fields = ['id', 'image', 'caption'] + IMAGE_DERIVATIVE_FIELDS
+        read_only_fields = ['width', 'height', 'size']
 
-class UnitImageSerializer(serializers.ModelSerializer):
+class UnitImageSerializer(ImageRenditionsMixin, serializers.ModelSerializer):
     """Serializer for viewing unit images."""
     class Meta:
         model = UnitImage
-        fields = ['id', 'image', 'caption', 'order']
+        fields = ['id', 'image', 'caption', 'order'] + IMAGE_DERIVATIVE_FIELDS
+        read_only_fields = ['width', 'height', 'size']
 
 #class SimplePropertySerializer(serializers.ModelSerializer):
     #"""Contains only essential property info for nesting."""
@@ -23,13 +58,107 @@ class UnitImageSerializer(serializers.ModelSerializer):
         #model = Property
         #fields = ['id', 'title', 'address', 'city']
 
+# Maintained from reviews; raw counters are exposed through rating_histogram.
+RATING_FIELDS = ['rating_avg', 'rating_count', 'rating_histogram']
+RATING_COUNTER_COLUMNS = ['rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
 class UnitSerializer(serializers.ModelSerializer):
     """Serializer for viewing individual units."""
     images = UnitImageSerializer(many=True, read_only=True)
+    rating_histogram = serializers.ReadOnlyField()
     #property = SimplePropertySerializer(read_only=True)
     class Meta:
         model = Unit
-        fields = '__all__'
+        exclude = RATING_COUNTER_COLUMNS
+        read_only_fields = ['rating_avg', 'rating_count']
+
+
+class UnitListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact unit representation for search results.
+    Ships a single cover image instead of the full gallery and leaves out
+    amenities. Supports `?fields=` to trim the payload further.
+    """
+    property_title = serializers.CharField(source='property.title', read_only=True)
+    city = serializers.CharField(source='property.city', read_only=True)
+    cover_image = serializers.SerializerMethodField()
+    # Priced for the searched stay in SQL; null unless check_in and check_out are given
+    nights = serializers.SerializerMethodField()
+    total_price = serializers.SerializerMethodField()
+
+    # Model columns each output field needs; drives .only() on the queryset.
+    FIELD_COLUMNS = {
+        'id': ['id'],
+        'property': ['property'],
+        'property_title': ['property', 'property__title'],
+        'city': ['property', 'property__city'],
+        'unit_name_or_number': ['unit_name_or_number'],
+        'price_per_night': ['price_per_night'],
+        'max_guests': ['max_guests'],
+        'bedrooms': ['bedrooms'],
+        'bathrooms': ['bathrooms'],
+        'rating_avg': ['rating_avg'],
+        'rating_count': ['rating_count'],
+        'cover_image': ['id'],
+        'nights': ['id'],
+        'total_price': ['id'],
+    }
+
+    class Meta:
+        model = Unit
+        fields = [
+            'id', 'property', 'property_title', 'city', 'unit_name_or_number',
+            'price_per_night', 'max_guests', 'bedrooms', 'bathrooms', 'rating_avg', 'rating_count', 'cover_image',
+            'nights', 'total_price',
+        ]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None, extra_columns=()):
+        """
+        Loads exactly what the requested fields need: the parent property via
+        a join, the cover image via one windowed prefetch, and only the
+        matching columns. The query count stays fixed whatever the page size.
+        """
+        requested = cls.requested_fields(request)
+        fields = [name for name in cls.Meta.fields if name in requested] if requested else []
+        fields = fields or cls.Meta.fields
+
+        columns = {'id', *extra_columns}
+        for name in fields:
+            columns.update(cls.FIELD_COLUMNS[name])
+
+        if 'property_title' in fields or 'city' in fields:
+            queryset = queryset.select_related('property')
+        else:
+            queryset = queryset.select_related(None)
+
+        if 'cover_image' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'images',
+                queryset=UnitImage.objects.order_by('order', 'id')[:1],
+                to_attr='cover_images',
+            ))
+        return queryset.only(*columns)
+
+    def get_cover_image(self, obj):
+        images = getattr(obj, 'cover_images', None)
+        if images is None:
+            images = obj.images.all()[:1]
+        if not images:
+            return None
+        # Cards only need the small rendition, not the uploaded original
+        return rendition_url(images[0], 'thumb', request=self.context.get('request'))
+
+    def get_nights(self, obj):
+        return getattr(obj, 'nights', None)
+
+    def get_total_price(self, obj):
+        # Annotated by UnitFilter when the search has a stay
+        total_price = getattr(obj, 'total_price', None)
+        return str(total_price) if total_price is not None else None
+
+
 class PropertySerializer(serializers.ModelSerializer):
     """
     Serializer for the Property model, used for LIST views.
@@ -37,13 +166,20 @@ class PropertySerializer(serializers.ModelSerializer):
     """
     owner = UserSerializer(read_only=True)
     images = PropertyImageSerializer(many=True, read_only=True)
+    rating_histogram = serializers.ReadOnlyField()
     #units = UnitSerializer(many=True, read_only=True)
     class Meta:
         model = Property
         fields = [
             'id', 'owner', 'title', 'description', 'address', 'city',
-            'country', 'is_active', 'created_at', 'images'
-        ]
+            'country', 'latitude', 'longitude', 'is_active', 'created_at', 'images'
+        ] + RATING_FIELDS
+        read_only_fields = ['rating_avg', 'rating_count']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Joins/prefetches every relation this serializer nests."""
+        return queryset.select_related('owner').prefetch_related('images')
 
 
 class PropertyDetailSerializer(PropertySerializer):
@@ -54,6 +190,11 @@ class PropertyDetailSerializer(PropertySerializer):
 
     class Meta(PropertySerializer.Meta):
         fields = PropertySerializer.Meta.fields + ['units']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Adds the nested units and each unit's images to the list plan."""
+        return super().setup_eager_loading(queryset).prefetch_related('units__images')
     def get_units(self, obj):
         """
         This method is called to get the value for the 'units' field.
@@ -73,18 +214,12 @@ class PropertyDetailSerializer(PropertySerializer):
 
 # --- Host Management Serializers ---
 
-class BlockedDateSerializer(serializers.ModelSerializer):
-    """
-    Serializer for creating and viewing BlockedDate entries for a host.
-    """
+class HostUnitMixin(serializers.Serializer):
+    """Adds a writable `unit` that must belong to the logged-in host."""
     unit = serializers.PrimaryKeyRelatedField(
-        queryset=Unit.objects.all() # We filter for ownership in the validation
+        queryset=Unit.objects.select_related('property') # We filter for ownership in the validation
     )
 
-    class Meta:
-        model = BlockedDate
-        fields = ['id', 'unit', 'start_date', 'end_date', 'reason']
-
     def validate_unit(self, unit):
         """Ensures the unit belongs to the logged-in host."""
         request = self.context.get('request')
@@ -95,6 +230,16 @@ class BlockedDateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("You do not have permission to manage this unit.")
         return unit
 
+
+class BlockedDateSerializer(HostUnitMixin, serializers.ModelSerializer):
+    """
+    Serializer for creating and viewing BlockedDate entries for a host.
+    """
+    class Meta:
+        model = BlockedDate
+        # `feed` is set on blocks imported from an external calendar; the next sync overwrites them
+        fields = ['id', 'unit', 'start_date', 'end_date', 'reason', 'feed']
+
     def validate(self, data):
         """Validates dates and checks for overlapping blocks."""
         start_date = data.get('start_date')
@@ -118,16 +263,144 @@ class BlockedDateSerializer(serializers.ModelSerializer):
 
         return data
 
-class UnitImageUploadSerializer(serializers.ModelSerializer):
+class SeasonalRateSerializer(HostUnitMixin, serializers.ModelSerializer):
+    """Seasonal nightly rates a host sets on a unit."""
+    class Meta:
+        model = SeasonalRate
+        fields = ['id', 'unit', 'name', 'start_date', 'end_date', 'price_per_night', 'weekend_price_per_night']
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError("End date cannot be before start date.")
+        return data
+
+
+class PriceOverrideSerializer(HostUnitMixin, serializers.ModelSerializer):
+    """A host's fixed price for a single night."""
+    class Meta:
+        model = PriceOverride
+        fields = ['id', 'unit', 'date', 'price_per_night']
+        validators = []  # The unique (unit, date) pair is checked below with a clearer message
+
+    def validate(self, data):
+        unit = data.get('unit', getattr(self.instance, 'unit', None))
+        night = data.get('date', getattr(self.instance, 'date', None))
+        queryset = PriceOverride.objects.filter(unit=unit, date=night)
+        if self.instance:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError("This unit already has a price override for that date.")
+        return data
+
+
+class CalendarFeedSerializer(HostUnitMixin, serializers.ModelSerializer):
+    """An external iCal feed whose events block nights on a host's unit."""
+    class Meta:
+        model = CalendarFeed
+        fields = ['id', 'unit', 'name', 'url', 'next_sync_at', 'last_synced_at', 'last_error', 'created_at']
+        read_only_fields = ['next_sync_at', 'last_synced_at', 'last_error', 'created_at']
+        validators = []  # The unique (unit, url) pair is checked below with a clearer message
+
+    def validate_url(self, url):
+        try:
+            check_feed_url(url)
+        except CalendarFeedError as exc:
+            raise serializers.ValidationError(str(exc))
+        return url
+
+    def validate(self, data):
+        unit = data.get('unit', getattr(self.instance, 'unit', None))
+        url = data.get('url', getattr(self.instance, 'url', None))
+        queryset = CalendarFeed.objects.filter(unit=unit, url=url)
+        if self.instance:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError("This unit already imports that calendar.")
+        return data
+
+
+class UnitImageUploadSerializer(ProcessedOriginalMixin, serializers.ModelSerializer):
     """
     Serializer specifically for handling the upload of an image file.
     The 'unit' is associated in the view, not provided by the user.
+    Renditions are generated afterwards by the `process_images` worker.
     """
     class Meta:
         model = UnitImage
         fields = ['id', 'image', 'caption']
 
-class UnitImageSerializer(serializers.ModelSerializer):
+class UnitImageSerializer(ImageRenditionsMixin, serializers.ModelSerializer):
     class Meta:
         model = UnitImage
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['renditions', 'processed_at']
+        read_only_fields = ['width', 'height', 'size']
+
+# --- Bulk & Resumable Image Uploads ---
+
+MAX_BULK_IMAGES = 20
+
+
+class ImageTargetMixin(serializers.Serializer):
+    """
+    Accepts exactly one of `property`/`unit` and resolves it, with a single
+    ownership query, to an object the requesting host owns.
+    """
+    property = serializers.IntegerField(required=False)
+    unit = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        data = super().validate(data)
+        property_id, unit_id = data.get('property'), data.get('unit')
+        if (property_id is None) == (unit_id is None):
+            raise serializers.ValidationError("Provide either 'property' or 'unit'.")
+
+        owner = self.context['request'].user
+        if unit_id is not None:
+            target = Unit.objects.filter(pk=unit_id, property__owner=owner).first()
+        else:
+            target = Property.objects.filter(pk=property_id, owner=owner).first()
+        if target is None:
+            raise serializers.ValidationError("Not found or you do not have permission to add images to it.")
+        data['target'] = target
+        return data
+
+
+class BulkImageUploadSerializer(ImageTargetMixin):
+    """Several image files for one property or unit, in a single request."""
+    images = serializers.ListField(
+        child=serializers.ImageField(), allow_empty=False, max_length=MAX_BULK_IMAGES
+    )
+    captions = serializers.ListField(child=serializers.CharField(max_length=255, allow_blank=True), required=False)
+
+
+class ImageUploadSerializer(ImageTargetMixin, serializers.ModelSerializer):
+    """Starts a resumable upload; the file itself follows in PATCH chunks."""
+    property = serializers.IntegerField(required=False, write_only=True)
+    unit = serializers.IntegerField(required=False, write_only=True)
+
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'property', 'unit', 'filename', 'caption', 'size', 'offset', 'created_at', 'completed_at']
+        read_only_fields = ['offset', 'created_at', 'completed_at']
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f"Size must be between 1 and {settings.MAX_IMAGE_UPLOAD_SIZE} bytes."
+            )
+        return value
+
+    def create(self, validated_data):
+        target = validated_data.pop('target')
+        validated_data.pop('property', None)
+        validated_data.pop('unit', None)
+        field = 'unit' if isinstance(target, Unit) else 'property'
+        return ImageUpload.objects.create(owner=self.context['request'].user, **{field: target}, **validated_data)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['property'] = instance.property_id
+        data['unit'] = instance.unit_id
+        return data
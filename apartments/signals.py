@@ -0,0 +1,114 @@
+# In apartments/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from bookings.models import Booking
+from core.conditional import bump_versions
+from core.media import acquire_blobs, release_blobs
+from core.models import User
+from core.serializers import user_payload_changed
+from .amenities import lock_unit, sync_property, sync_unit
+from .cache import AVAILABILITY_SCOPE, bump_availability_version, bump_catalog
+from .models import BlockedDate, PriceOverride, Property, PropertyImage, SeasonalRate, Unit, UnitImage
+
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=BlockedDate)
+def invalidate_unit_availability(sender, instance, **kwargs):
+    """
+    Bumps the unit's availability version whenever a booking or block changes.
+    This covers status transitions saved by the host booking views and the
+    payment flow. The bump waits for the commit so a concurrent reader can't
+    re-cache the old ranges under the new version.
+    """
+    unit_id = instance.unit_id
+    transaction.on_commit(lambda: bump_availability_version(unit_id))
+    # Date-filtered unit searches depend on every unit's calendar
+    transaction.on_commit(lambda: bump_versions(AVAILABILITY_SCOPE))
+
+
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_property_responses(sender, instance, **kwargs):
+    """Lets conditional GETs of lists and this property's detail return fresh data."""
+    bump_catalog(property_ids=[instance.pk])
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_responses(sender, instance, update_fields=None, **kwargs):
+    """Property payloads embed the owner, so their edits must refresh the owner's properties."""
+    if not user_payload_changed(update_fields):
+        return
+    property_ids = list(Property.objects.filter(owner_id=instance.pk).values_list('pk', flat=True))
+    if property_ids:
+        bump_catalog(property_ids=property_ids)
+
+
+@receiver([post_save, post_delete], sender=Unit)
+def invalidate_unit_responses(sender, instance, **kwargs):
+    bump_catalog(property_ids=[instance.property_id], unit_ids=[instance.pk])
+
+
+@receiver(pre_save, sender=Unit)
+@receiver(pre_delete, sender=Unit)
+def lock_unit_for_amenities(sender, instance, raw=False, **kwargs):
+    """Reads the unit's amenities and activity, with its row locked until commit."""
+    if raw:
+        return
+    lock_unit(instance)
+
+
+@receiver(post_save, sender=Unit)
+def count_unit_amenities(sender, instance, **kwargs):
+    """Keeps AmenityCount in step with unit edits, in the same transaction."""
+    sync_unit(instance)
+
+
+@receiver(post_delete, sender=Unit)
+def uncount_unit_amenities(sender, instance, **kwargs):
+    sync_unit(instance, deleted=True)
+
+
+@receiver(post_save, sender=Property)
+def count_property_amenities(sender, instance, **kwargs):
+    sync_property(instance)
+
+
+@receiver([post_save, post_delete], sender=SeasonalRate)
+@receiver([post_save, post_delete], sender=PriceOverride)
+def invalidate_unit_quotes(sender, instance, **kwargs):
+    """Quotes and priced search results change; property details don't embed rates."""
+    bump_catalog(unit_ids=[instance.unit_id])
+
+
+@receiver([post_save, post_delete], sender=PropertyImage)
+def invalidate_property_image_responses(sender, instance, **kwargs):
+    bump_catalog(property_ids=[instance.property_id])
+
+
+@receiver([post_save, post_delete], sender=UnitImage)
+def invalidate_unit_image_responses(sender, instance, **kwargs):
+    property_id = Unit.objects.filter(pk=instance.unit_id).values_list('property_id', flat=True).first()
+    bump_catalog(property_ids=[property_id] if property_id else [], unit_ids=[instance.unit_id])
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_save, sender=UnitImage)
+def count_image_blob_references(sender, instance, created, **kwargs):
+    """
+    Keeps MediaBlob reference counts in step with image rows, in the same
+    transaction. bulk_create() skips signals, so bulk paths call
+    acquire_blobs() themselves.
+    """
+    if created:
+        acquire_blobs([instance.image.name])
+    elif getattr(instance, '_replaced_image', None):
+        release_blobs([instance._replaced_image])
+        acquire_blobs([instance.image.name])
+
+
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_delete, sender=UnitImage)
+def release_image_blob(sender, instance, **kwargs):
+    release_blobs([instance.image.name])
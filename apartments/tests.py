@@ -1,3 +1,164 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apartments.calendar_simulator import CalendarFeedSimulator
+from apartments.calendars import fetch_feed, sync_feed
+from apartments.models import BlockedDate, CalendarFeed, Property, Unit
+from core.models import User
+from core.testing import TEST_CACHES, QueryBudgetTestCase
+
+
+class PropertyQueryBudgetTests(QueryBudgetTestCase):
+    def test_property_list(self):
+        self.assertQueryBudget('/api/properties/', 5)
+
+    def test_property_detail(self):
+        self.assertQueryBudget('/api/properties/{property}/', 4)
+
+
+class UnitQueryBudgetTests(QueryBudgetTestCase):
+    def test_unit_list(self):
+        self.assertQueryBudget('/api/units/', 3)
+
+    def test_unit_list_for_a_stay(self):
+        self.assertQueryBudget('/api/units/?check_in={check_in}&check_out={check_out}', 5)
+
+    def test_unit_facets(self):
+        self.assertQueryBudget('/api/units/facets/?check_in={check_in}&check_out={check_out}', 1)
+
+    def test_unit_amenities(self):
+        self.assertQueryBudget('/api/units/amenities/', 1)
+
+    def test_unit_detail(self):
+        self.assertQueryBudget('/api/units/{unit}/', 2)
+
+    def test_unit_quote(self):
+        self.assertQueryBudget('/api/units/{unit}/quote/?check_in={check_in}&check_out={check_out}', 3)
+
+    def test_bulk_quotes(self):
+        self.assertQueryBudget('/api/units/quotes/?unit_ids={unit_ids}&check_in={check_in}&check_out={check_out}', 3)
+
+    def test_unit_availability(self):
+        self.assertQueryBudget('/api/units/{unit}/availability/', 3)
+
+    def test_bulk_availability(self):
+        self.assertQueryBudget('/api/units/availability/?unit_ids={unit_ids}', 2)
+
+
+class HostDashboardQueryBudgetTests(QueryBudgetTestCase):
+    def test_dashboard(self):
+        self.assertQueryBudget('/api/host/dashboard/', 5, user=self.host)
+
+    def test_my_bookings(self):
+        self.assertQueryBudget('/api/host/dashboard/my_bookings/', 3, user=self.host)
+
+    def test_my_reviews(self):
+        self.assertQueryBudget('/api/host/dashboard/my_reviews/', 2, user=self.host)
+
+
+def ics_event(uid, start, nights, summary='Reserved'):
+    return (
+        f'BEGIN:VEVENT\r\nUID:{uid}\r\nDTSTART;VALUE=DATE:{start:%Y%m%d}\r\n'
+        f'DTEND;VALUE=DATE:{start + timedelta(days=nights):%Y%m%d}\r\nSUMMARY:{summary}\r\nEND:VEVENT\r\n'
+    )
+
+
+@override_settings(CACHES=TEST_CACHES, CALENDAR_FEED_ALLOW_PRIVATE_HOSTS=True)
+class CalendarFeedSyncTests(TestCase):
+    """
+    Imports feeds served by the calendar simulator from a temporary folder;
+    rewriting the .ics file between syncs is how the other site "changes".
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.simulator = CalendarFeedSimulator(('127.0.0.1', 0), self.directory.name)
+        threading.Thread(target=self.simulator.serve_forever, daemon=True).start()
+        self.addCleanup(self.simulator.server_close)
+        self.addCleanup(self.simulator.shutdown)
+
+        self.host = User.objects.create_user(username='host', email='host@example.com', role=User.Role.HOST)
+        property_obj = Property.objects.create(owner=self.host, title='Sea View', address='1 Beach Rd', city='Mombasa')
+        self.unit = Unit.objects.create(property=property_obj, unit_name_or_number='A1', price_per_night=Decimal('100.00'))
+        self.feed = CalendarFeed.objects.create(unit=self.unit, name='Other site', url=f'{self.simulator.url}/other.ics')
+        self.start = date.today() + timedelta(days=30)
+
+    def publish(self, *events):
+        with open(os.path.join(self.directory.name, 'other.ics'), 'w', newline='') as feed:
+            feed.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\n' + ''.join(events) + 'END:VCALENDAR\r\n')
+
+    def imported_blocks(self):
+        return {
+            block.external_uid: (block.start_date, block.end_date, block.reason)
+            for block in BlockedDate.objects.filter(feed=self.feed)
+        }
+
+    def test_events_are_created_updated_and_deleted_by_uid(self):
+        self.publish(ics_event('a', self.start, 2), ics_event('b', self.start + timedelta(days=5), 3))
+        self.assertEqual(sync_feed(self.feed), (2, 0, 0))
+        self.assertEqual(self.imported_blocks(), {
+            'a': (self.start, self.start + timedelta(days=1), 'Reserved'),
+            'b': (self.start + timedelta(days=5), self.start + timedelta(days=7), 'Reserved'),
+        })
+        block_a = BlockedDate.objects.get(feed=self.feed, external_uid='a')
+
+        # 'a' moves and is renamed, 'b' is cancelled, 'c' is new
+        self.publish(ics_event('a', self.start + timedelta(days=1), 2, 'Owner stay'), ics_event('c', self.start + timedelta(days=10), 1))
+        self.assertEqual(sync_feed(self.feed), (1, 1, 1))
+        self.assertEqual(self.imported_blocks(), {
+            'a': (self.start + timedelta(days=1), self.start + timedelta(days=2), 'Owner stay'),
+            'c': (self.start + timedelta(days=10), self.start + timedelta(days=10), 'Reserved'),
+        })
+        self.assertTrue(BlockedDate.objects.filter(pk=block_a.pk, external_uid='a').exists())
+
+    def test_unchanged_feed_is_revalidated_without_writes(self):
+        self.publish(ics_event('a', self.start, 2))
+        sync_feed(self.feed)
+        self.feed.refresh_from_db()
+        self.assertTrue(self.feed.etag)
+
+        self.assertIsNone(fetch_feed(self.feed))
+        self.assertEqual(sync_feed(self.feed), (0, 0, 0))
+        self.assertEqual(len(self.imported_blocks()), 1)
+
+    def test_manual_blocks_are_left_alone(self):
+        manual = BlockedDate.objects.create(unit=self.unit, start_date=self.start, end_date=self.start, reason='Maintenance')
+        self.publish(ics_event('a', self.start + timedelta(days=3), 1))
+        sync_feed(self.feed)
+        self.publish()
+        self.assertEqual(sync_feed(self.feed), (0, 0, 1))
+        self.assertEqual(list(BlockedDate.objects.filter(unit=self.unit)), [manual])
+
+    def test_error_page_keeps_the_imported_blocks(self):
+        self.publish(ics_event('a', self.start, 2))
+        sync_feed(self.feed)
+        with open(os.path.join(self.directory.name, 'other.ics'), 'w') as feed:
+            feed.write('<html>Service unavailable</html>')
+
+        with self.assertLogs('apartments.calendars', 'WARNING'):
+            self.assertEqual(sync_feed(self.feed), (0, 0, 0))
+        self.feed.refresh_from_db()
+        self.assertTrue(self.feed.last_error)
+        self.assertEqual(len(self.imported_blocks()), 1)
+
+    @override_settings(CALENDAR_FEED_ALLOW_PRIVATE_HOSTS=False)
+    def test_private_feed_urls_are_refused(self):
+        client = APIClient()
+        client.force_authenticate(self.host)
+        response = client.post('/api/host/calendar-feeds/', {'unit': self.unit.pk, 'url': f'{self.simulator.url}/new.ics'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('url', response.data)
+
+        self.publish(ics_event('a', self.start, 2))
+        with self.assertLogs('apartments.calendars', 'WARNING'):
+            self.assertEqual(sync_feed(self.feed), (0, 0, 0))
+        self.feed.refresh_from_db()
+        self.assertIn('not a public address', self.feed.last_error)
@@ -0,0 +1,165 @@
+# In apartments/uploads.py
+
+"""
+Bulk and resumable image uploads for hosts.
+
+Neither path holds a whole file in memory. Bulk uploads are parsed with
+Django's TemporaryFileUploadHandler, so every file is streamed to a temp
+file on disk, and the storage backend then moves it into MEDIA_ROOT instead
+of copying it. Resumable uploads append each chunk straight from the request
+stream to a partial file under CHUNKED_UPLOAD_DIR and move it into storage
+the same way once the last byte has arrived.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.exceptions import ConflictError
+from core.media import acquire_blobs
+from .cache import bump_catalog
+from .models import ImageUpload, PropertyImage, Unit, UnitImage
+from .serializers import PropertyImageSerializer, UnitImageUploadSerializer
+
+# Bytes read from the request per write while appending a chunk.
+STREAM_BLOCK_SIZE = 64 * 1024
+
+UPLOAD_OFFSET_HEADER = 'Upload-Offset'
+
+
+def use_disk_upload_handlers(request):
+    """
+    Makes a DRF request stream multipart files to disk instead of memory.
+    Must run before `request.data` is first read.
+    """
+    request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+
+
+class PartialUploadFile(File):
+    """
+    A finished partial upload on local disk. Exposing temporary_file_path()
+    lets image validation read it from disk and FileSystemStorage move it
+    into place instead of copying.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def partial_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def append_chunk(upload, stream, offset, length):
+    """
+    Appends `length` bytes from `stream` at `offset`. The offset must match
+    what the server already has, otherwise the client is told where to
+    resume with a ConflictError. `upload` must be locked by the caller.
+    """
+    if offset != upload.offset:
+        raise ConflictError(f"Upload is at offset {upload.offset}; resume from there.")
+    if length <= 0:
+        raise ValidationError({'detail': "Send the chunk as the request body."})
+    if upload.offset + length > upload.size:
+        raise ValidationError({'detail': f"Chunk runs past the declared size of {upload.size} bytes."})
+
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    path = partial_path(upload)
+    written = 0
+    with open(path, 'ab') as partial:
+        # Drop anything a previously interrupted chunk left past the offset
+        partial.truncate(upload.offset)
+        while written < length:
+            block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            partial.write(block)
+            written += len(block)
+
+    # Keep what arrived even if the connection dropped mid-chunk
+    upload.offset += written
+    upload.save(update_fields=['offset'])
+    return written
+
+
+def complete_upload(upload):
+    """
+    Turns a fully received upload into a PropertyImage or UnitImage.
+    Raises ValidationError (and discards the upload) if it isn't an image.
+    """
+    path = partial_path(upload)
+    serializer_class = UnitImageUploadSerializer if upload.unit_id else PropertyImageSerializer
+    with open(path, 'rb') as partial:
+        image_file = PartialUploadFile(partial, name=upload.filename)
+        serializer = serializer_class(data={'image': image_file, 'caption': upload.caption})
+        if not serializer.is_valid():
+            discard_upload(upload)
+            raise ValidationError(serializer.errors)
+        if upload.unit_id:
+            image = serializer.save(unit_id=upload.unit_id)
+        else:
+            image = serializer.save(property_id=upload.property_id)
+
+    # Storage normally moved the file away already
+    if os.path.exists(path):
+        os.remove(path)
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['completed_at'])
+    return image
+
+
+def discard_upload(upload):
+    """Deletes an upload session and its partial file."""
+    path = partial_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    upload.delete()
+
+
+def next_image_order(target):
+    """Order value that places new images after the target's existing ones."""
+    last = target.images.order_by('-order').values_list('order', flat=True).first()
+    return 0 if last is None else last + 1
+
+
+def bulk_create_images(target, files, captions=()):
+    """
+    Creates one image row per uploaded file for a Property or Unit in a
+    single INSERT. Storage still receives each file individually. The blob
+    references and cache invalidation that signals would normally handle are
+    done here.
+    """
+    model, target_field = (UnitImage, 'unit') if isinstance(target, Unit) else (PropertyImage, 'property')
+    captions = list(captions) + [''] * (len(files) - len(captions))
+    start = next_image_order(target)
+    images = [
+        model(**{target_field: target}, image=image_file, caption=caption, order=start + index)
+        for index, (image_file, caption) in enumerate(zip(files, captions))
+    ]
+    images = model.objects.bulk_create(images)
+    acquire_blobs([image.image.name for image in images])
+    if model is UnitImage:
+        bump_catalog(property_ids=[target.property_id], unit_ids=[target.pk])
+    else:
+        bump_catalog(property_ids=[target.pk])
+    return images
+
+
+def purge_stale_uploads(now=None):
+    """
+    Removes sessions older than CHUNKED_UPLOAD_EXPIRY_HOURS, finished or
+    abandoned, along with any partial file. Returns how many were removed.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS)
+    stale = ImageUpload.objects.filter(created_at__lt=cutoff)
+    removed = 0
+    for upload in stale.iterator():
+        discard_upload(upload)
+        removed += 1
+    return removed
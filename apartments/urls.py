@@ -2,7 +2,7 @@
 
 from django.urls import path, include
 from rest_framework_nested import routers
-from .views import PropertyViewSet, UnitViewSet, UnitImageViewSet, upload_property_image, get_unit_availability
+from .views import PropertyViewSet, UnitViewSet, UnitImageViewSet, upload_property_image, get_unit_availability, unit_calendar_feed
 
 # Primary router for top-level resources
 router = routers.DefaultRouter()
@@ -19,4 +19,5 @@ urlpatterns = [
     path('', include(properties_router.urls)),
     path('host/properties/<int:property_pk>/add-image/', upload_property_image, name='upload-property-image'),
      path('units/<int:unit_id>/availability/', get_unit_availability, name='unit-availability'),
+    path('units/<int:unit_id>/calendar.ics', unit_calendar_feed, name='unit-calendar-feed'),
 ]
\ No newline at end of file
@@ -1,5 +1,11 @@
 # In apartments/views.py
 
+from datetime import date
+
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+from django_filters.utils import translate_validation
 from rest_framework import viewsets, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -11,13 +17,32 @@ from .serializers import (
     PropertyImageSerializer,  # 👈 Make sure this import exists
     PropertyDetailSerializer,
     UnitSerializer, 
+    UnitListSerializer,
     UnitImageSerializer
 )
 from .filters import UnitFilter, PropertyFilter
+from .amenities import list_amenities
+from .calendars import check_calendar_token, render_calendar
+from .availability import parse_unit_ids, parse_window, serialize_ranges
+from .facets import get_facets
+from .geo import cluster_counts, parse_bbox
+from .pricing import UNIT_PRICING_COLUMNS, parse_stay, quote_stay, quote_stays, serialize_quote
+from .cache import (
+    AMENITIES_SCOPE, AVAILABILITY_SCOPE, CATALOG_SCOPE, get_cache_stats, get_cached_unavailable_ranges,
+    get_unit_versions, property_scope, unit_scope,
+)
+from core.conditional import ConditionalGetMixin, conditional_response
 from core.permissions import IsHostOrAdminOrReadOnly
-from datetime import date, timedelta
 
-class PropertyViewSet(viewsets.ModelViewSet):
+
+def availability_response(request, unit_ids, build_response):
+    """Answers availability reads with 304 while none of the units changed."""
+    versions = get_unit_versions(unit_ids)
+    fingerprint = ','.join(f'{unit_id}={versions[unit_id]}' for unit_id in unit_ids)
+    return conditional_response(request, fingerprint, None, build_response)
+
+
+class PropertyViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for viewing and managing Properties (Buildings/Complexes).
     """
@@ -25,11 +50,46 @@ class PropertyViewSet(viewsets.ModelViewSet):
     permission_classes = [IsHostOrAdminOrReadOnly]
     serializer_class = PropertyDetailSerializer
     filterset_class = PropertyFilter
+
+    def get_queryset(self):
+        return self.serializer_class.setup_eager_loading(super().get_queryset())
+
+    def get_version_scopes(self):
+        if self.action == 'retrieve':
+            return [property_scope(self.kwargs['pk'])]
+        return [CATALOG_SCOPE]
+
     def perform_create(self, serializer):
         """
         Automatically assign the logged-in user as the owner of the new property.
         """
         serializer.save(owner=self.request.user)
+
+    @action(detail=False, methods=['get'], url_path='map')
+    def map(self, request):
+        """
+        Clustered property counts for a map viewport.
+        Takes `bbox=south,west,north,east` plus any list filter and returns
+        one entry per grid cell (at most 64) with its count and mean position.
+        """
+        return self.conditional(self._map_clusters, request)
+
+    def _map_clusters(self, request):
+        if not request.query_params.get('bbox'):
+            return Response({'bbox': ["This query parameter is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        bbox = parse_bbox(request.query_params['bbox'])
+        # The filterset validates and applies every other list filter; clustering applies the box itself
+        params = request.query_params.copy()
+        del params['bbox']
+        filterset = self.filterset_class(params, queryset=Property.objects.filter(is_active=True), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        precision, clusters = cluster_counts(filterset.qs, bbox)
+        return Response({
+            'precision': precision,
+            'total': sum(cluster['count'] for cluster in clusters),
+            'clusters': clusters,
+        })
     
     @action(detail=True, methods=['post'], url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -75,7 +135,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
             )
 
 
-class UnitViewSet(viewsets.ReadOnlyModelViewSet):
+class UnitViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for searching and viewing individual Units.
     """
@@ -83,6 +143,112 @@ class UnitViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = UnitSerializer
     permission_classes = [permissions.AllowAny]
     filterset_class = UnitFilter
+    # Stable ordering for ?pagination=cursor
+    cursor_ordering = ('price_per_night', 'id')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return UnitListSerializer
+        return UnitSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Keep the cursor ordering columns loaded so paging never refetches them
+            return UnitListSerializer.setup_eager_loading(
+                queryset, self.request, extra_columns=self.cursor_ordering
+            )
+        if self.action == 'quote':
+            return queryset.select_related(None).only('id', *UNIT_PRICING_COLUMNS)
+        return queryset.prefetch_related('images')
+
+    def get_version_scopes(self):
+        if self.action in ('retrieve', 'quote'):
+            return [unit_scope(self.kwargs['pk'])]
+        if self.action == 'amenities':
+            return [AMENITIES_SCOPE]
+        if self.request.query_params.get('check_in'):
+            # Date searches also change whenever any booking or block does
+            return [CATALOG_SCOPE, AVAILABILITY_SCOPE]
+        return [CATALOG_SCOPE]
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Counts per city, bedroom bucket, guest capacity and price band for
+        the units matching the same filters as the list, in one query.
+        """
+        return self.conditional(self._facets, request)
+
+    def _facets(self, request):
+        filterset = self.filterset_class(request.query_params, queryset=self.queryset, request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return Response(get_facets(filterset, self.get_version_scopes()))
+
+    @action(detail=False, methods=['get'])
+    def amenities(self, request):
+        """
+        Every amenity offered by at least one searchable unit, with how many
+        offer it, most common first. Read from the AmenityCount table.
+        """
+        return self.conditional(self._amenities, request)
+
+    def _amenities(self, request):
+        return Response(list_amenities())
+
+    @action(detail=True, methods=['get'])
+    def quote(self, request, pk=None):
+        """
+        Prices a stay: `check_in`/`check_out` (YYYY-MM-DD) are required.
+        Returns the total with its per-rate breakdown and any length-of-stay
+        discount.
+        """
+        return self.conditional(self._quote, request, pk=pk)
+
+    def _quote(self, request, pk=None):
+        check_in, check_out = parse_stay(request.query_params)
+        unit = self.get_object()
+        return Response(serialize_quote(quote_stay(unit, check_in, check_out)))
+
+    @action(detail=False, methods=['get'])
+    def quotes(self, request):
+        """
+        Bulk price quotes for search results: `unit_ids=1,2,3` plus the
+        `check_in`/`check_out` of the stay, keyed by unit id.
+        """
+        return self.conditional(self._quotes, request)
+
+    def _quotes(self, request):
+        unit_ids = parse_unit_ids(request.query_params)
+        check_in, check_out = parse_stay(request.query_params)
+        units = Unit.objects.filter(pk__in=unit_ids, is_active=True, property__is_active=True).only(
+            'id', *UNIT_PRICING_COLUMNS
+        )
+        quotes = quote_stays(units, check_in, check_out)
+        return Response({str(unit_id): serialize_quote(quote) for unit_id, quote in quotes.items()})
+
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        Bulk availability calendar for search results.
+        Takes `unit_ids=1,2,3` plus optional `from`/`to` and returns every
+        unit's unavailable ranges keyed by unit id, in two queries total.
+        """
+        unit_ids = parse_unit_ids(request.query_params)
+        start, end = parse_window(request.query_params)
+
+        def build_response():
+            ranges = get_cached_unavailable_ranges(unit_ids, start, end)
+            return Response({str(unit_id): serialize_ranges(unit_ranges) for unit_id, unit_ranges in ranges.items()})
+
+        return availability_response(request, unit_ids, build_response)
+
+    @action(detail=False, methods=['get'], url_path='availability/cache-stats',
+            permission_classes=[permissions.IsAdminUser])
+    def availability_cache_stats(self, request):
+        """Hit/miss counters for the availability cache, shared by all workers."""
+        return Response(get_cache_stats())
 
 
 class HostDashboardView(APIView):
@@ -92,7 +258,7 @@ class HostDashboardView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        properties = Property.objects.filter(owner=request.user).prefetch_related('units__images')
+        properties = PropertySerializer.setup_eager_loading(Property.objects.filter(owner=request.user))
         serializer = PropertySerializer(properties, many=True)
         return Response(serializer.data)
 
@@ -132,34 +298,38 @@ def upload_property_image(request, property_pk):
 @permission_classes([permissions.AllowAny]) # This data is safe to be public
 def get_unit_availability(request, unit_id):
     """
-    Returns a list of all dates that are booked or blocked for a specific unit.
+    Returns the booked or blocked date ranges for a specific unit.
+    Each range is half-open: `start` is the first unavailable night and `end`
+    is the first night that is free again. Accepts optional `from`/`to`
+    (YYYY-MM-DD) query params to limit the response to a window.
     """
-    try:
-        unit = Unit.objects.get(pk=unit_id)
-    except Unit.DoesNotExist:
+    if not Unit.objects.filter(pk=unit_id).exists():
         return Response({'detail': 'Unit not found.'}, status=404)
-    
-    # Get all confirmed or pending bookings
-    booked_dates = []
-    bookings = unit.bookings.filter(status__in=['confirmed', 'pending'])
-    for booking in bookings:
-        # Generate all dates from check-in to (but not including) check-out
-        current_date = booking.check_in
-        while current_date < booking.check_out:
-            booked_dates.append(current_date.strftime('%Y-%m-%d'))
-            current_date += timedelta(days=1)
-            
-    # Get all host-blocked dates
-    blocked_dates = []
-    blocks = unit.blocked_dates.all()
-    for block in blocks:
-        current_date = block.start_date
-        while current_date <= block.end_date:
-            blocked_dates.append(current_date.strftime('%Y-%m-%d'))
-            current_date += timedelta(days=1)
-            
-    # Combine and remove duplicates, then return
-    all_unavailable_dates = sorted(list(set(booked_dates + blocked_dates)))
-    
-    return Response(all_unavailable_dates)
 
+    start, end = parse_window(request.query_params)
+
+    def build_response():
+        ranges = get_cached_unavailable_ranges([unit_id], start, end)[unit_id]
+        return Response(serialize_ranges(ranges))
+
+    return availability_response(request, [unit_id], build_response)
+
+
+@require_GET
+def unit_calendar_feed(request, unit_id):
+    """
+    iCal export of a unit's booked and blocked nights for other listing
+    sites. Takes the `token` from the host's calendar link instead of a
+    login. Polls are answered with 304 until the unit's calendar changes.
+    """
+    if not check_calendar_token(unit_id, request.GET.get('token')):
+        raise Http404
+    # The export drops old events as days pass, so the day is part of the fingerprint
+    today = date.today()
+
+    def build_response():
+        unit = get_object_or_404(Unit.objects.select_related('property'), pk=unit_id)
+        return HttpResponse(render_calendar(unit, today), content_type='text/calendar; charset=utf-8')
+
+    version = get_unit_versions([unit_id])[unit_id]
+    return conditional_response(request, f'{unit_id}={version}|{today}', None, build_response)
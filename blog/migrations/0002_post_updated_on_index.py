@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['updated_on'], name='post_updated_on_idx'),
+        ),
+    ]
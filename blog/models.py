@@ -13,6 +13,10 @@ class Post(models.Model):
     
     class Meta:
         ordering = ['-created_on']
+        indexes = [
+            # max(updated_on) is the post list's version fingerprint
+            models.Index(fields=['updated_on'], name='post_updated_on_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -1,21 +1,31 @@
 # In blog/views.py
+from django.db.models import Count, Max
 from rest_framework import generics, permissions
 
-
+from core.conditional import ConditionalGetMixin
 from .models import Post, NewsletterSubscription
 from .serializers import PostListSerializer, PostDetailSerializer, NewsletterSubscriptionSerializer
 
-class PostListView(generics.ListAPIView):
+class PostListView(ConditionalGetMixin, generics.ListAPIView):
     queryset = Post.objects.all()
     serializer_class = PostListSerializer
     permission_classes = [permissions.AllowAny]
 
-class PostDetailView(generics.RetrieveAPIView):
+    def get_fingerprint(self):
+        # The count catches deletions, which don't move max(updated_on)
+        stats = Post.objects.aggregate(latest=Max('updated_on'), total=Count('id'))
+        return f"{stats['latest']}|{stats['total']}", stats['latest']
+
+class PostDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Post.objects.all()
     serializer_class = PostDetailSerializer
     lookup_field = 'slug' # Fetch post by its slug instead of ID
     permission_classes = [permissions.AllowAny]
 
+    def get_fingerprint(self):
+        updated_on = Post.objects.filter(slug=self.kwargs['slug']).values_list('updated_on', flat=True).first()
+        return str(updated_on), updated_on
+
 class NewsletterSubscribeView(generics.CreateAPIView):
     queryset = NewsletterSubscription.objects.all()
     serializer_class = NewsletterSubscriptionSerializer
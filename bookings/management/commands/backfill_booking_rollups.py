@@ -0,0 +1,63 @@
+# In bookings/management/commands/backfill_booking_rollups.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import ExtractDay, TruncMonth
+
+from bookings.models import Booking, BookingRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the host analytics rollups from confirmed bookings. Run it once after "
+        "deploying the rollup table, or after bulk edits that bypass model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        confirmed = Booking.objects.filter(status=Booking.STATUS_CONFIRMED).annotate(
+            stay=ExpressionWrapper(F('check_out') - F('check_in'), output_field=DurationField())
+        )
+        periods = {
+            BookingRollup.GRANULARITY_DAY: F('check_in'),
+            BookingRollup.GRANULARITY_MONTH: TruncMonth('check_in'),
+        }
+
+        with transaction.atomic():
+            BookingRollup.objects.all().delete()
+            for granularity, period in periods.items():
+                totals = confirmed.annotate(period=period).values(
+                    'unit_id', 'unit__property__owner_id', 'period'
+                ).annotate(
+                    total_revenue=Sum('total_price'),
+                    total_nights=Sum(ExtractDay('stay')),
+                    total_bookings=Count('id'),
+                ).order_by()
+
+                rows = (
+                    BookingRollup(
+                        host_id=row['unit__property__owner_id'],
+                        unit_id=row['unit_id'],
+                        granularity=granularity,
+                        period_start=row['period'],
+                        revenue=row['total_revenue'],
+                        nights=row['total_nights'],
+                        bookings=row['total_bookings'],
+                    )
+                    for row in totals.iterator(chunk_size=options['batch_size'])
+                )
+                created = 0
+                batch = []
+                for rollup in rows:
+                    batch.append(rollup)
+                    if len(batch) >= options['batch_size']:
+                        created += len(BookingRollup.objects.bulk_create(batch))
+                        batch = []
+                if batch:
+                    created += len(BookingRollup.objects.bulk_create(batch))
+                self.stdout.write(f"{granularity}: {created} rollup rows")
+
+        self.stdout.write(self.style.SUCCESS("Booking rollups rebuilt."))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0008_blockeddate_blocked_unit_dates_idx'),
+        ('bookings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['unit', 'status', 'check_in', 'check_out'], name='booking_unit_status_dates_idx'),
+        ),
+    ]
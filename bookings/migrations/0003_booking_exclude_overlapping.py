@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:43
+
+import bookings.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0008_blockeddate_blocked_unit_dates_idx'),
+        ('bookings', '0002_booking_booking_unit_status_dates_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Needed so the GiST index can compare unit ids with '='
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), expressions=[('unit', '='), (bookings.models.DateRange('check_in', 'check_out', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&')], name='exclude_overlapping_bookings'),
+        ),
+    ]
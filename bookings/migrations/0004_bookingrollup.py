@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0009_property_search_vector'),
+        ('bookings', '0003_booking_exclude_overlapping'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('nights', models.IntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_rollups', to=settings.AUTH_USER_MODEL)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_rollups', to='apartments.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['host', 'granularity', 'period_start'], name='rollup_host_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'unit', 'period_start'), name='unique_booking_rollup_period')],
+            },
+        ),
+    ]
@@ -1,8 +1,20 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeBoundary, RangeOperators
 from apartments.models import Unit
 from django.db.models import Q, CheckConstraint, F
 
+# Name of the exclusion constraint that rejects overlapping active bookings.
+OVERLAPPING_BOOKINGS_CONSTRAINT = 'exclude_overlapping_bookings'
+
+
+class DateRange(models.Func):
+    """SQL daterange(lower, upper, bounds), used by the overlap constraint."""
+    function = 'daterange'
+    output_field = DateRangeField()
+
+
 class Booking(models.Model):
     STATUS_PENDING = 'pending'
     STATUS_CONFIRMED = 'confirmed'
@@ -22,7 +34,58 @@ class Booking(models.Model):
     class Meta:
         constraints = [
             CheckConstraint(check=Q(check_out__gt=F('check_in')), name='check_out_after_check_in'),
+            # A unit can't hold two pending/confirmed bookings whose [check_in, check_out) ranges overlap.
+            # Enforced by Postgres, so concurrent requests can't both slip past an application check.
+            ExclusionConstraint(
+                name=OVERLAPPING_BOOKINGS_CONSTRAINT,
+                expressions=[
+                    ('unit', RangeOperators.EQUAL),
+                    (DateRange('check_in', 'check_out', RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(status__in=['pending', 'confirmed']),
+            ),
+        ]
+        indexes = [
+            # Serves the availability anti-join and the per-unit calendar
+            models.Index(fields=['unit', 'status', 'check_in', 'check_out'], name='booking_unit_status_dates_idx'),
         ]
 
     def __str__(self):
         return f"Booking {self.id} ({self.unit})"
+
+    def save(self, *args, **kwargs):
+        # The rollup signals lock the row in pre_save and apply the delta in
+        # post_save; one transaction keeps that lock across the write.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class BookingRollup(models.Model):
+    """
+    Pre-aggregated confirmed-booking totals per unit and period, used by the
+    host analytics dashboard. A booking counts towards the day and month of
+    its check-in. Rows are updated incrementally by signals (see
+    bookings/rollups.py) and can be rebuilt with `backfill_booking_rollups`.
+    """
+    GRANULARITY_DAY = 'day'
+    GRANULARITY_MONTH = 'month'
+    GRANULARITY_CHOICES = [(GRANULARITY_DAY, 'Day'), (GRANULARITY_MONTH, 'Month')]
+
+    host = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='booking_rollups')
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='booking_rollups')
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()  # The day, or the first day of the month
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    nights = models.IntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'unit', 'period_start'], name='unique_booking_rollup_period'),
+        ]
+        indexes = [
+            models.Index(fields=['host', 'granularity', 'period_start'], name='rollup_host_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.unit} {self.granularity} {self.period_start}"
@@ -0,0 +1,104 @@
+# In bookings/rollups.py
+
+"""
+Incremental maintenance of BookingRollup rows.
+
+Only confirmed bookings count. When a booking is saved we subtract what it
+contributed in the database just before the write (if it was confirmed) and
+add what it contributes now (if it is confirmed), so status changes,
+repricing and date changes all end up as small deltas on at most four
+rollup rows. The "before" is read with the row locked, not taken from the
+instance, so two processes saving the same booking (a host status change
+and the payment worker, say) apply their deltas one after the other.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from apartments.models import Unit
+from .models import Booking, BookingRollup
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def contribution(unit_id, status, check_in, check_out, total_price):
+    """Returns (unit_id, check_in, revenue, nights) or None if it doesn't count."""
+    if status != Booking.STATUS_CONFIRMED:
+        return None
+    return unit_id, check_in, total_price, (check_out - check_in).days
+
+
+def locked_contribution(booking):
+    """
+    What the booking contributes in the database right now, locking its row
+    until the transaction ends. Called just before the booking is written.
+    """
+    if booking._state.adding or booking.pk is None:
+        return None
+    row = (
+        Booking.objects.select_for_update()
+        .filter(pk=booking.pk)
+        .values_list('unit_id', 'status', 'check_in', 'check_out', 'total_price')
+        .first()
+    )
+    if row is None:
+        return None
+    unit_id, status, check_in, check_out, total_price = row
+    return contribution(unit_id, status, check_in, check_out, total_price)
+
+
+def current_contribution(booking):
+    return contribution(booking.unit_id, booking.status, booking.check_in, booking.check_out, booking.total_price)
+
+
+def apply_contribution(item, sign):
+    """Adds (sign=1) or removes (sign=-1) one booking's totals from its rollup rows."""
+    unit_id, check_in, revenue, nights = item
+    host_id = Unit.objects.filter(pk=unit_id).values_list('property__owner_id', flat=True).first()
+    if host_id is None:
+        return
+
+    for granularity, period_start in (
+        (BookingRollup.GRANULARITY_DAY, check_in),
+        (BookingRollup.GRANULARITY_MONTH, month_start(check_in)),
+    ):
+        _add_to_row(host_id, unit_id, granularity, period_start, sign * revenue, sign * nights, sign)
+
+
+def _add_to_row(host_id, unit_id, granularity, period_start, revenue, nights, bookings):
+    rows = BookingRollup.objects.filter(granularity=granularity, unit_id=unit_id, period_start=period_start)
+    changes = {
+        'revenue': F('revenue') + revenue,
+        'nights': F('nights') + nights,
+        'bookings': F('bookings') + bookings,
+    }
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            BookingRollup.objects.create(
+                host_id=host_id, unit_id=unit_id, granularity=granularity, period_start=period_start,
+                revenue=revenue, nights=nights, bookings=bookings,
+            )
+    except IntegrityError:
+        # Another request created the row between our UPDATE and INSERT.
+        rows.update(**changes)
+
+
+def lock_booking(booking):
+    """Locks the booking's row and remembers its contribution for sync_booking()."""
+    booking._rollup_before = locked_contribution(booking)
+
+
+def sync_booking(booking, deleted=False):
+    """Applies the change in a booking's contribution since lock_booking()."""
+    before = booking.__dict__.pop('_rollup_before', None)
+    after = None if deleted else current_contribution(booking)
+    if before == after:
+        return
+    if before:
+        apply_contribution(before, -1)
+    if after:
+        apply_contribution(after, 1)
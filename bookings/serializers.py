@@ -1,13 +1,33 @@
 # In bookings/serializers.py
 
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Booking
+from .models import Booking, OVERLAPPING_BOOKINGS_CONSTRAINT
 # --- CHANGE 1: Import the correct serializer ---
 from apartments.serializers import UnitSerializer
 from core.serializers import UserSerializer
 from apartments.models import Unit
+from apartments.pricing import quote_stay
+from core.exceptions import ConflictError
 import datetime
 
+
+@contextmanager
+def overlapping_booking_guard():
+    """
+    Turns a violation of the overlapping-bookings exclusion constraint into a
+    409 Conflict. Any other integrity error is re-raised untouched.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        diag = getattr(exc.__cause__, 'diag', None)
+        if getattr(diag, 'constraint_name', None) == OVERLAPPING_BOOKINGS_CONSTRAINT:
+            raise ConflictError("This unit is already booked for the selected dates.")
+        raise
+
 class BookingSerializer(serializers.ModelSerializer):
     """
     Serializer for viewing booking details. Includes nested unit and user data.
@@ -26,7 +46,8 @@ class BookingSerializer(serializers.ModelSerializer):
 
 class CreateBookingSerializer(serializers.ModelSerializer):
     """
-    Serializer for creating a new booking. Validates input and calculates price.
+    Serializer for creating a new booking. Validates input and prices the stay
+    with the unit's pricing rules (apartments/pricing.py).
     """
     # --- CHANGE 3: The primary key now refers to a Unit ---
     unit_id = serializers.PrimaryKeyRelatedField(
@@ -51,18 +72,10 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         if check_out <= check_in:
             raise serializers.ValidationError("Check-out date must be after check-in date.")
 
-        overlapping_bookings = Booking.objects.filter(
-            unit=unit,
-            status__in=['pending', 'confirmed'],
-            check_in__lt=check_out,
-            check_out__gt=check_in
-        ).exists()
+        # Overlaps are not checked here: a read-then-insert check races under
+        # concurrent requests. The database's exclusion constraint rejects
+        # them on INSERT instead (see create()).
 
-        if overlapping_bookings:
-            raise serializers.ValidationError(
-                "This unit is already booked for the selected dates."
-            )
-        
         if data['guests'] > unit.max_guests:
             raise serializers.ValidationError(
                 f"The number of guests ({data['guests']}) exceeds the maximum capacity ({unit.max_guests})."
@@ -71,28 +84,38 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        # --- CHANGE 5: Price calculation now uses the unit's price ---
+        # Seasonal rates, per-night overrides and stay discounts all apply
         unit = validated_data['unit']
         check_in = validated_data['check_in']
         check_out = validated_data['check_out']
-        num_nights = (check_out - check_in).days
-        total_price = unit.price_per_night * num_nights
-
-        booking = Booking.objects.create(
-            user=self.context['request'].user,
-            total_price=total_price,
-            unit=validated_data.get('unit'),
-            check_in=check_in,
-            check_out=check_out,
-            guests=validated_data.get('guests'),
-        )
+        total_price = quote_stay(unit, check_in, check_out)['total']
+
+        with overlapping_booking_guard():
+            booking = Booking.objects.create(
+                user=self.context['request'].user,
+                total_price=total_price,
+                unit=validated_data.get('unit'),
+                check_in=check_in,
+                check_out=check_out,
+                guests=validated_data.get('guests'),
+            )
         return booking
 class BookingSerializer(serializers.ModelSerializer):
     unit = UnitSerializer(read_only=True)
     class Meta:
         model = Booking
         fields = '__all__'
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Joins the unit and prefetches its images, which UnitSerializer nests."""
+        return queryset.select_related('unit').prefetch_related('unit__images')
 class BookingStatusUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
-        fields = ['status'] # Only allow updating the status field
\ No newline at end of file
+        fields = ['status'] # Only allow updating the status field
+
+    def update(self, instance, validated_data):
+        # Re-activating a cancelled booking can collide with a newer one
+        with overlapping_booking_guard():
+            return super().update(instance, validated_data)
\ No newline at end of file
@@ -0,0 +1,29 @@
+# In bookings/signals.py
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Booking
+from .rollups import lock_booking, sync_booking
+
+
+@receiver(pre_save, sender=Booking)
+@receiver(pre_delete, sender=Booking)
+def lock_booking_for_rollups(sender, instance, raw=False, **kwargs):
+    """Reads what the booking contributes now, with its row locked until commit."""
+    if raw:
+        return
+    lock_booking(instance)
+
+
+@receiver(post_save, sender=Booking)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    """Keeps the host analytics rollups in step with booking status changes."""
+    if raw:
+        return
+    sync_booking(instance)
+
+
+@receiver(post_delete, sender=Booking)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    sync_booking(instance, deleted=True)
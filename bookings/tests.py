@@ -1,3 +1,98 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apartments.models import Property, Unit
+from bookings.models import Booking
+from core.models import User
+from core.testing import TEST_CACHES, QueryBudgetTestCase
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Fires overlapping booking requests at one unit from several threads, each
+    on its own database connection, so the INSERTs really race. The exclusion
+    constraint must let exactly one through and the API must answer 409 to
+    the rest. TransactionTestCase because every thread has to see the
+    committed unit and each other's commits.
+    """
+
+    workers = 8
+    rounds = 3
+
+    def setUp(self):
+        host = User.objects.create_user(username='host', email='host@example.com', password='pw', role='HOST')
+        property_obj = Property.objects.create(
+            owner=host, title='Sea View', address='1 Beach Rd', city='Mombasa', description='Beach flat',
+        )
+        self.unit = Unit.objects.create(
+            property=property_obj, unit_name_or_number='A1', price_per_night=Decimal('100.00'), max_guests=4,
+        )
+        # One guest per worker so the per-user booking rate limit never answers instead of the database
+        self.guests = [
+            User.objects.create_user(username=f'guest{i}', email=f'guest{i}@example.com', password='pw')
+            for i in range(self.workers)
+        ]
+
+    def _race(self, check_in, check_out):
+        barrier = threading.Barrier(self.workers)
+        statuses = [None] * self.workers
+        data = {
+            'unit_id': self.unit.pk,
+            'check_in': check_in.isoformat(),
+            'check_out': check_out.isoformat(),
+            'guests': 1,
+        }
+
+        def attempt(index):
+            client = APIClient()
+            client.force_authenticate(self.guests[index])
+            try:
+                barrier.wait()  # Release every request at the same moment
+                statuses[index] = client.post(reverse('booking-list'), data, format='json').status_code
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(i,)) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_exactly_one_overlapping_booking_succeeds(self):
+        base_date = date.today() + timedelta(days=30)
+        for round_number in range(self.rounds):
+            check_in = base_date + timedelta(days=round_number * 10)
+            with self.subTest(round=round_number):
+                statuses = self._race(check_in, check_in + timedelta(days=3))
+                self.assertEqual(statuses.count(status.HTTP_201_CREATED), 1, statuses)
+                self.assertEqual(statuses.count(status.HTTP_409_CONFLICT), self.workers - 1, statuses)
+                self.assertEqual(
+                    Booking.objects.filter(unit=self.unit, check_in=check_in).count(), 1,
+                )
+
+    def test_overlap_with_an_existing_booking_is_rejected(self):
+        check_in = date.today() + timedelta(days=30)
+        Booking.objects.create(
+            unit=self.unit, user=self.guests[0], check_in=check_in, check_out=check_in + timedelta(days=3),
+            guests=1, total_price=Decimal('300.00'),
+        )
+        statuses = self._race(check_in + timedelta(days=1), check_in + timedelta(days=4))
+        self.assertEqual(statuses, [status.HTTP_409_CONFLICT] * self.workers)
+        self.assertEqual(Booking.objects.filter(unit=self.unit).count(), 1)
+
+
+class BookingQueryBudgetTests(QueryBudgetTestCase):
+    def test_guest_bookings(self):
+        self.assertQueryBudget('/api/bookings/', 3, user=self.guest)
+
+    def test_guest_my_bookings(self):
+        self.assertQueryBudget('/api/my-bookings/', 2, user=self.guest)
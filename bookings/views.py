@@ -17,6 +17,7 @@ class BookingViewSet(viewsets.ModelViewSet):
     
     queryset = Booking.objects.all()
     permission_classes = [permissions.IsAuthenticated]  # Only authenticated users can manage bookings
+    cursor_ordering = ('-created_at', '-id')  # Stable ordering for ?pagination=cursor
 
     def get_serializer_class(self):
         """
@@ -32,9 +33,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         This view should only return bookings for the currently authenticated user.
         """
-        return Booking.objects.filter(user=self.request.user).select_related(
-            'unit__property'
-        ).prefetch_related('unit__images')
+        return BookingSerializer.setup_eager_loading(Booking.objects.filter(user=self.request.user))
 
     @method_decorator(ratelimit(key='user', rate='5/m', method='POST'), name='create')
     def create(self, request, *args, **kwargs):
@@ -56,8 +55,6 @@ class MyBookingsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        bookings = Booking.objects.filter(user=request.user).select_related(
-            'unit__property'
-        ).prefetch_related('unit__images')
+        bookings = BookingSerializer.setup_eager_loading(Booking.objects.filter(user=request.user))
         serializer = BookingSerializer(bookings, many=True)
         return Response(serializer.data)
\ No newline at end of file
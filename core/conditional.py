@@ -0,0 +1,109 @@
+# In core/conditional.py
+
+"""
+Conditional GET for read endpoints.
+
+A view describes its response by a few cheap version fingerprints: either
+cache-held version stamps that signals bump when the underlying rows change,
+or a small aggregate such as max(updated_on). The fingerprints, the full
+path and the Accept header are hashed into an ETag, and a matching
+If-None-Match (or If-Modified-Since) is answered with 304 before any
+queryset or serializer runs.
+
+Version stamps are nanosecond timestamps, so the newest one also serves as
+Last-Modified. Bumping writes a fresh timestamp rather than incrementing,
+which keeps stamps meaningful across workers and cache evictions.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+VERSION_KEY = 'resource:{scope}:version'
+# Shared caches may store the response but must revalidate every time.
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+
+def get_versions(scopes):
+    """Returns {scope: version stamp}, initialising stamps that are missing."""
+    keys = {scope: VERSION_KEY.format(scope=scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    missing = {key: time.time_ns() for key in keys.values() if key not in found}
+    if missing:
+        for key, stamp in missing.items():
+            cache.add(key, stamp, timeout=None)
+        found.update(cache.get_many(missing))
+    return {scope: found.get(key, 0) for scope, key in keys.items()}
+
+
+def bump_versions(*scopes):
+    """Marks every response built from these scopes as changed."""
+    stamp = time.time_ns()
+    cache.set_many({VERSION_KEY.format(scope=scope): stamp for scope in scopes}, timeout=None)
+
+
+def stamp_to_datetime(stamp):
+    return datetime.fromtimestamp(stamp / 1e9, tz=dt_timezone.utc)
+
+
+def make_etag(request, fingerprint):
+    """Weak ETag over the fingerprint, the exact URL and the negotiated format."""
+    raw = f"{request.get_full_path()}|{request.headers.get('Accept', '')}|{fingerprint}"
+    return 'W/"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional_response(request, fingerprint, last_modified, build_response):
+    """
+    Returns 304 if the client's copy matches `fingerprint`, otherwise calls
+    build_response() and stamps the result with ETag/Last-Modified.
+    `last_modified` is an aware datetime or None.
+    """
+    etag = make_etag(request, fingerprint)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    response = not_modified or build_response()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        response['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+
+def version_fingerprint(scopes, extra=''):
+    """Returns (fingerprint, last_modified) for a set of version scopes."""
+    versions = get_versions(scopes)
+    fingerprint = ','.join(f'{scope}={versions[scope]}' for scope in sorted(versions)) + extra
+    last_modified = stamp_to_datetime(max(versions.values())) if versions else None
+    return fingerprint, last_modified
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/Last-Modified and 304s to a DRF list/retrieve view.
+    Views implement get_version_scopes() returning the cache scopes their
+    payload depends on, or override get_fingerprint() for a custom one.
+    """
+
+    def get_version_scopes(self):
+        raise NotImplementedError
+
+    def get_fingerprint(self):
+        """Returns (fingerprint, last_modified)."""
+        return version_fingerprint(self.get_version_scopes())
+
+    def conditional(self, handler, request, *args, **kwargs):
+        fingerprint, last_modified = self.get_fingerprint()
+        return conditional_response(
+            request, fingerprint, last_modified, lambda: handler(request, *args, **kwargs)
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -1,5 +1,7 @@
 # In core/exceptions.py
 
+from rest_framework import status
+from rest_framework.exceptions import APIException
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 
@@ -29,4 +31,13 @@ def custom_exception_handler(exc, context):
         print(f"--- END TRACE ---")
         return Response({'detail': f'Unhandled server error: {str(exc)}'}, status=500)
 
-    return response
\ No newline at end of file
+    return response
+
+class ConflictError(APIException):
+    """
+    Raised when a write is rejected because it conflicts with existing data,
+    e.g. a booking that overlaps another one for the same unit.
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This request conflicts with the current state of the resource.'
+    default_code = 'conflict'
@@ -0,0 +1,99 @@
+# In core/mail.py
+
+"""
+Durable outbound email queue.
+
+`enqueue_email()` only inserts a row, so it is safe to call from a request.
+The `send_queued_emails` worker calls `deliver_due_emails()`, which claims a
+batch of due messages, sends them over one reused SMTP connection and
+reschedules failures with exponential backoff.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+MAX_ATTEMPTS = 6
+BASE_RETRY_DELAY = timedelta(minutes=1)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def enqueue_email(subject, message, recipient_list, html_message=None, from_email=None):
+    """Queues an email for the worker. Mirrors the send_mail() arguments."""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """1, 2, 4, 8... minutes, capped at an hour."""
+    return min(BASE_RETRY_DELAY * (2 ** (attempts - 1)), MAX_RETRY_DELAY)
+
+
+def _record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboundEmail.Status.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def deliver_due_emails(batch_size=50):
+    """
+    Sends one batch of due emails and returns (sent, failed) counts.
+    Rows are claimed with SKIP LOCKED so several workers can run at once.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboundEmail.Status.PENDING,
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+
+        sent = failed = 0
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as exc:
+            # The SMTP server is unreachable; retry the whole batch later.
+            for email in batch:
+                _record_failure(email, exc, now)
+            failed = len(batch)
+        else:
+            for email in batch:
+                message = EmailMultiAlternatives(
+                    email.subject, email.body, email.from_email, email.to, connection=connection
+                )
+                if email.html_body:
+                    message.attach_alternative(email.html_body, 'text/html')
+                try:
+                    message.send()
+                except Exception as exc:
+                    _record_failure(email, exc, now)
+                    failed += 1
+                else:
+                    email.attempts += 1
+                    email.status = OutboundEmail.Status.SENT
+                    email.sent_at = timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return sent, failed
@@ -0,0 +1,29 @@
+# In core/management/commands/send_queued_emails.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver_due_emails
+
+
+class Command(BaseCommand):
+    help = "Worker that delivers queued outbound emails in batches over a reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the due messages once and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                sent, failed = deliver_due_emails(options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}")
+                    continue  # There may be more due right away
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping email worker.")
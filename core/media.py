@@ -0,0 +1,186 @@
+# In core/media.py
+
+"""
+Reference counting for content-addressed media blobs.
+
+Image models call acquire_blobs()/release_blobs() from their signal
+handlers (and bulk paths) in the same transaction as the row change, so the
+count moves with the data. A blob whose count drops to zero is left on disk
+until `gc_media_blobs` removes it after a grace period.
+
+A request that saves a file and then fails rolls back the blob's row but
+not the file. Such files, and temporary files left by an interrupted
+write, have no row at all; sweep_unregistered_blob_files() finds them by
+walking the blob folder.
+"""
+
+import os
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import MediaBlob
+from .storage import BLOB_PREFIX, is_blob
+
+
+def register_blob(path, size):
+    """
+    Records a blob that is about to be stored, or touches an existing row.
+    Storage calls this *before* relying on the file being there. The upsert
+    waits for a collector that holds the row, and restarting created_at
+    takes an orphan out of the grace period. Safe to call repeatedly.
+    """
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(path=path, size=size)],
+        update_conflicts=True, unique_fields=['path'], update_fields=['size', 'created_at'],
+    )
+
+
+def _adjust(paths, sign):
+    counts = Counter(path for path in paths if is_blob(path))
+    # One UPDATE per distinct increment; almost always just one
+    by_delta = {}
+    for path, count in counts.items():
+        by_delta.setdefault(count, []).append(path)
+    for count, grouped in by_delta.items():
+        MediaBlob.objects.filter(path__in=grouped).update(ref_count=F('ref_count') + sign * count)
+
+
+def acquire_blobs(paths):
+    """Adds one reference per occurrence of each blob path."""
+    _adjust(paths, 1)
+
+
+def release_blobs(paths):
+    """Drops one reference per occurrence of each blob path."""
+    _adjust(paths, -1)
+
+
+def recount_blob_references(sources):
+    """
+    Rebuilds every ref_count from the rows that actually point at blobs, in
+    one UPDATE. `sources` is a list of (model, file field name) pairs.
+    Returns how many blobs had a wrong count.
+    """
+    total = Value(0)
+    for model, field in sources:
+        references = (
+            model.objects.filter(**{field: OuterRef('path')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        total = total + Coalesce(Subquery(references), Value(0))
+    drifted = MediaBlob.objects.annotate(actual=total).exclude(ref_count=F('actual'))
+    return MediaBlob.objects.filter(pk__in=drifted.values('pk')).update(ref_count=total)
+
+
+def remove_blob_files(storage, paths, on_delete=None):
+    """
+    Deletes the files of blobs whose rows are gone, unless a new upload has
+    registered the path again since. For each path a placeholder row is
+    inserted first: a concurrent register_blob() either got there before
+    (the insert conflicts and the file is kept) or waits on the placeholder
+    until the file is gone, and then finds it missing and writes it again.
+    """
+    removed = []
+    for path in paths:
+        try:
+            with transaction.atomic():
+                placeholder = MediaBlob.objects.create(path=path, size=0)
+                storage.delete(path)
+                if on_delete is not None:
+                    on_delete(path)
+                placeholder.delete()
+        except IntegrityError:
+            continue  # Registered again by an upload; its file stays
+        removed.append(path)
+    return removed
+
+
+def collect_orphan_blobs(storage, grace, on_delete=None, batch_size=500, dry_run=False):
+    """
+    Deletes blobs that have had no references for longer than `grace` (a
+    timedelta) and returns (blobs removed, bytes freed). `on_delete(path)`
+    lets the caller remove files derived from a blob, such as renditions.
+    Rows are locked and re-checked before deletion, so a blob that gains a
+    reference meanwhile is kept. Files are only removed once the row
+    deletion has committed (see remove_blob_files()).
+    """
+    cutoff = timezone.now() - grace
+    removed = freed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            blobs = list(
+                MediaBlob.objects.select_for_update(skip_locked=True)
+                .filter(ref_count__lte=0, created_at__lt=cutoff, pk__gt=last_pk)
+                .order_by('pk')[:batch_size]
+            )
+            if not blobs:
+                break
+            last_pk = blobs[-1].pk
+            if not dry_run:
+                MediaBlob.objects.filter(pk__in=[blob.pk for blob in blobs]).delete()
+                paths = [blob.path for blob in blobs]
+                transaction.on_commit(lambda paths=paths: remove_blob_files(storage, paths, on_delete))
+        removed += len(blobs)
+        freed += sum(blob.size for blob in blobs)
+    return removed, freed
+
+
+def _unregistered_candidates(storage, cutoff):
+    """Yields (path, size, is_temporary) for blob-folder files last modified before `cutoff`."""
+    root = storage.path(BLOB_PREFIX)
+    for folder, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(folder, filename)
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                continue  # Renamed into place or removed meanwhile
+            if stat.st_mtime >= cutoff.timestamp():
+                continue
+            path = os.path.relpath(full_path, storage.path('')).replace(os.sep, '/')
+            yield path, stat.st_size, filename.endswith('.tmp')
+
+
+def sweep_unregistered_blob_files(storage, grace, on_delete=None, batch_size=500, dry_run=False):
+    """
+    Deletes files in the blob folder that are older than `grace` and have no
+    MediaBlob row, and returns (files removed, bytes freed). These are left
+    by requests that rolled back after saving, which collect_orphan_blobs()
+    can't see since it walks rows. Deletion goes through remove_blob_files(),
+    so a file an upload is registering right now is kept.
+    """
+    cutoff = timezone.now() - grace
+    removed = freed = 0
+    candidates = _unregistered_candidates(storage, cutoff)
+    while True:
+        batch = [candidate for _, candidate in zip(range(batch_size), candidates)]
+        if not batch:
+            break
+        registered = set(
+            MediaBlob.objects.filter(path__in=[path for path, _, _ in batch]).values_list('path', flat=True)
+        )
+        sizes = {}
+        for path, size, is_temporary in batch:
+            if is_temporary:
+                # Partial writes are never registered under their own name
+                if not dry_run:
+                    storage.delete(path)
+                removed += 1
+                freed += size
+            elif path not in registered:
+                sizes[path] = size
+        if dry_run:
+            gone = list(sizes)
+        else:
+            gone = remove_blob_files(storage, list(sizes), on_delete)
+        removed += len(gone)
+        freed += sum(sizes[path] for path in gone)
+    return removed, freed
@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 # --- 1. Custom User Model ---
 # This is the single source of truth for the User.
@@ -28,4 +29,55 @@ class User(AbstractUser):
 
     def __str__(self):
         # Using email for string representation is often more useful in APIs.
-        return self.email
\ No newline at end of file
+        return self.email
+
+# --- 2. Outbound Email Queue ---
+# Emails are written here inside the request and delivered by the
+# `send_queued_emails` worker, so no request waits on an SMTP round trip.
+class OutboundEmail(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker polls for due pending messages
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+# --- 3. Content-Addressed Media ---
+# One row per unique uploaded file stored by core.storage.ContentAddressedStorage.
+# `ref_count` is how many image rows point at it; unreferenced blobs are
+# removed by the `gc_media_blobs` command.
+class MediaBlob(models.Model):
+    path = models.CharField(max_length=255, unique=True)  # blobs/ab/cd/<sha256>.<ext>
+    size = models.PositiveBigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The garbage collector only looks at unreferenced blobs
+            models.Index(fields=['created_at'], condition=models.Q(ref_count__lte=0), name='media_blob_orphan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.path} ({self.ref_count} refs)"
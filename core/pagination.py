@@ -0,0 +1,174 @@
+# In core/pagination.py
+
+import binascii
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.db.models import F
+from django.db.models.fields.tuple_lookups import Tuple, TupleGreaterThan, TupleLessThan
+from django.template import loader
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    True keyset pagination over a composite ordering such as
+    ('price_per_night', 'id'). The cursor stores the value of *every*
+    ordering column of the row at the page edge, and the next page is
+    `WHERE (price_per_night, id) > (%s, %s) ORDER BY price_per_night, id
+    LIMIT n`: an index range scan with no COUNT(*) and no OFFSET, however
+    many rows share a price. The ordering must end in a unique column and
+    run in one direction, so a single row comparison can express it.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-pk',)
+    page_size = 20
+    template = 'rest_framework/pagination/previous_and_next.html'
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.columns = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+        if any(name.startswith('-') != self.descending for name in self.ordering):
+            raise ImproperlyConfigured("KeysetPagination needs every ordering column in the same direction.")
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        # Walking backwards flips both the comparison and the sort, then the page is put back in order
+        backwards = reverse != self.descending
+        order_by = [f'-{name}' if backwards else name for name in self.columns]
+        if position is not None:
+            lookup = TupleLessThan if backwards else TupleGreaterThan
+            key = Tuple(*(F(name) for name in self.columns))
+            queryset = queryset.filter(lookup(key, tuple(position)))
+
+        rows = list(queryset.order_by(*order_by)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        self.page = rows
+        self.display_page_controls = self.has_previous or self.has_next
+        return rows
+
+    def row_position(self, row):
+        return [getattr(row, name) for name in self.columns]
+
+    def encode_cursor(self, position, reverse):
+        payload = {
+            'p': [value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in position],
+            'r': int(reverse),
+        }
+        token = b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        """Returns (position, reverse); position is None on the first page."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(b64decode(token.encode(), validate=True))
+            values = payload['p']
+            if not isinstance(values, list) or len(values) != len(self.columns):
+                raise ValueError
+            position = [
+                self.column_field(model, name).to_python(value) for name, value in zip(self.columns, values)
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def column_field(model, name):
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.row_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.row_position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_html_context(self):
+        return {'previous_url': self.get_previous_link(), 'next_url': self.get_next_link()}
+
+    def to_html(self):
+        template = loader.get_template(self.template)
+        return template.render(self.get_html_context())
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Default pagination for the API.
+
+    Page-number pagination stays the default so existing clients keep working.
+    A client opts in to cursor pagination per request with `?pagination=cursor`
+    and then follows the `next`/`previous` links, which carry `?cursor=...`.
+    Views enable the cursor mode by declaring a `cursor_ordering` that ends
+    in a unique field such as `id`, with every column in the same direction,
+    e.g. ('price_per_night', 'id'); see KeysetPagination.
+
+    Cursor pages always follow that fixed ordering. Requests that ask for
+    their own order (`ordering`, keyword `search` relevance, nearest-first
+    `near`) are rejected with 400 rather than silently re-sorted.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    # Query params that sort the results themselves; cursor mode would override them
+    ordering_query_params = ('ordering', 'search', 'near')
+
+    def wants_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        ordering = getattr(view, 'cursor_ordering', None)
+        if not ordering or not self.wants_cursor(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        for param in self.ordering_query_params:
+            if request.query_params.get(param):
+                raise ValidationError({
+                    param: "Can't be combined with pagination=cursor, which pages in a fixed order; "
+                           "use page-number pagination instead."
+                })
+
+        self.keyset = KeysetPagination()
+        self.keyset.ordering = ordering
+        self.keyset.page_size = self.get_page_size(request)
+        page = self.keyset.paginate_queryset(queryset, request, view)
+        self.display_page_controls = self.keyset.display_page_controls
+        return page
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
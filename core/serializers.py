@@ -3,6 +3,33 @@
 from rest_framework import serializers
 from .models import User
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients trim a serializer's output with `?fields=id,title`.
+    Only the top-level serializer is trimmed; unknown names are ignored and
+    an absent or empty param returns every field.
+    """
+    fields_query_param = 'fields'
+
+    @classmethod
+    def requested_fields(cls, request):
+        """Returns the set of requested field names, or None for all fields."""
+        if request is None:
+            return None
+        raw = request.query_params.get(cls.fields_query_param, '')
+        names = {name.strip() for name in raw.split(',') if name.strip()}
+        return names or None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        is_root = self.parent is None or (self.parent.parent is None and isinstance(self.parent, serializers.ListSerializer))
+        requested = self.requested_fields(self.context.get('request')) if is_root else None
+        if requested and requested & fields.keys():
+            return {name: field for name, field in fields.items() if name in requested}
+        return fields
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the User model, used for reading user data."""
     class Meta:
@@ -10,6 +37,14 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'role']
 
 
+def user_payload_changed(update_fields):
+    """
+    Whether a User save can change what UserSerializer shows. Saves limited
+    to other fields, such as the last_login update on every sign-in, can't.
+    """
+    return update_fields is None or not set(update_fields).isdisjoint(UserSerializer.Meta.fields)
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     """Serializer for creating a new user. Includes password validation."""
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
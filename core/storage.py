@@ -0,0 +1,73 @@
+# In core/storage.py
+
+"""
+Content-addressed file storage.
+
+Files are named after the SHA-256 of their bytes and sharded two levels
+deep, e.g. blobs/3f/a2/3fa2...e1.jpg, so the same photo uploaded to ten
+units is written to disk once. Saving content that already exists is a
+no-op that returns the existing name. Each blob has a MediaBlob row whose
+reference count is maintained by core.media; the row is registered before
+the file is checked, so the garbage collector can't remove it underneath.
+"""
+
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    """SHA-256 of a Django File, read in chunks and rewound afterwards."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{BLOB_PREFIX}/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each unique file once under its hash."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        # Read the size up front; saving may move a temporary file away
+        size = content.size
+        name = blob_name(content_hash(content), name)
+
+        # Register before trusting an existing file: this waits for a garbage
+        # collector working on the same blob and restarts its grace period.
+        # Imported here because model modules import this one at load time
+        from .media import register_blob
+        register_blob(name, size)
+
+        if not self.exists(name):
+            # Write under a unique temporary name, then rename into place so
+            # concurrent uploads of the same file can't see a partial blob.
+            temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+            os.replace(self.path(temporary), self.path(name))
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,95 @@
+# In core/testing.py
+
+"""
+Shared base for the per-endpoint query budget tests.
+
+Each app's tests.py subclasses QueryBudgetTestCase and asserts an upper
+bound on the SQL queries its endpoints run against a dataset with several
+rows per relation. The budgets must not grow with the number of rows on the
+page, so an N+1 regression fails the suite. Responses are measured cold:
+the cache is a fresh local-memory one, cleared before every test.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apartments.models import PriceOverride, Property, PropertyImage, SeasonalRate, Unit, UnitImage
+from bookings.models import Booking
+from core.models import User
+from reviews.models import Review
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budgets'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryBudgetTestCase(TestCase):
+    rows = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = User.objects.create_user(username='budget_host', email='budget_host@example.com', role=User.Role.HOST)
+        cls.guest = User.objects.create_user(username='budget_guest', email='budget_guest@example.com')
+        start = date.today() + timedelta(days=30)
+
+        units = []
+        for p in range(cls.rows):
+            prop = Property.objects.create(
+                owner=cls.host, title=f"Budget Property {p}", address=f"{p} Budget Rd", city='Nairobi'
+            )
+            PropertyImage.objects.bulk_create(
+                PropertyImage(property=prop, image=f'property_images/budget_{i}.jpg', order=i) for i in range(cls.rows)
+            )
+            for u in range(cls.rows):
+                unit = Unit.objects.create(
+                    property=prop, unit_name_or_number=f"Unit {u}", price_per_night=Decimal('5000')
+                )
+                UnitImage.objects.bulk_create(
+                    UnitImage(unit=unit, image=f'units/{unit.pk}/budget_{i}.jpg', order=i) for i in range(cls.rows)
+                )
+                units.append(unit)
+            Review.objects.create(user=cls.guest, property=prop, unit=units[-1], rating=5)
+
+        for i, unit in enumerate(units):
+            check_in = start + timedelta(days=i)
+            Booking.objects.create(
+                user=cls.guest, unit=unit, check_in=check_in, check_out=check_in + timedelta(days=2),
+                status=Booking.STATUS_CONFIRMED, total_price=Decimal('10000'),
+            )
+
+        stay_start = start + timedelta(days=60)
+        for unit in units:
+            SeasonalRate.objects.create(
+                unit=unit, start_date=stay_start, end_date=stay_start + timedelta(days=3), price_per_night=Decimal('9000'),
+            )
+            PriceOverride.objects.create(unit=unit, date=stay_start + timedelta(days=1), price_per_night=Decimal('12000'))
+
+        cls.url_params = {
+            'property': units[0].property_id,
+            'unit': units[0].pk,
+            'unit_ids': ','.join(str(unit.pk) for unit in units[:20]),
+            'check_in': stay_start.isoformat(),
+            'check_out': (stay_start + timedelta(days=9)).isoformat(),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def assertQueryBudget(self, url, budget, user=None):
+        """GETs `url` (formatted with url_params) and fails if it errors or runs more than `budget` queries."""
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url.format(**self.url_params))
+        self.assertLess(response.status_code, 400, response.content)
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{url} ran {len(queries)} queries, budget is {budget}:\n"
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
@@ -1,3 +1,9 @@
+import mimetypes
+import os
+import re
+import stat as statmod
+from urllib.parse import quote
+
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import generics, permissions
 from .serializers import RegisterSerializer, MyTokenObtainPairSerializer, UserProfileSerializer
@@ -7,7 +13,15 @@ from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import SocialLoginView
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
-from django.http import JsonResponse
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse,
+)
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+from .storage import is_blob
 
 
 @method_decorator(ratelimit(key='ip', rate='10/h', method='POST', block=True), name='dispatch')
@@ -83,3 +97,126 @@ def custom_ratelimit_handler(request, exception=None):
         },
         status=429
     )
+
+
+# --- Media delivery ---
+# Content-addressed blobs never change, so browsers and CDNs may keep them
+# forever. Other media (renditions, legacy uploads) can be rewritten in
+# place and are revalidated with their ETag instead.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=86400'
+MEDIA_STREAM_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _media_etag(path, stat):
+    if is_blob(path):
+        # The file name is the SHA-256 of its bytes
+        return '"%s"' % os.path.splitext(os.path.basename(path))[0]
+    return '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+def _parse_range(header, size):
+    """
+    Returns (start, end) inclusive for a single `bytes=` range, None when
+    the header should be ignored, or False when it can't be satisfied.
+    Multi-range requests are answered with the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _stream_file_range(full_path, start, length):
+    with open(full_path, 'rb') as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(MEDIA_STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves a file from MEDIA_ROOT after checking the caller may see it.
+    With MEDIA_ACCEL_REDIRECT set, the proxy sends the bytes and Python only
+    returns headers. Otherwise the file is streamed here with ETag/304,
+    single-range 206 responses and long-lived caching for immutable blobs.
+    """
+    # Reject '..', '.' and empty segments before anything else, so the prefix
+    # check below sees exactly the path safe_join resolves and the proxy serves.
+    if any(segment in ('', '.', '..') for segment in path.split('/')):
+        raise Http404("Media not found.")
+    if not path.startswith(settings.MEDIA_PUBLIC_PREFIXES) and not request.user.is_staff:
+        raise Http404("Media not found.")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("Media not found.")
+    if not statmod.S_ISREG(stat.st_mode):
+        raise Http404("Media not found.")
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    etag = _media_etag(path, stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if is_blob(path) else REVALIDATE_CACHE_CONTROL,
+        'Accept-Ranges': 'bytes',
+    }
+
+    accel = settings.MEDIA_ACCEL_REDIRECT
+    if accel == 'nginx':
+        # nginx handles Range and conditional requests for the internal location
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(path)
+        return response
+    if accel == 'sendfile':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Sendfile'] = full_path
+        return response
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+                          or 'W/' + etag in parse_etags(if_none_match)):
+        return HttpResponseNotModified(headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        byte_range = _parse_range(range_header, stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    if byte_range is None:
+        # FileResponse lets the WSGI server use sendfile() where it can
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type, headers=headers)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _stream_file_range(full_path, start, length), status=206, content_type=content_type, headers=headers
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(length)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
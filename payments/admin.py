@@ -1,10 +1,16 @@
 # In payments/admin.py
 
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, PaymentEvent
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('id', 'booking', 'provider', 'amount', 'status')
     list_filter = ('provider', 'status')
-    search_fields = ('booking__id', 'provider_reference')
\ No newline at end of file
+    search_fields = ('booking__id', 'provider_reference')
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'provider', 'provider_reference', 'status', 'received_at', 'processed_at', 'outcome')
+    list_filter = ('provider', 'outcome')
+    search_fields = ('provider_reference', 'event_id')
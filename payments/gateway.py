@@ -0,0 +1,100 @@
+# In payments/gateway.py
+
+"""
+Payment gateway client abstraction.
+
+Requests never talk to a gateway. The `process_payments` worker submits
+charges through a GatewayClient, and the gateway reports the outcome later
+by calling our signed callback endpoint, which only records it in the
+PaymentEvent inbox for the `process_payment_events` worker. Both M-Pesa and Stripe use the same
+HTTP contract, which the local simulator (`run_payment_simulator`) implements:
+
+    POST {base_url}/charges, header Idempotency-Key: the payment's UUID
+        {"payment_id", "provider", "amount", "currency", "callback_url"}
+    -> 202 {"reference": "..."}
+
+A retried submission (say, after a timeout the gateway had in fact
+accepted) carries the same key, and the gateway answers with the original
+charge's reference instead of charging again.
+
+    Callback: POST {callback_url}, header X-Signature: hex HMAC-SHA256 of the body
+        {"event_id", "payment_id", "reference", "status": "success" | "failed"}
+"""
+
+import hashlib
+import hmac
+import json
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+
+SIGNATURE_HEADER = 'X-Signature'
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or rejected the charge."""
+
+
+def sign_payload(body, secret=None):
+    secret = secret if secret is not None else settings.PAYMENT_WEBHOOK_SECRET
+    if not secret:
+        raise ImproperlyConfigured("PAYMENT_WEBHOOK_SECRET must be set to sign payment callbacks.")
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature):
+    """Fails closed: without a configured secret no callback is accepted."""
+    if not settings.PAYMENT_WEBHOOK_SECRET or not signature:
+        return False
+    # compare_digest raises TypeError on non-ASCII str; compare bytes instead
+    expected = sign_payload(body).encode()
+    return hmac.compare_digest(expected, signature.encode('utf-8', errors='replace'))
+
+
+class GatewayClient:
+    """Submits charges to an HTTP payment gateway."""
+
+    def __init__(self, provider, base_url, timeout):
+        self.provider = provider
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def callback_url(self):
+        path = reverse('payment-callback', kwargs={'provider': self.provider})
+        return settings.PAYMENT_CALLBACK_BASE_URL.rstrip('/') + path
+
+    def submit(self, payment):
+        """Starts a charge and returns the gateway's reference for it."""
+        payload = {
+            'payment_id': payment.pk,
+            'provider': self.provider,
+            'amount': str(payment.amount),
+            'currency': settings.PAYMENT_CURRENCY,
+            'callback_url': self.callback_url(),
+        }
+        try:
+            response = self.session.post(
+                f'{self.base_url}/charges',
+                data=json.dumps(payload),
+                headers={'Content-Type': 'application/json', IDEMPOTENCY_HEADER: str(payment.idempotency_key)},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return response.json()['reference']
+        except (requests.RequestException, ValueError, KeyError) as exc:
+            raise GatewayError(str(exc)) from exc
+
+
+_clients = {}
+
+
+def get_gateway_client(provider):
+    """Returns a shared client for the provider, configured from settings."""
+    key = (provider, settings.PAYMENT_GATEWAY_URLS[provider], settings.PAYMENT_GATEWAY_TIMEOUT)
+    if key not in _clients:
+        _clients[key] = GatewayClient(*key)
+    return _clients[key]
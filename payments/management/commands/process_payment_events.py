@@ -0,0 +1,37 @@
+# In payments/management/commands/process_payment_events.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.services import apply_payment_events
+
+
+class Command(BaseCommand):
+    help = "Worker that applies inbox gateway callbacks to payments and bookings in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the inbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the inbox once and exit.")
+
+    def handle(self, *args, **options):
+        total = 0
+        started = None
+        try:
+            while True:
+                batch_started = time.perf_counter()
+                processed = apply_payment_events(options['batch_size'])
+                if processed:
+                    if started is None:
+                        started = batch_started
+                    total += processed
+                    elapsed = time.perf_counter() - started
+                    rate = total / elapsed if elapsed else 0
+                    self.stdout.write(f"Applied {processed} events ({total} total, {rate:.0f} events/s)")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping payment event worker.")
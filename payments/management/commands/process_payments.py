@@ -0,0 +1,29 @@
+# In payments/management/commands/process_payments.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.services import submit_due_payments
+
+
+class Command(BaseCommand):
+    help = "Worker that submits initiated payments to their gateway. Results arrive via the callback endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when nothing is due.")
+        parser.add_argument('--once', action='store_true', help="Submit what is due once and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                submitted, errors = submit_due_payments(options['batch_size'])
+                if submitted or errors:
+                    self.stdout.write(f"Submitted {submitted}, gateway errors {errors}")
+                if options['once']:
+                    break
+                if not submitted:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping payment worker.")
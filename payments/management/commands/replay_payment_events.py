@@ -0,0 +1,76 @@
+# In payments/management/commands/replay_payment_events.py
+
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from payments.gateway import SIGNATURE_HEADER, sign_payload
+from payments.models import Payment
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays signed gateway callbacks against the webhook endpoint to measure ingestion throughput. "
+        "Uses payments waiting on the gateway, or synthetic payment ids if there are none."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--provider', default='mpesa', choices=[choice for choice, _ in Payment.PROVIDER_CHOICES])
+        parser.add_argument('--events', type=int, default=2000, help="Distinct events to send.")
+        parser.add_argument('--duplicates', type=int, default=1, help="Extra copies of each event, like provider retries.")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--fail-rate', type=float, default=0.0, help="Fraction of events that report a failure (0-1).")
+
+    def handle(self, *args, **options):
+        url = options['base_url'].rstrip('/') + reverse('payment-callback', kwargs={'provider': options['provider']})
+        payments = list(
+            Payment.objects.filter(provider=options['provider'], status=Payment.STATUS_PENDING_GATEWAY)
+            .values_list('pk', 'provider_reference')[:options['events']]
+        )
+
+        bodies = []
+        for index in range(options['events']):
+            if index < len(payments):
+                payment_id, reference = payments[index]
+            else:
+                payment_id, reference = 10 ** 12 + index, ''
+            bodies.append(json.dumps({
+                'event_id': uuid.uuid4().hex,
+                'payment_id': payment_id,
+                'reference': reference or f"REPLAY-{index}",
+                'status': 'failed' if random.random() < options['fail_rate'] else 'success',
+            }).encode())
+        # Every copy is sent; duplicates are shuffled in so they arrive out of order.
+        requests_to_send = bodies * (1 + options['duplicates'])
+        random.shuffle(requests_to_send)
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=options['concurrency'])
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        def post(body):
+            headers = {'Content-Type': 'application/json', SIGNATURE_HEADER: sign_payload(body)}
+            try:
+                return session.post(url, data=body, headers=headers, timeout=10).status_code
+            except requests.RequestException:
+                return None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            statuses = list(pool.map(post, requests_to_send))
+        elapsed = time.perf_counter() - started
+
+        accepted = statuses.count(202)
+        self.stdout.write(
+            f"Sent {len(statuses)} callbacks ({len(bodies)} distinct, {len(payments)} real payments) "
+            f"in {elapsed:.2f}s: {len(statuses) / elapsed:.0f} req/s, {accepted} accepted, "
+            f"{len(statuses) - accepted} rejected or failed"
+        )
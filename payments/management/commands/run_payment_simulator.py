@@ -0,0 +1,38 @@
+# In payments/management/commands/run_payment_simulator.py
+
+from django.core.management.base import BaseCommand
+
+from payments.simulator import GatewaySimulator
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local M-Pesa/Stripe stand-in that speaks the gateway contract in payments/gateway.py. "
+        "It accepts charges immediately and posts a signed callback after a delay. A charge "
+        "resubmitted with the same Idempotency-Key gets the original reference and no second callback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8090)
+        parser.add_argument('--delay', type=float, default=2.0, help="Seconds before the callback is sent.")
+        parser.add_argument('--response-delay', type=float, default=0.0, help="Seconds to stall before answering an accepted charge.")
+        parser.add_argument('--fail-rate', type=float, default=0.0, help="Fraction of charges that fail (0-1).")
+        parser.add_argument('--duplicates', type=int, default=0, help="Extra copies of each callback, like provider retries.")
+
+    def handle(self, *args, **options):
+        server = GatewaySimulator(
+            (options['host'], options['port']),
+            delay=options['delay'],
+            response_delay=options['response_delay'],
+            fail_rate=options['fail_rate'],
+            duplicates=options['duplicates'],
+            log=lambda message: self.stdout.write(f"[simulator] {message}"),
+        )
+        self.stdout.write(f"Payment simulator listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping payment simulator.")
+        finally:
+            server.server_close()
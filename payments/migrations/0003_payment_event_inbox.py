@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_state_machine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('mpesa', 'Mpesa'), ('stripe', 'Stripe')], max_length=20)),
+                ('provider_reference', models.CharField(max_length=255)),
+                ('event_id', models.CharField(max_length=255)),
+                ('payment_id', models.BigIntegerField()),
+                ('status', models.CharField(max_length=20)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('outcome', models.CharField(blank=True, choices=[('applied', 'applied'), ('ignored', 'ignored'), ('unknown_payment', 'unknown_payment')], max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='payment_event_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'provider_reference', 'event_id'), name='unique_payment_event')],
+            },
+        ),
+    ]
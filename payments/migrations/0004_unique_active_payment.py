@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_bookingrollup'),
+        ('payments', '0003_payment_event_inbox'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['initiated', 'pending_gateway'])), fields=('booking',), name='unique_active_payment_per_booking'),
+        ),
+    ]
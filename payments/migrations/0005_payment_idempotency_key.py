@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:10
+
+import uuid
+
+from django.db import migrations, models
+
+
+def fill_idempotency_keys(apps, schema_editor):
+    # Each existing payment needs its own key before the column becomes unique
+    Payment = apps.get_model('payments', 'Payment')
+    payments = list(Payment.objects.filter(idempotency_key__isnull=True).only('pk'))
+    for payment in payments:
+        payment.idempotency_key = uuid.uuid4()
+    Payment.objects.bulk_update(payments, ['idempotency_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_unique_active_payment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='idempotency_key',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_idempotency_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='idempotency_key',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -1,15 +1,96 @@
+import uuid
+
 from django.db import models
 from bookings.models import Booking
-from django.contrib.postgres.fields import JSONField
+
+# Name of the constraint allowing one in-flight payment per booking.
+ACTIVE_PAYMENT_CONSTRAINT = 'unique_active_payment_per_booking'
+
 
 class Payment(models.Model):
+    STATUS_INITIATED = 'initiated'
+    STATUS_PENDING_GATEWAY = 'pending_gateway'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+
     PROVIDER_CHOICES = [('mpesa','Mpesa'),('stripe','Stripe')]
-    STATUS_CHOICES = [('initiated','initiated'),('success','success'),('failed','failed')]
+    STATUS_CHOICES = [
+        (STATUS_INITIATED, 'initiated'),            # Created, not yet sent to the gateway
+        (STATUS_PENDING_GATEWAY, 'pending_gateway'), # Accepted by the gateway, awaiting its callback
+        (STATUS_SUCCESS, 'success'),
+        (STATUS_FAILED, 'failed'),
+    ]
+    # Allowed state machine transitions
+    TRANSITIONS = {
+        STATUS_INITIATED: {STATUS_PENDING_GATEWAY, STATUS_SUCCESS, STATUS_FAILED},
+        STATUS_PENDING_GATEWAY: {STATUS_SUCCESS, STATUS_FAILED},
+        STATUS_SUCCESS: set(),
+        STATUS_FAILED: set(),
+    }
 
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='payments')
     provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='initiated')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_INITIATED)
     provider_reference = models.CharField(max_length=255, blank=True, null=True)
     metadata = models.JSONField(null=True, blank=True)
+    # Sent with every submission so the gateway charges once however often we retry
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Two concurrent "pay" requests can't both start a charge for one booking
+            models.UniqueConstraint(
+                fields=['booking'],
+                condition=models.Q(status__in=['initiated', 'pending_gateway']),
+                name=ACTIVE_PAYMENT_CONSTRAINT,
+            ),
+        ]
+        indexes = [
+            # The payment worker polls for payments still waiting to be submitted
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ]
+
+    def can_transition_to(self, status):
+        return status in self.TRANSITIONS[self.status]
+
+
+class PaymentEvent(models.Model):
+    """
+    Inbox of raw gateway callbacks. The webhook only appends here (one INSERT,
+    duplicates dropped by the unique constraint) and acknowledges at once;
+    the `process_payment_events` worker applies events to payments in batches.
+    """
+    OUTCOME_APPLIED = 'applied'
+    OUTCOME_IGNORED = 'ignored'              # The payment was already final
+    OUTCOME_UNKNOWN_PAYMENT = 'unknown_payment'
+    OUTCOME_CHOICES = [
+        (OUTCOME_APPLIED, 'applied'),
+        (OUTCOME_IGNORED, 'ignored'),
+        (OUTCOME_UNKNOWN_PAYMENT, 'unknown_payment'),
+    ]
+
+    provider = models.CharField(max_length=20, choices=Payment.PROVIDER_CHOICES)
+    provider_reference = models.CharField(max_length=255)
+    event_id = models.CharField(max_length=255)
+    payment_id = models.BigIntegerField()  # As reported by the gateway; not trusted as a FK
+    status = models.CharField(max_length=20)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'provider_reference', 'event_id'], name='unique_payment_event'
+            ),
+        ]
+        indexes = [
+            # Small partial index the worker scans for unprocessed events
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='payment_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.provider_reference} {self.event_id}"
@@ -1,8 +1,29 @@
 # In payments/serializers.py
 
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Payment, Booking
+from .models import ACTIVE_PAYMENT_CONSTRAINT, Payment, Booking
 from bookings.serializers import BookingSerializer
+from core.exceptions import ConflictError
+
+
+@contextmanager
+def active_payment_guard():
+    """
+    Turns a violation of the one-in-flight-payment constraint into a 409
+    Conflict. Any other integrity error is re-raised untouched.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        diag = getattr(exc.__cause__, 'diag', None)
+        if getattr(diag, 'constraint_name', None) == ACTIVE_PAYMENT_CONSTRAINT:
+            raise ConflictError("A payment for this booking is already in progress.")
+        raise
+
 
 class PaymentSerializer(serializers.ModelSerializer):
     """
@@ -35,50 +56,12 @@ class InitiatePaymentSerializer(serializers.Serializer):
         # Check if the booking is in a state that allows payment
         if booking.status != Booking.STATUS_PENDING:
             raise serializers.ValidationError("This booking is not pending and cannot be paid for.")
-        
-        return value
-
-from rest_framework import generics, permissions, status
-from rest_framework.response import Response
-from .serializers import InitiatePaymentSerializer, PaymentSerializer
-from .models import Payment
-from bookings.models import Booking
 
-class InitiatePaymentView(generics.GenericAPIView):
-    """
-    API endpoint to initiate a payment for a booking.
-    """
-    serializer_class = InitiatePaymentSerializer
-    permission_classes = [permissions.IsAuthenticated]
-
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        # Don't start a second charge while one is still being processed. Concurrent
+        # requests can both pass this check; the database constraint stops the second.
+        if booking.payments.filter(
+            status__in=[Payment.STATUS_INITIATED, Payment.STATUS_PENDING_GATEWAY]
+        ).exists():
+            raise serializers.ValidationError("A payment for this booking is already in progress.")
         
-        booking_id = serializer.validated_data['booking_id']
-        booking = Booking.objects.get(id=booking_id)
-
-        # 1. Create a Payment record
-        payment = Payment.objects.create(
-            booking=booking,
-            provider=serializer.validated_data['provider'],
-            amount=booking.total_price,
-            status='initiated' # Start with 'initiated' status
-        )
-
-        # --- 2. (SIMULATION) Call external payment gateway ---
-        # In a real application, you would call M-Pesa/Stripe here.
-        # For our MVP, we will simulate an immediate successful payment.
-        
-        # 3. Update status based on payment gateway response
-        payment.status = 'success'
-        payment.provider_reference = f'SIMULATED__{payment.id}' # Fake reference ID
-        payment.save()
-
-        # 4. Update the booking status
-        booking.status = Booking.STATUS_CONFIRMED
-        booking.save()
-        
-        # 5. Return the created payment details
-        response_serializer = PaymentSerializer(payment)
-        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return value
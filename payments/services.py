@@ -0,0 +1,138 @@
+# In payments/services.py
+
+"""
+Payment state machine: initiated -> pending_gateway -> success | failed.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from django.template.loader import render_to_string
+
+from bookings.models import Booking
+from core.mail import enqueue_email
+from .gateway import GatewayError, get_gateway_client
+from .models import Payment, PaymentEvent
+
+MAX_SUBMIT_ATTEMPTS = 5
+
+
+def submit_due_payments(batch_size=20):
+    """
+    Sends initiated payments to their gateway and returns (submitted, errors).
+    Each payment is claimed with SKIP LOCKED in its own short transaction, so
+    several workers can run side by side and no lock is held across batches.
+    """
+    submitted = errors = 0
+    for _ in range(batch_size):
+        with transaction.atomic():
+            payment = Payment.objects.select_for_update(skip_locked=True).filter(
+                status=Payment.STATUS_INITIATED
+            ).order_by('created_at').first()
+            if payment is None:
+                break
+
+            metadata = payment.metadata or {}
+            try:
+                reference = get_gateway_client(payment.provider).submit(payment)
+            except GatewayError as exc:
+                errors += 1
+                metadata['submit_attempts'] = metadata.get('submit_attempts', 0) + 1
+                metadata['last_error'] = str(exc)
+                payment.metadata = metadata
+                if metadata['submit_attempts'] >= MAX_SUBMIT_ATTEMPTS:
+                    payment.status = Payment.STATUS_FAILED
+                payment.save(update_fields=['metadata', 'status'])
+                if payment.status == Payment.STATUS_INITIATED:
+                    # Leave it for the next poll rather than hammering the gateway
+                    break
+                continue
+
+            payment.status = Payment.STATUS_PENDING_GATEWAY
+            payment.provider_reference = reference
+            payment.save(update_fields=['status', 'provider_reference'])
+            submitted += 1
+    return submitted, errors
+
+
+def record_payment_event(provider, event):
+    """
+    Appends a raw gateway callback to the inbox in a single INSERT.
+    Redelivered events hit the unique constraint and are silently dropped.
+    Raises KeyError/ValueError/TypeError if the event is malformed.
+    """
+    status = event['status']
+    if status not in (Payment.STATUS_SUCCESS, Payment.STATUS_FAILED):
+        raise ValueError(f"Unknown payment result: {status}")
+
+    PaymentEvent.objects.bulk_create([
+        PaymentEvent(
+            provider=provider,
+            provider_reference=str(event['reference']),
+            event_id=str(event['event_id']),
+            payment_id=int(event['payment_id']),
+            status=status,
+            payload=event,
+        )
+    ], ignore_conflicts=True)
+
+
+def apply_payment_events(batch_size=500):
+    """
+    Applies one batch of inbox events to payments and bookings and returns
+    how many events were processed. Events are claimed with SKIP LOCKED and
+    all their payments are locked with a single query. Replays and late
+    duplicates of a payment that is already final are marked as ignored.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            PaymentEvent.objects.select_for_update(skip_locked=True).filter(
+                processed_at__isnull=True
+            ).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        payments = Payment.objects.select_for_update(of=('self', 'booking')).select_related(
+            'booking__user', 'booking__unit__property'
+        ).in_bulk({event.payment_id for event in events})
+
+        changed_payments = {}
+        confirmed_bookings = []
+        for event in events:
+            event.processed_at = now
+            payment = payments.get(event.payment_id)
+            if payment is None or payment.provider != event.provider or (
+                payment.provider_reference and payment.provider_reference != event.provider_reference
+            ):
+                event.outcome = PaymentEvent.OUTCOME_UNKNOWN_PAYMENT
+                continue
+            if not payment.can_transition_to(event.status):
+                event.outcome = PaymentEvent.OUTCOME_IGNORED
+                continue
+
+            payment.status = event.status
+            payment.provider_reference = event.provider_reference
+            changed_payments[payment.pk] = payment
+            event.outcome = PaymentEvent.OUTCOME_APPLIED
+
+            booking = payment.booking
+            if event.status == Payment.STATUS_SUCCESS and booking.status == Booking.STATUS_PENDING:
+                booking.status = Booking.STATUS_CONFIRMED
+                confirmed_bookings.append(booking)
+
+        Payment.objects.bulk_update(changed_payments.values(), ['status', 'provider_reference'])
+        for booking in confirmed_bookings:
+            # Saved one by one so the availability and analytics signals fire
+            booking.save(update_fields=['status'])
+            _queue_confirmation_email(booking)
+        PaymentEvent.objects.bulk_update(events, ['processed_at', 'outcome'])
+    return len(events)
+
+
+def _queue_confirmation_email(booking):
+    subject = f"Your Booking Confirmation for {booking.unit}"
+    context = {'booking': booking, 'user': booking.user}
+    html_message = render_to_string('emails/booking_confirmation.html', context)
+    plain_message = "Your booking is confirmed. Please see the attached HTML for details." # Fallback
+    enqueue_email(subject, plain_message, [booking.user.email], html_message=html_message)
@@ -0,0 +1,107 @@
+# In payments/simulator.py
+
+"""
+Local M-Pesa/Stripe stand-in that speaks the gateway contract in
+payments/gateway.py. It accepts charges at once and posts a signed callback
+after a delay; a charge resubmitted with the same Idempotency-Key gets the
+original reference and no second callback. `run_payment_simulator` serves
+it from the command line and the payments tests start it in a thread.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from .gateway import IDEMPOTENCY_HEADER, SIGNATURE_HEADER, sign_payload
+
+
+class GatewaySimulator(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, delay=2.0, response_delay=0.0, fail_rate=0.0, duplicates=0, log=None):
+        self.delay = delay
+        self.response_delay = response_delay
+        self.fail_rate = fail_rate
+        self.duplicates = duplicates
+        self.log = log or (lambda message: None)
+        self.charges = {}  # Idempotency-Key -> reference
+        self.charges_lock = threading.Lock()
+        self.callback_threads = []
+        super().__init__(address, GatewayRequestHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def accept_charge(self, key, charge):
+        """Returns the charge's reference, starting its callback unless the key was seen before."""
+        with self.charges_lock:
+            reference = self.charges.get(key)
+            if reference is not None:
+                return reference
+            reference = self.charges[key] = f"SIM-{uuid.uuid4().hex[:12].upper()}"
+        thread = threading.Thread(target=self.send_callback, args=(charge, reference), daemon=True)
+        self.callback_threads.append(thread)
+        thread.start()
+        return reference
+
+    def send_callback(self, charge, reference):
+        time.sleep(self.delay)
+        outcome = 'failed' if random.random() < self.fail_rate else 'success'
+        body = json.dumps({
+            'event_id': uuid.uuid4().hex,
+            'payment_id': charge['payment_id'],
+            'reference': reference,
+            'status': outcome,
+        }).encode()
+        headers = {'Content-Type': 'application/json', SIGNATURE_HEADER: sign_payload(body)}
+        for _ in range(1 + self.duplicates):
+            try:
+                response = requests.post(charge['callback_url'], data=body, headers=headers, timeout=10)
+                self.log(f"callback {reference} {outcome} -> {response.status_code}")
+            except requests.RequestException as exc:
+                self.log(f"callback {reference} failed: {exc}")
+
+    def wait_for_callbacks(self, timeout=10):
+        """Blocks until every callback started so far has been delivered (or given up)."""
+        for thread in list(self.callback_threads):
+            thread.join(timeout)
+
+
+class GatewayRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path.rstrip('/') != '/charges':
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            charge = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_error(400)
+            return
+        key = self.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            self._json(400, {'error': f"{IDEMPOTENCY_HEADER} header is required."})
+            return
+
+        reference = self.server.accept_charge(key, charge)
+        # Stalls after accepting, so a client timeout here is a charge the gateway already took
+        time.sleep(self.server.response_delay)
+        self._json(202, {'reference': reference})
+
+    def _json(self, status_code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        self.server.log(format % args)
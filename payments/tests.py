@@ -1,3 +1,227 @@
-from django.test import TestCase
+import json
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apartments.models import Property, Unit
+from bookings.models import Booking
+from core.models import User
+from core.testing import TEST_CACHES
+from payments.gateway import SIGNATURE_HEADER, get_gateway_client, sign_payload
+from payments.models import Payment, PaymentEvent
+from payments.services import apply_payment_events, record_payment_event, submit_due_payments
+from payments.simulator import GatewaySimulator
+
+
+def create_pending_booking(nights=3, username='guest'):
+    host = User.objects.create_user(username=f'{username}_host', email=f'{username}_host@example.com', role=User.Role.HOST)
+    guest = User.objects.create_user(username=username, email=f'{username}@example.com')
+    property_obj = Property.objects.create(owner=host, title='Sea View', address='1 Beach Rd', city='Mombasa')
+    unit = Unit.objects.create(property=property_obj, unit_name_or_number='A1', price_per_night=Decimal('100.00'))
+    check_in = date.today() + timedelta(days=30)
+    return Booking.objects.create(
+        user=guest, unit=unit, check_in=check_in, check_out=check_in + timedelta(days=nights),
+        guests=1, total_price=Decimal('100.00') * nights,
+    )
+
+
+class SimulatedGatewayTestCase(LiveServerTestCase):
+    """
+    Runs the gateway simulator in a thread, with its callbacks posted to the
+    live test server, so payments go through the same HTTP round trips as
+    in production.
+    """
+    simulator_options = {'delay': 0}
+
+    def setUp(self):
+        self.simulator = GatewaySimulator(('127.0.0.1', 0), **self.simulator_options)
+        thread = threading.Thread(target=self.simulator.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.simulator.server_close)
+        self.addCleanup(self.simulator.shutdown)
+
+        settings_override = override_settings(
+            CACHES=TEST_CACHES,
+            PAYMENT_CALLBACK_BASE_URL=self.live_server_url,
+            PAYMENT_GATEWAY_URLS={'mpesa': self.simulator.url, 'stripe': self.simulator.url},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class PaymentPipelineTests(SimulatedGatewayTestCase):
+    def test_payment_goes_from_initiated_to_success_and_confirms_the_booking(self):
+        booking = create_pending_booking()
+        client = APIClient()
+        client.force_authenticate(booking.user)
+
+        response = client.post(reverse('initiate-payment'), {'booking_id': booking.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        payment = Payment.objects.get(pk=response.data['id'])
+        self.assertEqual(payment.status, Payment.STATUS_INITIATED)
+        self.assertEqual(payment.amount, booking.total_price)
+
+        self.assertEqual(submit_due_payments(), (1, 0))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.STATUS_PENDING_GATEWAY)
+        self.assertTrue(payment.provider_reference.startswith('SIM-'))
+
+        self.simulator.wait_for_callbacks()
+        event = PaymentEvent.objects.get()
+        self.assertEqual((event.payment_id, event.status), (payment.pk, Payment.STATUS_SUCCESS))
+
+        self.assertEqual(apply_payment_events(), 1)
+        payment.refresh_from_db()
+        booking.refresh_from_db()
+        self.assertEqual(payment.status, Payment.STATUS_SUCCESS)
+        self.assertEqual(booking.status, Booking.STATUS_CONFIRMED)
+
+    def test_second_payment_for_a_booking_in_progress_is_refused(self):
+        booking = create_pending_booking()
+        client = APIClient()
+        client.force_authenticate(booking.user)
+        client.post(reverse('initiate-payment'), {'booking_id': booking.pk}, format='json')
+
+        response = client.post(reverse('initiate-payment'), {'booking_id': booking.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_resubmitted_payment_is_charged_once(self):
+        booking = create_pending_booking()
+        payment = Payment.objects.create(booking=booking, provider='mpesa', amount=booking.total_price)
+        gateway = get_gateway_client('mpesa')
+
+        first = gateway.submit(payment)
+        second = gateway.submit(payment)
+        self.simulator.wait_for_callbacks()
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.simulator.charges), 1)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PaymentCallbackSignatureTests(TestCase):
+    def callback(self, body, signature):
+        headers = {SIGNATURE_HEADER: signature} if signature is not None else {}
+        return APIClient().post(
+            reverse('payment-callback', kwargs={'provider': 'mpesa'}), body,
+            content_type='application/json', headers=headers,
+        )
+
+    def event_body(self):
+        return json.dumps({'event_id': 'evt-1', 'payment_id': 1, 'reference': 'SIM-1', 'status': 'success'}).encode()
+
+    def test_signed_callback_is_recorded(self):
+        body = self.event_body()
+        self.assertEqual(self.callback(body, sign_payload(body)).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+    def test_missing_wrong_or_non_ascii_signatures_are_rejected(self):
+        body = self.event_body()
+        for signature in (None, '', sign_payload(b'something else'), 'é' * 64):
+            with self.subTest(signature=signature):
+                self.assertEqual(self.callback(body, signature).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    @override_settings(PAYMENT_WEBHOOK_SECRET='')
+    def test_callbacks_are_refused_without_a_configured_secret(self):
+        body = self.event_body()
+        signature = sign_payload(body, secret='anything')
+        self.assertEqual(self.callback(body, signature).status_code, status.HTTP_403_FORBIDDEN)
+
+
+def create_pending_gateway_payments(count):
+    payments = []
+    for index in range(count):
+        booking = create_pending_booking(username=f'guest{index}')
+        payments.append(Payment.objects.create(
+            booking=booking, provider='mpesa', amount=booking.total_price,
+            status=Payment.STATUS_PENDING_GATEWAY, provider_reference=f'SIM-{index}',
+        ))
+    return payments
+
+
+def apply_all_payment_events(batch_size):
+    batches = []
+    while processed := apply_payment_events(batch_size=batch_size):
+        batches.append(processed)
+    return batches
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PaymentInboxTests(TestCase):
+    def callback(self, event):
+        body = json.dumps(event).encode()
+        return APIClient().post(
+            reverse('payment-callback', kwargs={'provider': 'mpesa'}), body,
+            content_type='application/json', headers={SIGNATURE_HEADER: sign_payload(body)},
+        )
+
+    def test_redelivered_event_is_stored_once_and_acknowledged_every_time(self):
+        payment, = create_pending_gateway_payments(1)
+        event = {'event_id': 'evt-1', 'payment_id': payment.pk, 'reference': 'SIM-0', 'status': 'success'}
+
+        statuses = [self.callback(event).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [status.HTTP_202_ACCEPTED] * 3)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+    def test_events_are_applied_in_batches(self):
+        payments = create_pending_gateway_payments(5)
+        for payment in payments:
+            record_payment_event('mpesa', {
+                'event_id': f'evt-{payment.pk}', 'payment_id': payment.pk,
+                'reference': payment.provider_reference, 'status': 'success',
+            })
+        # A late failure for a payment that already succeeded, and an event for no known payment
+        record_payment_event('mpesa', {
+            'event_id': 'evt-late', 'payment_id': payments[0].pk, 'reference': 'SIM-0', 'status': 'failed',
+        })
+        record_payment_event('mpesa', {'event_id': 'evt-stray', 'payment_id': 10 ** 12, 'reference': 'X', 'status': 'success'})
+
+        self.assertEqual(apply_all_payment_events(batch_size=3), [3, 3, 1])
+
+        outcomes = Counter(PaymentEvent.objects.values_list('outcome', flat=True))
+        self.assertEqual(outcomes, {
+            PaymentEvent.OUTCOME_APPLIED: 5,
+            PaymentEvent.OUTCOME_IGNORED: 1,
+            PaymentEvent.OUTCOME_UNKNOWN_PAYMENT: 1,
+        })
+        self.assertFalse(PaymentEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(
+            set(Payment.objects.values_list('status', flat=True)), {Payment.STATUS_SUCCESS},
+        )
+        self.assertEqual(
+            set(Booking.objects.values_list('status', flat=True)), {Booking.STATUS_CONFIRMED},
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReplayPaymentEventsTests(LiveServerTestCase):
+    def test_replayed_duplicates_collapse_to_one_event_each(self):
+        payments = create_pending_gateway_payments(4)
+
+        output = StringIO()
+        call_command(
+            'replay_payment_events', base_url=self.live_server_url, events=6, duplicates=2,
+            concurrency=4, stdout=output,
+        )
+
+        self.assertIn('18 accepted', output.getvalue())
+        self.assertEqual(PaymentEvent.objects.count(), 6)
+        self.assertEqual(apply_all_payment_events(batch_size=4), [4, 2])
+        self.assertEqual(
+            PaymentEvent.objects.filter(outcome=PaymentEvent.OUTCOME_APPLIED).count(), len(payments),
+        )
+        self.assertEqual(
+            PaymentEvent.objects.filter(outcome=PaymentEvent.OUTCOME_UNKNOWN_PAYMENT).count(), 2,
+        )
@@ -1,9 +1,13 @@
 # In payments/urls.py
 
 from django.urls import path
-from .views import InitiatePaymentView
+from .views import InitiatePaymentView, PaymentDetailView, PaymentCallbackView
 
 urlpatterns = [
     # The URL to trigger the payment process for a booking
     path('payments/initiate/', InitiatePaymentView.as_view(), name='initiate-payment'),
-]
\ No newline at end of file
+    # Clients poll this until the gateway has reported back
+    path('payments/<int:pk>/', PaymentDetailView.as_view(), name='payment-detail'),
+    # Called by the payment gateway, not by clients
+    path('payments/callback/<str:provider>/', PaymentCallbackView.as_view(), name='payment-callback'),
+]
@@ -1,18 +1,22 @@
 # In payments/views.py
 
+import json
+
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from .serializers import InitiatePaymentSerializer, PaymentSerializer
+from rest_framework.views import APIView
+from .serializers import InitiatePaymentSerializer, PaymentSerializer, active_payment_guard
 from .models import Payment
+from .gateway import SIGNATURE_HEADER, verify_signature
+from .services import record_payment_event
 from bookings.models import Booking
 
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.conf import settings
-
-class InitiatePaymentView(generics.GenericAPIView): # <--- CHECK THIS LINE CAREFULLY
+class InitiatePaymentView(generics.GenericAPIView):
     """
     API endpoint to initiate a payment for a booking.
+    Only records the payment and returns 202 Accepted. The `process_payments`
+    worker submits it to the gateway, and the gateway's callback confirms the
+    booking, so a slow provider never holds up a web worker.
     """
     serializer_class = InitiatePaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -24,40 +28,52 @@ class InitiatePaymentView(generics.GenericAPIView): # <--- CHECK THIS LINE CAREF
         booking_id = serializer.validated_data['booking_id']
         booking = Booking.objects.get(id=booking_id)
 
-        # 1. Create a Payment record
-        payment = Payment.objects.create(
-            booking=booking,
-            provider=serializer.validated_data['provider'],
-            amount=booking.total_price,
-            status='initiated' # Start with 'initiated' status
-        )
-
-        # --- 2. (SIMULATION) Call external payment gateway ---
-        # In a real application, you would call M-Pesa/Stripe here.
-        # For our MVP, we will simulate an immediate successful payment.
-        
-        # 3. Update status based on payment gateway response
-        payment.status = 'success'
-        payment.provider_reference = f'SIMULATED__{payment.id}' # Fake reference ID
-        payment.save()
+        # 1. Create a Payment record; the worker picks it up from here
+        with active_payment_guard():
+            payment = Payment.objects.create(
+                booking=booking,
+                provider=serializer.validated_data['provider'],
+                amount=booking.total_price,
+                status=Payment.STATUS_INITIATED
+            )
+
+        # 2. Return the payment so the client can poll its status
+        response_serializer = PaymentSerializer(payment)
+        return Response(response_serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class PaymentDetailView(generics.RetrieveAPIView):
+    """
+    API endpoint for a user to poll the status of one of their payments.
+    """
+    serializer_class = PaymentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Payment.objects.filter(booking__user=self.request.user).select_related('booking__unit')
+
 
-        # 4. Update the booking status
-        booking.status = Booking.STATUS_CONFIRMED
-        booking.save()
+class PaymentCallbackView(APIView):
+    """
+    Webhook the payment gateway calls with the outcome of a charge.
+    Authenticated by an HMAC signature of the raw body, not by a user.
+    The event is only appended to the inbox and acknowledged straight away;
+    the `process_payment_events` worker applies it.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def post(self, request, provider):
+        body = request.body
+        if not verify_signature(body, request.headers.get(SIGNATURE_HEADER)):
+            return Response({'detail': 'Invalid signature.'}, status=status.HTTP_403_FORBIDDEN)
+        if provider not in dict(Payment.PROVIDER_CHOICES):
+            return Response({'detail': 'Unknown provider.'}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            subject = f"Your Booking Confirmation for {booking.apartment.title}"
-            context = {'booking': booking, 'user': request.user}
-            html_message = render_to_string('emails/booking_confirmation.html', context)
-            plain_message = "Your booking is confirmed. Please see the attached HTML for details." # Fallback
-            from_email = settings.DEFAULT_FROM_EMAIL or 'noreply@example.com'
-            recipient_list = [request.user.email]
-
-            send_mail(subject, plain_message, from_email, recipient_list, html_message=html_message)
-        except Exception as e:
-            # In a real app, you'd log this error
-            print(f"Error sending email: {e}")
-        
-        # 5. Return the created payment details
-        response_serializer = PaymentSerializer(payment)
-        return Response(response_serializer.data, status=status.HTTP_2_CREATED)
\ No newline at end of file
+            record_payment_event(provider, json.loads(body))
+        except (ValueError, KeyError, TypeError):
+            return Response({'detail': 'Malformed callback.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Duplicates are acknowledged too, so the gateway stops retrying
+        return Response({'detail': 'Accepted.'}, status=status.HTTP_202_ACCEPTED)
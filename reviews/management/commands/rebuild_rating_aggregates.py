@@ -0,0 +1,51 @@
+# In reviews/management/commands/rebuild_rating_aggregates.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from apartments.models import RATING_VALUES, Property, Unit
+from reviews.models import Review
+from reviews.ratings import aggregate_values
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes rating_avg, rating_count and the 1-5 histogram on every property and unit "
+        "from the Review table. Run it after deploying the columns or after bulk edits that bypass signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        histogram = {f'count_{value}': Count('id', filter=Q(rating=value)) for value in RATING_VALUES}
+        valid = Review.objects.filter(rating__in=RATING_VALUES).order_by()
+
+        with transaction.atomic():
+            for model, key in ((Property, 'property_id'), (Unit, 'unit_id')):
+                model.objects.exclude(rating_count=0, rating_avg=None).update(**aggregate_values(0, 0, {}))
+
+                totals = valid.filter(**{f'{key}__isnull': False}).values(key).annotate(
+                    total_count=Count('id'), total_sum=Sum('rating'), **histogram
+                )
+                fields = list(aggregate_values(0, 0, {}))
+                batch = []
+                updated = 0
+                for row in totals.iterator(chunk_size=options['batch_size']):
+                    instance = model(pk=row[key])
+                    values = aggregate_values(
+                        row['total_count'], row['total_sum'],
+                        {value: row[f'count_{value}'] for value in RATING_VALUES},
+                    )
+                    for field, value in values.items():
+                        setattr(instance, field, value)
+                    batch.append(instance)
+                    if len(batch) >= options['batch_size']:
+                        updated += model.objects.bulk_update(batch, fields)
+                        batch = []
+                if batch:
+                    updated += model.objects.bulk_update(batch, fields)
+                self.stdout.write(f"{model.__name__}: {updated} rated")
+
+        self.stdout.write(self.style.SUCCESS("Rating aggregates rebuilt."))
@@ -0,0 +1,95 @@
+# In reviews/ratings.py
+
+"""
+Incremental maintenance of the rating aggregates on Property and Unit.
+
+Like the booking rollups, a saved review subtracts what it contributed as
+loaded from the database and adds what it contributes now, so creating,
+deleting, re-rating or moving a review each end up as one UPDATE per
+affected property or unit. Postgres evaluates every SET expression against
+the old row, so the average is recomputed from the same counters in the
+same statement.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Cast
+
+from apartments.cache import bump_catalog
+from apartments.models import RATING_VALUES, Property, Unit
+
+
+def contribution(property_id, unit_id, rating):
+    """Returns (property_id, unit_id, rating) or None if it can't be counted."""
+    if rating not in RATING_VALUES:
+        return None
+    return property_id, unit_id, rating
+
+
+def loaded_contribution(review):
+    loaded = getattr(review, '_loaded_values', None)
+    if not loaded or not all(key in loaded for key in ('property_id', 'unit_id', 'rating')):
+        return None
+    return contribution(loaded['property_id'], loaded['unit_id'], loaded['rating'])
+
+
+def current_contribution(review):
+    return contribution(review.property_id, review.unit_id, review.rating)
+
+
+def rating_changes(rating, sign):
+    """UPDATE expressions that add (sign=1) or remove (sign=-1) one rating."""
+    count = F('rating_count') + sign
+    total = F('rating_sum') + sign * rating
+    return {
+        'rating_count': count,
+        'rating_sum': total,
+        f'rating_{rating}': F(f'rating_{rating}') + sign,
+        'rating_avg': Case(
+            When(rating_count__gt=-sign, then=Cast(total, DecimalField(max_digits=12, decimal_places=2))
+                 / Cast(count, DecimalField(max_digits=12, decimal_places=2))),
+            default=Value(None),
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        ),
+    }
+
+
+def apply_contribution(item, sign):
+    property_id, unit_id, rating = item
+    changes = rating_changes(rating, sign)
+    Property.objects.filter(pk=property_id).update(**changes)
+    if unit_id is not None:
+        Unit.objects.filter(pk=unit_id).update(**changes)
+    # update() sends no signals; ratings are part of list and detail payloads
+    bump_catalog(property_ids=[property_id], unit_ids=[unit_id] if unit_id is not None else [])
+
+
+def sync_review(review, deleted=False):
+    """Applies the change in a review's contribution since it was loaded."""
+    before = loaded_contribution(review)
+    after = None if deleted else current_contribution(review)
+    if before == after:
+        return
+    if before:
+        apply_contribution(before, -1)
+    if after:
+        apply_contribution(after, 1)
+
+    # Later saves of the same instance should diff against what we just applied.
+    review._loaded_values = {
+        'property_id': review.property_id,
+        'unit_id': review.unit_id,
+        'rating': review.rating,
+    }
+
+
+def aggregate_values(count, total, histogram):
+    """Field values for a full recompute, as written by the repair command."""
+    values = {
+        'rating_count': count,
+        'rating_sum': total,
+        'rating_avg': (Decimal(total) / count).quantize(Decimal('0.01')) if count else None,
+    }
+    values.update({f'rating_{value}': histogram.get(value, 0) for value in RATING_VALUES})
+    return values
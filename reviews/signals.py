@@ -0,0 +1,48 @@
+# In reviews/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.conditional import bump_versions
+from core.models import User
+from core.serializers import user_payload_changed
+from .models import Review
+from .ratings import sync_review
+
+
+def review_list_scope(property_id):
+    """Version scope of a property's public review list (see core/conditional.py)."""
+    return f'reviews:property:{property_id}'
+
+
+@receiver(post_save, sender=Review)
+def update_ratings_on_save(sender, instance, raw=False, **kwargs):
+    """Keeps the property and unit rating aggregates in step with reviews."""
+    if raw:
+        return
+    sync_review(instance)
+
+
+@receiver(post_delete, sender=Review)
+def update_ratings_on_delete(sender, instance, **kwargs):
+    sync_review(instance, deleted=True)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_list(sender, instance, **kwargs):
+    property_id = instance.property_id
+    transaction.on_commit(lambda: bump_versions(review_list_scope(property_id)))
+
+
+@receiver(post_save, sender=User)
+def invalidate_reviewer_lists(sender, instance, update_fields=None, **kwargs):
+    """Reviews embed their author, so a profile edit refreshes every list showing one of theirs."""
+    if not user_payload_changed(update_fields):
+        return
+    scopes = [
+        review_list_scope(property_id)
+        for property_id in Review.objects.filter(user_id=instance.pk).values_list('property_id', flat=True).distinct()
+    ]
+    if scopes:
+        transaction.on_commit(lambda: bump_versions(*scopes))
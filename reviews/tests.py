@@ -1,3 +1,6 @@
-from django.test import TestCase
+from core.testing import QueryBudgetTestCase
 
-# Create your tests here.
+
+class ReviewQueryBudgetTests(QueryBudgetTestCase):
+    def test_property_reviews(self):
+        self.assertQueryBudget('/api/properties/{property}/reviews/', 2)
@@ -1,10 +1,12 @@
 # In reviews/views.py
 
 from rest_framework import generics, permissions
+from core.conditional import ConditionalGetMixin
 from .models import Review
 from .serializers import ReviewSerializer, CreateReviewSerializer
+from .signals import review_list_scope
 
-class ReviewListView(generics.ListAPIView):
+class ReviewListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API endpoint to list all reviews for a specific Property.
     Accessible by anyone.
@@ -17,7 +19,10 @@ class ReviewListView(generics.ListAPIView):
         Filter reviews by the property ID (property_pk) provided in the URL.
         """
         property_pk = self.kwargs['property_pk']
-        return Review.objects.filter(property_id=property_pk).order_by('-created_at')
+        return Review.objects.filter(property_id=property_pk).select_related('user').order_by('-created_at')
+
+    def get_version_scopes(self):
+        return [review_list_scope(self.kwargs['property_pk'])]
 
 
 class CreateReviewView(generics.CreateAPIView):